@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+"""
+Benchmark: CPU used by the circuits loop while FunctionWorker tasks are running
+
+Fires a number of tasks that each sleep, and measures the CPU time used by the
+process (the sleeping worker threads use none), the mean latency from a task
+returning on its worker thread to its result reaching the caller, and the time
+for all of them to complete. Compares the FunctionWorker, which waits for each task to fire a
+TaskComplete event, with one that polls its tasks on every tick of the loop.
+
+Usage:
+    python bench_function_worker.py [--tasks 500] [--workers 10] [--sleep 0.1]
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+from circuits import BaseComponent, Event, Manager, handler, task
+from resilient_circuits.actions_component import FunctionWorker, _get_dispatch_keys
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return time.time()
+
+
+class PollingFunctionWorker(FunctionWorker):
+    """FunctionWorker that checks whether its tasks have finished on every tick of the loop"""
+
+    def _dispatch(self):
+        while self.dispatch_queue.running < self.workers:
+            entry = self.dispatch_queue.pop()
+            if entry is None:
+                break
+            entry.result = self.pool.apply_async(entry.f, entry.args, entry.kwargs)
+
+    @handler("task", override=True)
+    def _on_task(self, f, *args, **kwargs):
+        entry = self.dispatch_queue.put(f, args, kwargs, keys=_get_dispatch_keys(args))
+        entry.result = None
+        self._dispatch()
+        while entry.result is None:
+            yield
+
+        result = entry.result
+        while not result.ready():
+            yield
+        self.dispatch_queue.task_done(entry)
+        self._dispatch()
+        yield result.get()
+
+
+class TaskCaller(BaseComponent):
+    """Fires the tasks and stops the manager when they have all completed"""
+
+    def init(self, num_tasks, sleep):
+        self.num_tasks = num_tasks
+        self.sleep = sleep
+        self.completed = 0
+        self.latency = 0.0
+        self.start_time = None
+        self.end_time = None
+
+    @handler("started", channel="*")
+    def _on_started(self, *args):
+        self.start_time = time.time()
+        for _ in range(self.num_tasks):
+            self.fire(Event.create("call_task"))
+
+    @handler("call_task")
+    def _call_task(self):
+        result = yield self.call(task(_sleep, self.sleep), "functionworker")
+        self.latency += time.time() - result.value
+        self.completed += 1
+        if self.completed == self.num_tasks:
+            self.end_time = time.time()
+            self.root.stop()
+
+
+def run(worker_class, num_tasks, num_workers, sleep):
+    manager = Manager()
+    worker_class(workers=num_workers).register(manager)
+    caller = TaskCaller(num_tasks, sleep)
+    caller.register(manager)
+
+    cpu_start = time.process_time()
+    manager.run()
+    cpu = time.process_time() - cpu_start
+    elapsed = caller.end_time - caller.start_time
+    return cpu, caller.latency / num_tasks, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=500, help="Number of tasks to run")
+    parser.add_argument("--workers", type=int, default=10, help="Number of FunctionWorker threads")
+    parser.add_argument("--sleep", type=float, default=0.1, help="Seconds that each task sleeps for")
+    args = parser.parse_args()
+
+    print("{0:>25} {1:>10} {2:>8} {3:>14} {4:>12}".format(
+        "worker", "cpu (s)", "cpu %", "latency (ms)", "elapsed (s)"))
+    for worker_class in (PollingFunctionWorker, FunctionWorker):
+        cpu, latency, elapsed = run(worker_class, args.tasks, args.workers, args.sleep)
+        print("{0:>25} {1:>10.2f} {2:>8.1f} {3:>14.1f} {4:>12.2f}".format(
+            worker_class.__name__, cpu, 100.0 * cpu / elapsed, latency * 1000, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+"""
+Benchmark: messages/second received by StompClient, for different values of max_frames_per_tick
+
+A local fake broker accepts the STOMP connection and, once subscribed,
+writes all the MESSAGE frames at once. The time is measured from the
+subscription until the last Message event is handled on the circuits loop.
+
+Usage:
+    python bench_stomp_receive.py [--messages 5000] [--frames-per-tick 1 10 50]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import socket
+import threading
+import time
+from circuits import BaseComponent, Manager, handler
+from resilient_circuits.stomp_component import StompClient
+from resilient_circuits.stomp_events import Connect, Subscribe
+
+DESTINATION = "actions.201.bench_destination"
+
+
+class FakeBroker(object):
+    """Accepts one STOMP connection and sends num_messages MESSAGE frames once subscribed"""
+
+    def __init__(self, num_messages, body_size):
+        self.num_messages = num_messages
+        body = json.dumps({"function": {"name": "bench_function"}, "inputs": {"data": "x" * body_size}})
+        self.body = body.encode("utf-8")
+
+        self.server = socket.socket()
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+
+        self.thread = threading.Thread(target=self._serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @staticmethod
+    def _read_frame(conn, buf):
+        while b"\x00" not in buf[0]:
+            data = conn.recv(4096)
+            if not data:
+                return None
+            buf[0] += data
+        frame, _, buf[0] = buf[0].partition(b"\x00")
+        return frame.lstrip(b"\r\n")
+
+    def _message_frame(self, subscription, message_id):
+        headers = ["MESSAGE",
+                   "subscription:{0}".format(subscription),
+                   "message-id:{0}".format(message_id),
+                   "destination:/queue/{0}".format(DESTINATION),
+                   "reply-to:/queue/acks.201.bench",
+                   "correlation-id:{0}".format(message_id),
+                   "content-length:{0}".format(len(self.body))]
+        return "\n".join(headers).encode("utf-8") + b"\n\n" + self.body + b"\x00"
+
+    def _serve(self):
+        conn, _ = self.server.accept()
+        buf = [b""]
+        self._read_frame(conn, buf)
+        conn.sendall(b"CONNECTED\nversion:1.2\nheart-beat:0,0\n\n\x00")
+
+        frame = self._read_frame(conn, buf)
+        while frame is not None and not frame.startswith(b"SUBSCRIBE"):
+            frame = self._read_frame(conn, buf)
+        if frame is None:
+            return
+        subscription = [line.split(b":", 1)[1].decode("utf-8") for line in frame.split(b"\n")
+                        if line.startswith(b"id:")][0]
+
+        conn.sendall(b"".join(self._message_frame(subscription, i) for i in range(self.num_messages)))
+
+        # Hold the connection open until the client disconnects
+        while self._read_frame(conn, buf) is not None:
+            pass
+        conn.close()
+
+    def close(self):
+        self.server.close()
+
+
+class ReceiveCounter(BaseComponent):
+    """Connects, subscribes and counts the Message events fired by the StompClient"""
+
+    channel = "stomp"
+
+    def init(self, num_messages):
+        self.num_messages = num_messages
+        self.received = 0
+        self.start_time = None
+        self.end_time = None
+
+    @handler("started", channel="*")
+    def _on_started(self, *args):
+        self.fire(Connect())
+
+    @handler("Connect_success")
+    def _on_connected(self, *args, **kwargs):
+        self.start_time = time.time()
+        self.fire(Subscribe(DESTINATION))
+
+    @handler("Message")
+    def _on_message(self, event, headers, message, queue):
+        self.received += 1
+        if self.received == self.num_messages:
+            self.end_time = time.time()
+            self.root.stop()
+
+
+def run(num_messages, frames_per_tick, body_size):
+    broker = FakeBroker(num_messages, body_size)
+    manager = Manager()
+    client = StompClient("127.0.0.1", broker.port, use_ssl=False, max_frames_per_tick=frames_per_tick,
+                         heartbeats=(0, 0))
+    client.register(manager)
+    counter = ReceiveCounter(num_messages)
+    counter.register(manager)
+
+    manager.run()
+    broker.close()
+    elapsed = counter.end_time - counter.start_time
+    return num_messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="Number of messages to receive")
+    parser.add_argument("--body-size", type=int, default=512, help="Approximate size of each message in bytes")
+    parser.add_argument("--frames-per-tick", type=int, nargs="+", default=[1, 10, 50],
+                        help="Values of max_frames_per_tick to compare")
+    args = parser.parse_args()
+
+    print("{0:>20} {1:>15}".format("frames per tick", "messages/sec"))
+    for frames_per_tick in args.frames_per_tick:
+        rate = run(args.messages, frames_per_tick, args.body_size)
+        print("{0:>20} {1:>15.0f}".format(frames_per_tick, rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -56,6 +56,9 @@ class ActionMessageBase(Event):
         # Fire a {name}_success event when this event is successfully processed
         self.success = True
 
+        # Set by the function decorators when this function must wait for others with the same key
+        self.serial_key = None
+
     def __repr__(self):
         "x.__repr__() <==> repr(x)"
         if len(self.channels) > 1:
@@ -12,8 +12,8 @@ import traceback
 from collections import Callable
 from signal import SIGINT, SIGTERM
 from six import string_types
-from circuits import BaseComponent, Worker
-from circuits.core.manager import ExceptionWrapper
+from circuits import BaseComponent, Event, Worker
+from circuits.core.manager import CallValue
 from circuits.core.handlers import handler
 from requests.utils import DEFAULT_CA_BUNDLE_PATH
 import resilient
@@ -24,7 +24,11 @@ from resilient_circuits.decorators import *  # for back-compatibility, these wer
 from resilient_circuits.rest_helper import get_resilient_client, reset_resilient_client
 from resilient_circuits.action_message import ActionMessageBase, ActionMessage, \
     FunctionMessage, InboundMessage, StatusMessage, FunctionResult, BaseFunctionError
-from resilient_circuits.stomp_component import StompClient
+from resilient_circuits.stomp_component import StompClient, DEFAULT_MAX_FRAMES_PER_TICK
+from resilient_circuits.dispatch_queue import DispatchQueue, parse_dispatch_option, DEFAULT_DISPATCH_QUEUE_SIZE
+from resilient_circuits import process_executor, metadata_cache, function_registry
+from resilient_circuits.worker_pool import ElasticThreadPool, WorkerAutoScaler, AUTOSCALE_INTERVAL, \
+    DEFAULT_NUM_WORKERS_MIN, DEFAULT_NUM_WORKERS_MAX, DEFAULT_NUM_WORKERS_MAX_WAIT, DEFAULT_NUM_WORKERS_IDLE_TIME
 from resilient_circuits.stomp_events import *
 from resilient_circuits import helpers
 from resilient_circuits import constants
@@ -57,10 +61,73 @@ def validate_cert(cert, hostname):
     return (True, "Success")
 
 
+def _get_dispatch_keys(args):
+    """Get the names a task is prioritized and limited by: its function (or inbound destination) and message destination"""
+    for arg in args:
+        if isinstance(arg, ActionMessageBase):
+            destination = (arg.hdr() or {}).get("destination")
+            queue = helpers.get_queue(destination) if destination else None
+            return (arg.name, queue[2] if queue else None)
+    return ()
+
+
+def _get_serial_key(args):
+    """Get the key of a task that must run after the earlier ones with the same key, or None"""
+    for arg in args:
+        if isinstance(arg, ActionMessageBase):
+            return arg.serial_key
+    return None
+
+
+class TaskComplete(Event):
+    """Fired from a FunctionWorker thread when it has finished running a task"""
+
+    def __init__(self, entry):
+        super(TaskComplete, self).__init__(entry)
+
+
+class _TaskWaitState(object):
+    """Where circuits records the suspended task handler, see :meth:`FunctionWorker._wait_for`"""
+
+    def __init__(self):
+        self.task_event = None
+        self.task = None
+        self.parent = None
+
+
 class FunctionWorker(Worker):
+    """
+    A thread pool that runs functions, fed from a :class:`DispatchQueue`.
+
+    Tasks are only handed to the pool when a worker is free, in order of priority
+    and within each function's concurrency limit. Tasks of serialized functions
+    with the same key (by default, the same incident) run one after the other.
+    When the queue fills up, reading from the STOMP connection is paused until it drains.
+
+    Each task waits for a :class:`TaskComplete` event fired by the thread that ran it,
+    so tasks that are waiting or running take no time on the circuits loop.
+
+    With an ``autoscaler`` (``num_workers = auto``) the number of workers changes with the load:
+    it is checked every ``AUTOSCALE_INTERVAL`` seconds, and threads are started as they are needed
+    and exit when idle.
+    """
 
     channel = "functionworker"
 
+    def init(self, process=False, workers=None, channel=channel, dispatch_queue=None, autoscaler=None):
+        super(FunctionWorker, self).init(process=process, workers=1 if autoscaler else workers, channel=channel)
+        self.dispatch_queue = dispatch_queue if dispatch_queue is not None else DispatchQueue()
+        self.reading_paused = False
+
+        self.autoscaler = autoscaler
+        if autoscaler is not None:
+            self.pool.terminate()
+            self.pool = ElasticThreadPool(autoscaler.max_workers, idle_timeout=autoscaler.idle_time)
+            self.workers = autoscaler.workers
+            Timer(AUTOSCALE_INTERVAL, Event.create("autoscale"), self.channel, persist=True).register(self)
+            LOG.info("Running between %d and %d FunctionWorkers, starting with %d",
+                     autoscaler.min_workers, autoscaler.max_workers, self.workers)
+
     @handler("signal", channel="*")
     def _on_signal(self, signo, stack):
         """Add a signal handler to the worker processes otherwise they swallow SIGINT, SIGTERM
@@ -70,17 +137,102 @@ class FunctionWorker(Worker):
             LOG.info("Worker interrupted")
             raise SystemExit(0)
 
-    @handler("task", override=True)
-    def _on_task(self, f, *args, **kwargs):
-        LOG.debug("Task: %s", f)
-        result = self.pool.apply_async(f, args, kwargs)
-        while not result.ready():
-            yield
+    def _run_task(self, entry):
+        """On the worker thread, run the task and wake up the handler waiting for it"""
         try:
-            yield result.get()
+            entry.value = entry.f(*entry.args, **entry.kwargs)
         except Exception as e:
             LOG.error(traceback.format_exc())
-            yield ExceptionWrapper(e)
+            entry.error = e
+        finally:
+            self.fire(TaskComplete(entry), self.channel)
+
+    def _dispatch(self):
+        """Start as many waiting tasks as there are free workers, and apply backpressure"""
+        while self.dispatch_queue.running < self.workers:
+            entry = self.dispatch_queue.pop()
+            if entry is None:
+                break
+            self.pool.apply_async(self._run_task, (entry,))
+        if self.autoscaler is not None:
+            self.autoscaler.note_running(self.dispatch_queue.running)
+
+        if self.dispatch_queue.full and not self.reading_paused:
+            LOG.warning("%d tasks are waiting for a FunctionWorker. Pausing reading of messages",
+                        len(self.dispatch_queue))
+            self.reading_paused = True
+            self.fire(PauseReading(), "*")
+        elif self.reading_paused and self.dispatch_queue.drained:
+            LOG.info("%d tasks are waiting for a FunctionWorker. Resuming reading of messages",
+                     len(self.dispatch_queue))
+            self.reading_paused = False
+            self.fire(ResumeReading(), "*")
+
+    @handler("autoscale")
+    def _autoscale(self):
+        """Grow or shrink the number of workers, see :class:`WorkerAutoScaler`"""
+        workers = self.autoscaler.update(self.dispatch_queue.running, self.dispatch_queue.oldest_wait())
+        if workers != self.workers:
+            self.workers = workers
+            self._dispatch()
+
+    def get_stats(self):
+        """
+        Get the metrics of the workers
+
+        :return: the number of ``workers`` that can run tasks at once, the number of ``threads``,
+            the ``dispatch`` queue stats and, with ``num_workers = auto``, the ``autoscale`` stats
+        :rtype: dict
+        """
+        stats = {
+            "workers": self.workers,
+            "threads": self.pool.size if self.autoscaler is not None else self.workers,
+            "dispatch": self.dispatch_queue.get_stats()
+        }
+        if self.autoscaler is not None:
+            stats["autoscale"] = self.autoscaler.get_stats()
+        return stats
+
+    def _wait_for(self, entry):
+        """
+        Suspend the task handler until its entry has run.
+
+        This follows the protocol of circuits' ``waitEvent``: the first value yielded is the state
+        in which circuits records the suspended handler, the second is sent back to it when it resumes.
+        Unlike ``waitEvent``, which adds handlers for each wait, one ``TaskComplete`` handler resumes all tasks
+        """
+        entry.wait_state = _TaskWaitState()
+        yield entry.wait_state
+        yield CallValue(None)
+
+    @handler("TaskComplete")
+    def _on_task_complete(self, entry):
+        state = entry.wait_state
+        # Resume the handler now. Registering it to be resumed on the next tick would leave
+        # the loop idle for up to its timeout first, as no event is waiting to be handled
+        self.processTask(state.task_event, state.task, state.parent)
+
+    @handler("task", override=True)
+    def _on_task(self, f, *args, **kwargs):
+        LOG.debug("Task: %s", f)
+        # Queue the task when the event is handled, rather than when circuits first runs
+        # the generator, so that tasks are queued in the order they arrived
+        entry = self.dispatch_queue.put(f, args, kwargs, keys=_get_dispatch_keys(args),
+                                        serial_key=_get_serial_key(args))
+        self._dispatch()
+        return self._complete_task(entry)
+
+    def _complete_task(self, entry):
+        # Suspended until the worker thread fires TaskComplete, instead of polling
+        yield self._wait_for(entry)
+
+        self.dispatch_queue.task_done(entry)
+        self._dispatch()
+        if entry.error is not None:
+            # Resumed from a wait, circuits would take a yielded ExceptionWrapper as the value.
+            # Raising gives the same task failure and exception events
+            raise entry.error
+        yield entry.value
 
 
 class ResilientComponent(BaseComponent):
@@ -155,19 +307,24 @@ class ResilientComponent(BaseComponent):
     def _get_fields(self, fn_names=None):
         """Get Incident and Action fields"""
         client = self.rest_client()
+        # Read from the metadata cache on disk, if metadata_cache_dir is set
+        cached_get = metadata_cache.get_cached_get(self.opts, client)
+
         self._fields = dict((field["name"], field)
-                            for field in client.cached_get("/types/incident/fields"))
+                            for field in cached_get("/types/incident/fields"))
         self._action_fields = dict((field["name"], field)
-                                   for field in client.cached_get("/types/actioninvocation/fields"))
+                                   for field in cached_get("/types/actioninvocation/fields"))
 
         if fn_names:
 
             try:
 
+                # All the function definitions are read in one listing, shared by all components
+                registry = function_registry.get_function_registry(client)
                 for fn_name in fn_names:
-                    self._functions[fn_name] = client.cached_get("/functions/{0}?handle_format=names".format(fn_name))
+                    self._functions[fn_name] = registry.get(fn_name, cached_get)
 
-                self._function_fields = dict((field["name"], field) for field in client.cached_get("/types/__function/fields"))
+                self._function_fields = dict((field["name"], field) for field in cached_get("/types/__function/fields"))
 
             except resilient.SimpleHTTPException:
                 # functions are not available, pre-v30 server
@@ -316,6 +473,8 @@ class Actions(ResilientComponent):
     def __init__(self, opts):
         super(Actions, self).__init__(opts)
         self.listeners = dict()
+        # Modules of the components with functions that run in worker processes
+        self._process_modules = set()
         self._proxy_args = {}
 
         # messages and acks that failed to send over stomp connection
@@ -341,7 +500,21 @@ class Actions(ResilientComponent):
 
         # Make a worker thread-pool that will run functions
         LOG.debug("num_workers set to %s", opts.get("num_workers"))
-        self._functionworker = FunctionWorker(process=False, channel="functionworker", workers=opts.get("num_workers"))
+        dispatch_queue = DispatchQueue(
+            max_size=opts.get("dispatch_queue_size", DEFAULT_DISPATCH_QUEUE_SIZE),
+            priorities=parse_dispatch_option(opts["resilient"].get("dispatch_priorities"),
+                                             "dispatch_priorities"),
+            concurrency_limits=parse_dispatch_option(opts["resilient"].get("dispatch_concurrency_limits"),
+                                                     "dispatch_concurrency_limits"))
+        autoscaler = None
+        if opts.get("num_workers_auto"):
+            autoscaler = WorkerAutoScaler(
+                opts.get("num_workers_min", DEFAULT_NUM_WORKERS_MIN),
+                opts.get("num_workers_max", DEFAULT_NUM_WORKERS_MAX),
+                max_wait=float(opts["resilient"].get("num_workers_max_wait") or DEFAULT_NUM_WORKERS_MAX_WAIT),
+                idle_time=float(opts["resilient"].get("num_workers_idle_time") or DEFAULT_NUM_WORKERS_IDLE_TIME))
+        self._functionworker = FunctionWorker(process=False, channel="functionworker", workers=opts.get("num_workers"),
+                                              dispatch_queue=dispatch_queue, autoscaler=autoscaler)
         self._functionworker.register(self.root)
 
         if opts.get("test_actions", False):
@@ -373,7 +546,13 @@ class Actions(ResilientComponent):
         list_action_defs = rest_client.get("/actions")["entities"]
         self.action_defs = dict((int(action["id"]), action) for action in list_action_defs)
 
-        self.subscribe_headers = {"activemq.prefetchSize": opts["stomp_prefetch_limit"]}
+        # The server sends at most this many unacknowledged messages from each destination,
+        # so when several instances of an app share a destination they each only take what they can run.
+        # As each message is acked, the server sends the next
+        self.prefetch_limit = int(opts.get("stomp_prefetch_limit") or opts.get("num_workers") or 1)
+        self.prefetch_limits = parse_dispatch_option(opts["resilient"].get("stomp_prefetch_limits"),
+                                                     "stomp_prefetch_limits")
+        self.subscribe_headers = {"activemq.prefetchSize": self.prefetch_limit}
 
     # Public Utility methods
 
@@ -582,6 +761,7 @@ class Actions(ResilientComponent):
         stomp_timeout = int(self.opts.get("stomp_timeout")) # default from app.py:DEFAULT_STOMP_TIMEOUT
         # build out all the extra parameters for the stomp connections
         stomp_params = self.opts['resilient'].get('stomp_params')
+        max_frames_per_tick = int(self.opts['resilient'].get('stomp_max_frames_per_tick', DEFAULT_MAX_FRAMES_PER_TICK))
         if not self.stomp_component:
             self.stomp_component = StompClient(stomp_host, self.opts["stomp_port"],
                                                username=stomp_email,
@@ -593,6 +773,7 @@ class Actions(ResilientComponent):
                                                ssl_context=context,
                                                ca_certs=ca_certs,  # For old ssl version
                                                stomp_params=stomp_params,
+                                               max_frames_per_tick=max_frames_per_tick,
                                                **self._proxy_args)
             self.stomp_component.register(self)
         else:
@@ -607,6 +788,7 @@ class Actions(ResilientComponent):
                                       ssl_context=context,
                                       ca_certs=ca_certs,  # For old ssl version
                                       stomp_params=stomp_params,
+                                      max_frames_per_tick=max_frames_per_tick,
                                       **self._proxy_args)
 
         # Other special options
@@ -635,6 +817,8 @@ class Actions(ResilientComponent):
             self._setup_message_logging()
             self._setup_stomp()
             return
+        if isinstance(component, ResilientComponent) and process_executor.has_process_functions(component):
+            self._process_modules.add(type(component).__module__)
         # The set of channels for this component is:
         # - the component's channel(s) declared at class level, and
         # - any channel(s) declared at individual handlers
@@ -703,6 +887,12 @@ class Actions(ResilientComponent):
         for queue_name in self.listeners:
             self._subscribe(queue_name)
 
+    @handler("load_all_success")
+    def start_process_executor(self):
+        """Start the worker processes, if any functions run in them, once all components are loaded"""
+        if self._process_modules:
+            process_executor.start_process_executor(self.opts, self._process_modules)
+
     @handler("prepare_unregister")
     def prepare_unregister(self, event, component):
         """A component is unregistering.  Unsubscribe its message queue(s)."""
@@ -736,13 +926,38 @@ class Actions(ResilientComponent):
             self.listeners[queue_name] = comps
             LOG.debug("Listeners: %s", self.listeners)
 
+    def get_subscribe_headers(self, queue_name):
+        """
+        Get the headers to subscribe to a message destination with.
+        Its prefetch limit is the first of:
+
+        * its entry in ``stomp_prefetch_limits``
+        * ``stomp_prefetch_limit``, or ``num_workers`` if that is not set,
+          capped at its entry in ``dispatch_concurrency_limits``
+
+        :param queue_name: API name of the message destination
+        :type queue_name: str
+        :return: the subscribe headers
+        :rtype: dict
+        """
+        prefetch_limit = self.prefetch_limits.get(queue_name)
+        if not prefetch_limit:
+            prefetch_limit = self.prefetch_limit
+            concurrency_limit = self._functionworker.dispatch_queue.concurrency_limits.get(queue_name)
+            if concurrency_limit:
+                prefetch_limit = min(prefetch_limit, concurrency_limit)
+
+        headers = dict(self.subscribe_headers)
+        headers["activemq.prefetchSize"] = prefetch_limit
+        return headers
+
     def _subscribe(self, queue_name):
         """Actually subscribe the STOMP queue.  Note: this use client-ack, not auto-ack"""
         if self.resilient_mock:
             return
 
         if queue_name.startswith(constants.INBOUND_MSG_DEST_PREFIX):
-            self.fire(Subscribe(queue_name, additional_headers=self.subscribe_headers))
+            self.fire(Subscribe(queue_name, additional_headers=self.get_subscribe_headers(queue_name.split(".", 2)[-1])))
 
         elif self.stomp_component and self.stomp_component.connected and self.listeners[queue_name]:
             if queue_name in self.stomp_component.subscribed:
@@ -753,7 +968,7 @@ class Actions(ResilientComponent):
                 SELFTEST_SUBSCRIPTIONS.append(queue_name)
 
             destination = "actions.{0}.{1}".format(self.org_id, queue_name)
-            self.fire(Subscribe(destination, additional_headers=self.subscribe_headers))
+            self.fire(Subscribe(destination, additional_headers=self.get_subscribe_headers(queue_name)))
         else:
             LOG.error("Invalid request to subscribe to %s in state Connected? [%s] with %d listeners",
                       queue_name,
@@ -983,8 +1198,15 @@ class Actions(ResilientComponent):
     def reload(self, event, opts):
         """New config, reconnect to stomp if required"""
         event.success = False
+        # Check the server version and the cached type metadata again, in case they have changed
+        metadata_cache.reset_metadata_cache()
+        function_registry.reset_function_registry()
         super(Actions, self).reload(event, opts)
         self._configure_opts(opts)
+        # Worker processes are given the configuration when they start, so start new ones
+        process_executor.stop_process_executor()
+        if self._process_modules:
+            process_executor.start_process_executor(opts, self._process_modules)
         if self.stomp_component:
             self.fire(Disconnect(flush=True, reconnect=False))
             yield self.wait("Disconnect_success")
@@ -9,6 +9,8 @@ import resilient_circuits.keyring_arguments as keyring_arguments
 from resilient_circuits.validate_configs import VALIDATE_DICT
 from resilient_circuits.helpers import validate_configs
 from resilient_circuits import constants
+from resilient_circuits.dispatch_queue import DEFAULT_DISPATCH_QUEUE_SIZE
+from resilient_circuits import worker_pool
 
 
 class AppArgumentParser(keyring_arguments.ArgumentParser):
@@ -23,6 +25,10 @@ class AppArgumentParser(keyring_arguments.ArgumentParser):
     DEFAULT_STOMP_MAX_RETRIES = 3
     DEFAULT_MAX_CONNECTION_RETRIES = 1
     DEFAULT_NUM_WORKERS = 10
+    DEFAULT_NUM_WORKERS_MIN = worker_pool.DEFAULT_NUM_WORKERS_MIN
+    DEFAULT_NUM_WORKERS_MAX = worker_pool.DEFAULT_NUM_WORKERS_MAX
+    DEFAULT_REST_CLIENT_POOL = "True"
+    DEFAULT_DISPATCH_QUEUE_SIZE = DEFAULT_DISPATCH_QUEUE_SIZE
 
     def __init__(self, config_file=None):
 
@@ -62,6 +68,11 @@ class AppArgumentParser(keyring_arguments.ArgumentParser):
                                             "log_http_responses") or ""
         default_resource_prefix = self.getopt(self.DEFAULT_APP_SECTION, "resource_prefix") or None
         default_num_workers = self.getopt(self.DEFAULT_APP_SECTION, "num_workers") or self.DEFAULT_NUM_WORKERS
+        default_num_workers_min = self.getopt(self.DEFAULT_APP_SECTION, "num_workers_min") or self.DEFAULT_NUM_WORKERS_MIN
+        default_num_workers_max = self.getopt(self.DEFAULT_APP_SECTION, "num_workers_max") or self.DEFAULT_NUM_WORKERS_MAX
+        default_rest_client_pool = self._is_true(self.getopt(self.DEFAULT_APP_SECTION,
+                                                             "rest_client_pool") or self.DEFAULT_REST_CLIENT_POOL)
+        default_dispatch_queue_size = self.getopt(self.DEFAULT_APP_SECTION, "dispatch_queue_size") or self.DEFAULT_DISPATCH_QUEUE_SIZE
 
         logging.getLogger().removeHandler(temp_handler)
 
@@ -144,10 +155,29 @@ class AppArgumentParser(keyring_arguments.ArgumentParser):
                           help=("Log all responses from Resilient "
                                 "REST API to this directory"))
         self.add_argument("--num-workers",
-                          type=int,
+                          type=worker_pool.parse_num_workers,
                           default=default_num_workers,
                           help=("Number of FunctionWorkers to use. "
-                                "Number of Functions that can run in parallel"))
+                                "Number of Functions that can run in parallel. "
+                                "'auto' to change it with the load, between num_workers_min and num_workers_max"))
+        self.add_argument("--num-workers-min",
+                          type=int,
+                          default=default_num_workers_min,
+                          help="Fewest FunctionWorkers to use when num_workers is 'auto'")
+        self.add_argument("--num-workers-max",
+                          type=int,
+                          default=default_num_workers_max,
+                          help="Most FunctionWorkers to use when num_workers is 'auto'")
+        self.add_argument("--rest-client-pool",
+                          type=self._is_true,
+                          default=default_rest_client_pool,
+                          help=("Give each FunctionWorker its own REST client from a pool "
+                                "of num_workers clients instead of sharing one"))
+        self.add_argument("--dispatch-queue-size",
+                          type=int,
+                          default=default_dispatch_queue_size,
+                          help=("Number of Functions that can wait for a FunctionWorker "
+                                "before reading of messages is paused. 0 for no limit"))
 
     def parse_args(self, args=None, namespace=None, ALLOW_UNRECOGNIZED=False):
         """Parse commandline arguments and construct an opts dictionary"""
@@ -159,7 +189,14 @@ class AppArgumentParser(keyring_arguments.ArgumentParser):
 
             parse_parameters(opts)
 
+        # With num_workers = auto, everything sized by num_workers is sized for the most workers
+        opts["num_workers_auto"] = opts.get("num_workers") == worker_pool.NUM_WORKERS_AUTO
+        if opts["num_workers_auto"]:
+            opts["num_workers"] = opts.get("num_workers_max")
+
         validate_configs(opts, VALIDATE_DICT)
+        if opts["num_workers_auto"] and opts.get("num_workers_min") > opts.get("num_workers_max"):
+            raise ValueError("num_workers_min must not be more than num_workers_max")
 
         return opts
 
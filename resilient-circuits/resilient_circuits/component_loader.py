@@ -1,19 +1,29 @@
 # -*- coding: utf-8 -*-
-# (c) Copyright IBM Corp. 2010, 2018. All Rights Reserved.
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
 
 """Dynamic component loader"""
 
 import os
 import sys
+import time
 import logging
 import traceback
 import pkg_resources
+import six
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 from circuits import Loader, Event
 from circuits.core.handlers import handler
-from resilient_circuits import constants, helpers
+from resilient_circuits import constants, helpers, metadata_cache, function_registry
+from resilient_circuits.rest_helper import get_resilient_client
+from resilient_circuits.actions_component import ResilientComponent
 
 LOG = logging.getLogger(__name__)
 
+# Number of threads that import and construct the installed components. 1 to load them one at a time
+LOAD_THREADS = "component_load_threads"
+DEFAULT_LOAD_THREADS = 8
+
 
 class load(Event):
     """yes"""
@@ -30,6 +40,15 @@ class load_all_success(Event):
     pass
 
 
+def _timed(func, *args):
+    """Call func, and return its result or the exception info, and the seconds it took"""
+    start = time.time()
+    try:
+        return func(*args), None, time.time() - start
+    except Exception:
+        return None, sys.exc_info(), time.time() - start
+
+
 def safe_but_noisy_import(name):
     modules = sys.modules.copy()
     try:
@@ -60,6 +79,8 @@ class ComponentLoader(Loader):
         super(ComponentLoader, self).__init__(init_kwargs={"opts": opts}, paths=[self.path])
         self.pending_components = []
         self.finished = False
+        # Seconds spent importing and constructing each installed component, by class name
+        self.timings = OrderedDict()
 
         # Load all installed components
         installed_components = self.discover_installed_components()
@@ -84,63 +105,124 @@ class ComponentLoader(Loader):
             self.finished = True
             self.fire(load_all_success())
 
-    def discover_installed_components(self):
-        entry_points = pkg_resources.iter_entry_points('resilient.circuits.components')
-        ep = None
-        try:
-            return_list = []
-            # Loop entry points
-            for ep in entry_points:
-                if ep.name not in self.noload:
-
-                    # Load the component class
-                    cmp_class = ep.load()
-
-                    # Get the class' __module__ name
-                    # Note: the name used for the app.config section of this app should be the same as the __module__
-                    cmp_module_name = cmp_class.__module__.split(".")[0]
+    def _get_load_threads(self):
+        return max(int((self.opts.get("resilient") or {}).get(LOAD_THREADS) or DEFAULT_LOAD_THREADS), 1)
 
-                    # If an INBOUND_MSG_APP_CONFIG_Q_NAME is defined in the app.config in the section for this app, use it
-                    custom_q_name = self.opts.get(cmp_module_name, {}).get(constants.INBOUND_MSG_APP_CONFIG_Q_NAME, "")
-
-                    if custom_q_name:
-                        # Get the inbound_handlers in this component and overwite their 'channel' and 'names' attributes
-                        inbound_handlers = helpers.get_handlers(cmp_class, handler_type="inbound_handler")
-                        for ih in inbound_handlers:
+    def _map(self, func, items):
+        """Call func on each item on a pool of threads, returning the results in the order of the items"""
+        threads = min(self._get_load_threads(), len(items))
+        if threads <= 1:
+            return [func(item) for item in items]
+        pool = ThreadPool(threads)
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
 
-                            new_channel = "{0}.{1}".format(constants.INBOUND_MSG_DEST_PREFIX, custom_q_name)
-                            new_names = (custom_q_name, )
+    @staticmethod
+    def _load_entry_points(entry_points):
+        """Load the entry points of one distribution, one at a time, as they may import the same modules"""
+        return [(ep, _timed(ep.load)) for ep in entry_points]
 
-                            if sys.version_info.major < 3:
-                                # Handle PY < 3
-                                ih[1].__func__.channel = new_channel
-                                ih[1].__func__.names = new_names
-                            else:
-                                # Handle PY >= 3 specific imports
-                                ih[1].channel = new_channel
-                                ih[1].names = new_names
+    def discover_installed_components(self):
+        """
+        Import the component classes of the installed Apps.
+
+        Each distribution's entry points are loaded on a pool of threads, and the classes
+        are returned in the order of the entry points
+
+        :return: the component classes
+        :rtype: list
+        """
+        by_dist = OrderedDict()
+        for ep in pkg_resources.iter_entry_points('resilient.circuits.components'):
+            if ep.name not in self.noload:
+                by_dist.setdefault(str(ep.dist), []).append(ep)
+
+        return_list = []
+        for loaded in self._map(self._load_entry_points, list(by_dist.values())):
+            for ep, (cmp_class, exc_info, seconds) in loaded:
+                if exc_info is not None:
+                    LOG.error("Failed to load '%s' from '%s'", ep, ep.dist)
+                    six.reraise(*exc_info)
+
+                name = u"{0}.{1}".format(cmp_class.__module__, cmp_class.__name__)
+                self.timings.setdefault(name, {})["import"] = seconds
+
+                # Get the class' __module__ name
+                # Note: the name used for the app.config section of this app should be the same as the __module__
+                cmp_module_name = cmp_class.__module__.split(".")[0]
+
+                # If an INBOUND_MSG_APP_CONFIG_Q_NAME is defined in the app.config in the section for this app, use it
+                custom_q_name = self.opts.get(cmp_module_name, {}).get(constants.INBOUND_MSG_APP_CONFIG_Q_NAME, "")
+
+                if custom_q_name:
+                    # Get the inbound_handlers in this component and overwite their 'channel' and 'names' attributes
+                    inbound_handlers = helpers.get_handlers(cmp_class, handler_type="inbound_handler")
+                    for ih in inbound_handlers:
+
+                        new_channel = "{0}.{1}".format(constants.INBOUND_MSG_DEST_PREFIX, custom_q_name)
+                        new_names = (custom_q_name, )
+
+                        if sys.version_info.major < 3:
+                            # Handle PY < 3
+                            ih[1].__func__.channel = new_channel
+                            ih[1].__func__.names = new_names
+                        else:
+                            # Handle PY >= 3 specific imports
+                            ih[1].channel = new_channel
+                            ih[1].names = new_names
 
-                    return_list.append(cmp_class)
-            return return_list
+                return_list.append(cmp_class)
+        return return_list
 
-        except ImportError as e:
-            LOG.error("Failed to load '%s' from '%s'", ep, ep.dist)
-            raise e
+    def _prefetch_metadata(self, component_list):
+        """Read the type metadata and function definitions once, for all the components to share"""
+        if not any(issubclass(cls, ResilientComponent) for cls in component_list):
+            return
+        try:
+            client = get_resilient_client(self.opts)
+            cached_get = metadata_cache.prefetch(self.opts, client)
+            function_registry.get_function_registry(client).load(cached_get)
+        except Exception as err:
+            # Each component reads what it needs, and reports any error
+            LOG.debug("Unable to prefetch the type metadata: %s", err)
 
     def _register_components(self, component_list):
         """ register all installed components and ones from componentsdir """
         LOG.info("Loading %d components", len(component_list))
-        for component_class in component_list:
-            LOG.info("'%s.%s' loading", component_class.__module__, component_class.__name__)
-            try:
-                component_class(opts=self.opts).register(self)
-                LOG.debug("'%s.%s' loaded", component_class.__module__, component_class.__name__)
-            except Exception as e:
-                LOG.error("Failed to load '%s.%s'", component_class.__module__, component_class.__name__, exc_info=1)
+        start = time.time()
+        self._prefetch_metadata(component_list)
+        try:
+            # Construct the components on a pool of threads, as each reads from SOAR,
+            # then register them in order
+            constructed = self._map(lambda component_class: _timed(component_class, self.opts), component_list)
+        finally:
+            metadata_cache.clear_prefetched()
+
+        for component_class, (component, exc_info, seconds) in zip(component_list, constructed):
+            name = u"{0}.{1}".format(component_class.__module__, component_class.__name__)
+            self.timings.setdefault(name, {})["construct"] = seconds
+            LOG.info("'%s' loading", name)
+            if exc_info is not None:
+                LOG.error("Failed to load '%s'", name, exc_info=exc_info)
                 self.fire(load_all_failure())
                 return False
+            component.register(self)
+            LOG.debug("'%s' loaded", name)
+
+        self._log_timings(time.time() - start)
         return True
 
+    def _log_timings(self, seconds):
+        """Log the time spent loading each component, slowest first"""
+        LOG.info("Constructed %d components in %.2f secs", len(self.timings), seconds)
+        totals = sorted(((sum(timing.values()), name, timing) for name, timing in self.timings.items()), reverse=True)
+        for total, name, timing in totals:
+            LOG.info("  %6.3f secs  '%s' (import %.3f, construct %.3f)",
+                     total, name, timing.get("import", 0), timing.get("construct", 0))
+
     @handler("exception", channel="loader")
     def exception(self, event, *args, **kwargs):
         if not self.finished:
@@ -7,21 +7,185 @@ import logging
 import threading
 from collections import namedtuple
 import inspect as _inspect
-from functools import wraps
+from functools import partial, wraps
 from types import GeneratorType
 from circuits import Timer, task, Event
 import circuits.core.handlers
-from resilient_lib import ResultPayload, validate_fields
-from resilient_circuits import constants
+from resilient_lib import ResultPayload, validate_fields, str_to_bool
+from resilient_circuits import constants, helpers
 from resilient_circuits.action_message import FunctionResult, \
     StatusMessage, StatusMessageEvent, \
     FunctionError_, FunctionErrorEvent
+from resilient_circuits.process_executor import EXECUTOR_PROCESS, check_executor, get_executor, \
+    get_process_executor
 
 LOG = logging.getLogger(__name__)
 
 # for convenience we alias the circuits 'handler'
 handler = circuits.core.handlers.handler
 
+SERIALIZE_OPTION = "serialize"
+
+
+def serialize_get_incident_key(event):
+    """Callback to return the serialization key for a function message.
+       Serialized functions with the same key run one at a time, in the order they arrived.
+       Default is: the incident id. Messages without an incident are not serialized.
+    """
+    incident_id = (event.message.get("incident") or {}).get("id")
+    if incident_id is None:
+        return None
+    return "incident {}".format(incident_id)
+
+
+def _set_serial_key(itself, event, serialize, get_key):
+    """If the function is serialized, by its decorator or the app.config section of its package, set the key it waits on"""
+    if serialize is None:
+        serialize = str_to_bool(helpers.get_package_opts(itself).get(SERIALIZE_OPTION, False))
+    if serialize:
+        event.serial_key = get_key(event)
+
+
+def _fire_yielded(itself, evt, val):
+    """On the FunctionWorker thread, fire the event for a StatusMessage, Event or FunctionError yielded by a function"""
+    if isinstance(val, StatusMessage):
+        # Fire the wrapped status message event to notify resilient
+        LOG.info("[%s] StatusMessage: %s", evt.name, val)
+        itself.fire(StatusMessageEvent(parent=evt, message=val.text))
+    elif isinstance(val, Event):
+        # Some other event, just fire it
+        LOG.debug(val)
+        itself.fire(val)
+    elif isinstance(val, FunctionError_):
+        LOG.error("[%s] FunctionError: %s", evt.name, val)
+        itself.fire(FunctionErrorEvent(parent=evt, message=str(val)))
+        evt.success = False
+
+
+def _invoke_function(func, itself, evt, args, kwargs, on_yield):
+    """
+    Call a :func:`function` handler, and handle a single or generator result.
+    Runs on a FunctionWorker thread, or in a worker process if the function's executor is ``process``.
+
+    :param on_yield: called with each StatusMessage, Event or FunctionError the handler yields
+    :return: the FunctionResults and other values it yielded
+    """
+    LOG.debug("%s: _call_the_task", threading.currentThread().name)
+    result_list = []
+    task_result_or_gen = func(itself, evt, *args, **kwargs)
+    if not isinstance(task_result_or_gen, GeneratorType):
+        task_result_or_gen = [task_result_or_gen]
+    for val in task_result_or_gen:
+        if isinstance(val, StatusMessage):
+            on_yield(val)
+        elif isinstance(val, FunctionResult):
+            # Collect the result for return
+            LOG.debug("[%s] FunctionResult: %s", evt.name, val)
+            val.name = evt.name
+            result_list.append(val)
+        elif isinstance(val, Event):
+            on_yield(val)
+        elif isinstance(val, FunctionError_):
+            on_yield(val)
+            return  # Don't wait for more results!
+        elif isinstance(val, Exception):
+            raise val
+        else:
+            # Whatever this is, add it to the results
+            LOG.debug(val)
+            result_list.append(val)
+    return result_list
+
+
+def _invoke_app_function(fn, itself, evt, args, kwargs, on_yield):
+    """
+    The code to call when a function with the decorator `@app_function(api_name)`
+    is invoked. Runs on a FunctionWorker thread, or in a worker process if the function's executor is ``process``.
+
+    Returns result_list when function with the decorator `@app_function(api_name)` is
+    finished processing.
+
+    A method that has this handler should yield a StatusMessage or a FunctionResult
+        -   When a StatusMessage is yield'ed it is passed to on_yield, which fires a StatusMessageEvent with its text
+        -   When a FunctionResult is yield'ed it calls resilient-lib.ResultPayload.done() with the parameters of
+            FunctionResult being passed to it and appends the result to result_list. E.g:
+                `yield FunctionResult({"key":"value"})`
+                `yield FunctionResult({"key": "value"}, success=False, reason="Bad call")`
+
+    :param evt: The Event with the StompFrame and the Message read off the Message Destination
+    :type evt: resilient_circuits.action_message.FunctionMessage
+    :param kwargs: the function's inputs
+    :param on_yield: called with each StatusMessage the function yields
+    """
+    LOG.debug("Running _invoke_app_function in Thread: %s", threading.currentThread().name)
+
+    result_list = []
+
+    # Validate the fn_inputs in the Message
+    fn_inputs = validate_fields([], kwargs)
+    LOG.info("[%s] Validated function inputs", evt.name)
+    LOG.debug("[%s] fn_inputs: %s", evt.name, fn_inputs)
+
+    rp = ResultPayload(itself.PACKAGE_NAME, version=constants.APP_FUNCTION_PAYLOAD_VERSION, **fn_inputs)
+
+    fn_inputs_tuple = namedtuple("fn_inputs", fn_inputs.keys())(*fn_inputs.values())
+
+    # Set evt.message in local thread storage
+    itself.set_fn_msg(evt.message)
+
+    # Invoke the actual Function
+    fn_results = fn(itself, fn_inputs_tuple)
+
+    for r in fn_results:
+        if isinstance(r, StatusMessage):
+            on_yield(r)
+
+        elif isinstance(r, FunctionResult):
+            r.name = evt.name
+            r.value = rp.done(
+                content=r.value,
+                success=r.success,
+                reason=r.reason)
+            LOG.info("[%s] Returning results", r.name)
+            result_list.append(r)
+
+        elif isinstance(r, Exception):
+            raise r
+
+        else:
+            # Whatever this is, add it to the results
+            LOG.debug(r)
+            result_list.append(r)
+
+    return result_list
+
+
+def _call_function(invoke, itself, method_name, executor, evt, args, kwargs):
+    """On the FunctionWorker thread, call a function handler here or in a worker process"""
+    def on_yield(val):
+        _fire_yielded(itself, evt, val)
+
+    if get_executor(itself, executor) == EXECUTOR_PROCESS:
+        return get_process_executor(itself.opts).run(itself, method_name, evt, args, kwargs, on_yield)
+    return invoke(itself, evt, args, kwargs, on_yield)
+
+
+def _wait_for_task(itself, the_task):
+    ret = yield itself.wait(the_task)
+    # Return value is the result_list that was yielded from the wrapped function
+    yield ret.value
+
+
+def _call_task(itself, the_task):
+    """
+    Fire a task at the FunctionWorker, and return a generator for the handler to wait for its result.
+
+    The task is fired when the handler is called, rather than when circuits first runs the handler's
+    generator, so that tasks reach the FunctionWorker in the order their messages arrived
+    """
+    itself.fire(the_task, "functionworker")
+    return _wait_for_task(itself, the_task)
+
 
 class function(object):
     """Creates a Function Handler.
@@ -30,6 +194,14 @@ class function(object):
     It marks the method as a handler for the events passed as arguments to the :func:`function` decorator.
     Specify the function's API name as parameter to the decorator.
     The function handler will automatically be subscribed to the function's message destination.
+
+    Pass ``executor="process"`` to run a CPU-bound handler in a pool of worker processes
+    instead of on a FunctionWorker thread, or set ``executor=process`` in the app.config
+    section of the component's package.
+
+    Pass ``serialize=True``, or set ``serialize=true`` in that section, so that messages for the
+    same incident run one at a time, in the order they arrived, while messages for different
+    incidents run in parallel. Pass ``get_key_func`` to serialize by a different key, as for :class:`debounce`.
     """
     # This is an extended version of circuits.core.handlers:handler
 
@@ -38,6 +210,8 @@ class function(object):
             raise ValueError("Usage: @function(api_name)")
         self.names = args
         self.kwargs = kwargs
+        if kwargs.get("executor") is not None:
+            check_executor(kwargs["executor"])
 
     def __call__(self, func):
         """Called at decoration time, with the bare function being decorated"""
@@ -62,54 +236,26 @@ class function(object):
             del args[0]
         func.event = getattr(func, "event", bool(args and args[0] == "event"))
 
+        executor = self.kwargs.get("executor")
+        serialize = self.kwargs.get("serialize")
+        get_key = self.kwargs.get("get_key_func", serialize_get_incident_key)
+        invoke = partial(_invoke_function, func)
+
         @wraps(func)
         def decorated(itself, event, *args, **kwargs):
             """the decorated function"""
             LOG.debug("decorated")
             function_parameters = event.message.get("inputs", {})
-
-            def _the_task(event, *args, **kwargs):
-                return func(itself, event, *args, **kwargs)
+            _set_serial_key(itself, event, serialize, get_key)
 
             def _call_the_task(evt, **kwds):
-                # On the worker thread, call the function, and handle a single or generator result.
-                LOG.debug("%s: _call_the_task", threading.currentThread().name)
-                result_list = []
-                task_result_or_gen = _the_task(evt, *args, **kwds)
-                if not isinstance(task_result_or_gen, GeneratorType):
-                    task_result_or_gen = [task_result_or_gen]
-                for val in task_result_or_gen:
-                    if isinstance(val, StatusMessage):
-                        # Fire the wrapped status message event to notify resilient
-                        LOG.info("[%s] StatusMessage: %s", evt.name, val)
-                        itself.fire(StatusMessageEvent(parent=evt, message=val.text))
-                    elif isinstance(val, FunctionResult):
-                        # Collect the result for return
-                        LOG.debug("[%s] FunctionResult: %s", evt.name, val)
-                        val.name = evt.name
-                        result_list.append(val)
-                    elif isinstance(val, Event):
-                        # Some other event, just fire it
-                        LOG.debug(val)
-                        itself.fire(val)
-                    elif isinstance(val, FunctionError_):
-                        LOG.error("[%s] FunctionError: %s", evt.name, val)
-                        itself.fire(FunctionErrorEvent(parent=evt, message=str(val)))
-                        evt.success = False
-                        return  # Don't wait for more results!
-                    elif isinstance(val, Exception):
-                        raise val
-                    else:
-                        # Whatever this is, add it to the results
-                        LOG.debug(val)
-                        result_list.append(val)
-                return result_list
+                return _call_function(invoke, itself, func.__name__, executor, evt, args, kwds)
 
             the_task = task(_call_the_task, event, **function_parameters)
-            ret = yield itself.call(the_task, "functionworker")
-            xxx = ret.value
-            # Return value is the result_list that was yielded from the wrapped function
-            yield xxx
+            return _call_task(itself, the_task)
+
+        decorated.executor = executor
+        decorated.invoke = invoke
         return decorated
 
 
@@ -197,6 +343,15 @@ class app_function(object):
     Specify the function's API name as parameter to the decorator. **It only accepts 1** ``api_name`` **as an argument.**
 
     The function handler will automatically be subscribed to the function's ``message destination``.
+
+    Pass ``executor="process"`` to run a CPU-bound function in a pool of worker processes
+    instead of on a FunctionWorker thread, or set ``executor=process`` in the app.config
+    section of the App. Its ``fn_inputs``, StatusMessages and FunctionResults are passed
+    between the processes, and each worker process has its own REST client.
+
+    Pass ``serialize=True``, or set ``serialize=true`` in the App's section, so that messages for the
+    same incident run one at a time, in the order they arrived, while messages for different
+    incidents run in parallel. Pass ``get_key_func`` to serialize by a different key, as for :class:`debounce`.
     """
 
     def __init__(self, *args, **kwargs):
@@ -204,6 +359,8 @@ class app_function(object):
             raise ValueError("Usage: @app_function(api_name)")
         self.names = args
         self.kwargs = kwargs
+        if kwargs.get("executor") is not None:
+            check_executor(kwargs["executor"])
 
     def __call__(self, fn):
         """
@@ -222,6 +379,11 @@ class app_function(object):
         fn.override = self.kwargs.get("override", False)
         fn.event = True
 
+        executor = self.kwargs.get("executor")
+        serialize = self.kwargs.get("serialize")
+        get_key = self.kwargs.get("get_key_func", serialize_get_incident_key)
+        invoke = partial(_invoke_app_function, fn)
+
         @wraps(fn)
         def app_function_decorator(itself, event, *args, **kwargs):
             """
@@ -233,72 +395,16 @@ class app_function(object):
             :type event: resilient_circuits.action_message.FunctionMessage
             """
             function_inputs = event.message.get("inputs", {})
+            _set_serial_key(itself, event, serialize, get_key)
 
-            def _invoke_app_function(evt, **kwds):
-                """
-                The code to call when a function with the decorator `@app_function(api_name)`
-                is invoked.
-
-                Returns result_list when function with the decorator `@app_function(api_name)` is
-                finished processing.
-
-                A method that has this handler should yield a StatusMessage or a FunctionResult
-                    -   When a StatusMessage is yield'ed a StatusMessageEvent is fired with the text of the StatusMessage
-                    -   When a FunctionResult is yield'ed it calls resilient-lib.ResultPayload.done() with the parameters of
-                        FunctionResult being passed to it and appends the result to result_list. E.g:
-                            `yield FunctionResult({"key":"value"})`
-                            `yield FunctionResult({"key": "value"}, success=False, reason="Bad call")`
-
-                :param evt: The Event with the StompFrame and the Message read off the Message Destination
-                :type fn: resilient_circuits.action_message.FunctionMessage
-                """
-                LOG.debug("Running _invoke_app_function in Thread: %s", threading.currentThread().name)
-
-                result_list = []
-
-                # Validate the fn_inputs in the Message
-                fn_inputs = validate_fields([], kwds)
-                LOG.info("[%s] Validated function inputs", evt.name)
-                LOG.debug("[%s] fn_inputs: %s", evt.name, fn_inputs)
-
-                rp = ResultPayload(itself.PACKAGE_NAME, version=constants.APP_FUNCTION_PAYLOAD_VERSION, **fn_inputs)
-
-                fn_inputs_tuple = namedtuple("fn_inputs", fn_inputs.keys())(*fn_inputs.values())
-
-                # Set evt.message in local thread storage
-                itself.set_fn_msg(evt.message)
-
-                # Invoke the actual Function
-                fn_results = fn(itself, fn_inputs_tuple)
-
-                for r in fn_results:
-                    if isinstance(r, StatusMessage):
-                        LOG.info("[%s] StatusMessage: %s", evt.name, r)
-                        itself.fire(StatusMessageEvent(parent=evt, message=r.text))
-
-                    elif isinstance(r, FunctionResult):
-                        r.name = evt.name
-                        r.value = rp.done(
-                            content=r.value,
-                            success=r.success,
-                            reason=r.reason)
-                        LOG.info("[%s] Returning results", r.name)
-                        result_list.append(r)
-
-                    elif isinstance(r, Exception):
-                        raise r
-
-                    else:
-                        # Whatever this is, add it to the results
-                        LOG.debug(r)
-                        result_list.append(r)
-
-                return result_list
+            def _call_app_function(evt, **kwds):
+                return _call_function(invoke, itself, fn.__name__, executor, evt, (), kwds)
 
-            invoke_app_function = task(_invoke_app_function, event, **function_inputs)
-            fn_result = yield itself.call(invoke_app_function, channels="functionworker")
-            yield fn_result.value
+            invoke_app_function = task(_call_app_function, event, **function_inputs)
+            return _call_task(itself, invoke_app_function)
 
+        app_function_decorator.executor = executor
+        app_function_decorator.invoke = invoke
         return app_function_decorator
 
 
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+"""Bounded, prioritized queue of the tasks waiting for a FunctionWorker"""
+
+import heapq
+import itertools
+import logging
+import time
+from collections import defaultdict, deque
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_DISPATCH_QUEUE_SIZE = 1000
+
+
+def parse_dispatch_option(value, option_name):
+    """
+    Parse an app.config option in the format ``name=int, name=int`` into a dict,
+    where each name is a function or message destination API name, for example::
+
+        dispatch_priorities = fn_urgent_lookup=10, fn_bulk_export=-5
+
+    :param value: the value of the option from app.config
+    :type value: str
+    :param option_name: name of the option, used in the error message
+    :type option_name: str
+    :return: dict of name to int
+    :rtype: dict
+    :raises ValueError: if an item is not in the format ``name=int``
+    """
+    settings = {}
+    if not value:
+        return settings
+
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, number = item.partition("=")
+        try:
+            settings[name.strip()] = int(number)
+        except ValueError:
+            raise ValueError(u"'{0}' in {1} must be in the format name=int".format(item.strip(), option_name))
+    return settings
+
+
+class DispatchEntry(object):
+    """A task waiting for, or running on, a FunctionWorker"""
+
+    def __init__(self, f, args, kwargs, keys, priority, serial_key=None):
+        self.f = f
+        self.args = args
+        self.kwargs = kwargs
+        self.keys = keys
+        self.priority = priority
+        self.serial_key = serial_key
+        self.wait_state = None
+        self.value = None
+        self.error = None
+        self.queued_at = time.time()
+
+
+class DispatchQueue(object):
+    """
+    Holds the tasks fired at the FunctionWorker until a worker is free to run them.
+
+    * Tasks are started in order of priority, then in the order they arrived
+    * A task only starts if every one of its keys (function name and message destination)
+      is below its concurrency limit, so one slow function can't tie up every worker
+    * Tasks with the same serial key (e.g. the same incident) run one at a time, in the order
+      they arrived, while tasks with different serial keys run in parallel
+    * The queue is bounded: when ``max_size`` tasks are waiting it reports :attr:`full`
+      and the caller should stop taking in new work until it drains
+
+    The queue is not thread-safe: it is only used from the circuits event loop.
+
+    :param max_size: number of waiting tasks at which the queue is full. 0 for unbounded
+    :type max_size: int
+    :param priorities: dict of function or message destination name to priority.
+        Higher numbers run first. The default priority is 0
+    :type priorities: dict
+    :param concurrency_limits: dict of function or message destination name to the maximum
+        number of its tasks that can run at the same time
+    :type concurrency_limits: dict
+    """
+
+    def __init__(self, max_size=DEFAULT_DISPATCH_QUEUE_SIZE, priorities=None, concurrency_limits=None):
+        self.max_size = max_size or 0
+        self.priorities = priorities or {}
+        self.concurrency_limits = concurrency_limits or {}
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._running = defaultdict(int)
+        self._waiting = defaultdict(int)
+        self._serial_waiting = defaultdict(deque)
+        self._serial_running = set()
+        self.running = 0
+        self.dispatched = 0
+        self.max_waiting = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    @property
+    def full(self):
+        """True if ``max_size`` or more tasks are waiting"""
+        return bool(self.max_size) and len(self._heap) >= self.max_size
+
+    @property
+    def drained(self):
+        """True once the waiting tasks are down to half of ``max_size``"""
+        return not self.max_size or len(self._heap) <= self.max_size // 2
+
+    def put(self, f, args, kwargs, keys=(), serial_key=None):
+        """
+        Add a task to the queue
+
+        :param f: the function to run on the worker
+        :param args: positional arguments for f
+        :param kwargs: keyword arguments for f
+        :param keys: names the task is limited and prioritized by, e.g. function name and message destination
+        :type keys: tuple
+        :param serial_key: if set, the task waits for the earlier tasks with the same serial key to complete
+        :return: the entry, whose ``value`` or ``error`` is set once it has run
+        :rtype: DispatchEntry
+        """
+        keys = tuple(key for key in keys if key)
+        priority = max([self.priorities[key] for key in keys if key in self.priorities] or [0])
+        entry = DispatchEntry(f, args, kwargs, keys, priority, serial_key)
+
+        heapq.heappush(self._heap, (-priority, next(self._counter), entry))
+        for key in keys:
+            self._waiting[key] += 1
+        if serial_key is not None:
+            self._serial_waiting[serial_key].append(entry)
+        self.max_waiting = max(self.max_waiting, len(self._heap))
+        return entry
+
+    def _can_run(self, entry):
+        if entry.serial_key is not None:
+            # Only the first waiting task of a serial key can start, and only once the one before it is done
+            if entry.serial_key in self._serial_running or self._serial_waiting[entry.serial_key][0] is not entry:
+                return False
+        for key in entry.keys:
+            limit = self.concurrency_limits.get(key)
+            if limit and self._running[key] >= limit:
+                return False
+        return True
+
+    def pop(self):
+        """
+        Remove and return the highest priority task that is within its concurrency limits,
+        or None if there is no such task. The caller must call :meth:`task_done` when it completes.
+
+        :rtype: DispatchEntry
+        """
+        skipped = []
+        entry = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            if self._can_run(item[2]):
+                entry = item[2]
+                break
+            skipped.append(item)
+
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+
+        if entry:
+            self.running += 1
+            self.dispatched += 1
+            for key in entry.keys:
+                self._waiting[key] -= 1
+                self._running[key] += 1
+            if entry.serial_key is not None:
+                waiting = self._serial_waiting[entry.serial_key]
+                waiting.popleft()
+                if not waiting:
+                    del self._serial_waiting[entry.serial_key]
+                self._serial_running.add(entry.serial_key)
+        return entry
+
+    def task_done(self, entry):
+        """Record that a task returned from :meth:`pop` has completed"""
+        self.running -= 1
+        for key in entry.keys:
+            self._running[key] -= 1
+        self._serial_running.discard(entry.serial_key)
+
+    def oldest_wait(self, now=None):
+        """The number of seconds the longest-waiting task has waited, or 0 if no tasks are waiting"""
+        if not self._heap:
+            return 0
+        return (now or time.time()) - min(item[2].queued_at for item in self._heap)
+
+    def get_stats(self):
+        """
+        Get the current state of the queue
+
+        :return: counts of the ``waiting`` and ``running`` tasks, overall, for each key
+            and for each serial key that has tasks
+        :rtype: dict
+        """
+        keys = set(key for key, count in self._waiting.items() if count) | \
+            set(key for key, count in self._running.items() if count)
+        serial_keys = set(self._serial_waiting) | self._serial_running
+        return {
+            "max_size": self.max_size,
+            "waiting": len(self._heap),
+            "max_waiting": self.max_waiting,
+            "running": self.running,
+            "dispatched": self.dispatched,
+            "keys": dict((key, {"waiting": self._waiting[key], "running": self._running[key]}) for key in keys),
+            "serial_keys": dict((key, {"waiting": len(self._serial_waiting.get(key, ())),
+                                       "running": int(key in self._serial_running)}) for key in serial_keys)
+        }
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+"""The function definitions of the SOAR org, fetched once and shared by all components"""
+
+import logging
+import threading
+
+LOG = logging.getLogger(__name__)
+
+FUNCTIONS_URI = "/functions?handle_format=names"
+FUNCTION_URI = "/functions/{0}?handle_format=names"
+
+function_registry = None
+_registry_lock = threading.Lock()
+
+
+class FunctionRegistry(object):
+    """
+    Function definitions, indexed by name.
+
+    All the definitions are read in one ``/functions`` listing the first time one is needed,
+    instead of one GET for each function. A function that is not in the listing, for example
+    one created since a cached listing was saved, is fetched on its own.
+
+    :param base_url: the SOAR server's URL
+    :type base_url: str
+    :param org_id: the org's ID
+    :type org_id: int
+    """
+
+    def __init__(self, base_url, org_id):
+        self.key = (base_url, org_id)
+        self._lock = threading.Lock()
+        self._functions = None
+
+    def _load(self, cached_get):
+        # Called with the lock held
+        if self._functions is None:
+            listing = cached_get(FUNCTIONS_URI)
+            self._functions = dict((fn["name"], fn) for fn in listing.get("entities", []))
+            LOG.debug("Read %d function definitions", len(self._functions))
+
+    def load(self, cached_get):
+        """Read the listing of function definitions, if not read already"""
+        with self._lock:
+            self._load(cached_get)
+
+    def get(self, fn_name, cached_get):
+        """
+        Get the definition of a function
+
+        :param fn_name: API name of the function
+        :type fn_name: str
+        :param cached_get: called with a URI to GET it, e.g. ``SimpleClient.cached_get``
+        :type cached_get: function
+        :return: the function definition, with its ``destination_handle``
+        :rtype: dict
+        :raises SimpleHTTPException: if the function is not defined, or the server has no functions
+        """
+        with self._lock:
+            self._load(cached_get)
+            fn = self._functions.get(fn_name)
+            if fn is None:
+                LOG.debug("Function '%s' is not in the listing, getting it on its own", fn_name)
+                fn = self._functions[fn_name] = cached_get(FUNCTION_URI.format(fn_name))
+            return fn
+
+
+def get_function_registry(client):
+    """
+    Get the function registry for the SOAR server and org the client is connected to
+
+    :param client: connected REST client
+    :type client: resilient.SimpleClient
+    :rtype: FunctionRegistry
+    """
+    global function_registry
+    with _registry_lock:
+        if function_registry is None or function_registry.key != (client.base_url, client.org_id):
+            function_registry = FunctionRegistry(client.base_url, client.org_id)
+        return function_registry
+
+
+def reset_function_registry():
+    """Read the function definitions again the next time one is needed, e.g. after a reload"""
+    global function_registry
+    function_registry = None
@@ -335,6 +335,20 @@ def is_this_a_selftest(component):
     return bool(component.parent.name == "App" and component.parent.IS_SELFTEST)
 
 
+def get_package_opts(component):
+    """
+    Get the app.config section of a component's package: the section named by its
+    ``PACKAGE_NAME`` if it is an AppFunctionComponent, else by the top-level package of its module
+
+    :param component: the current component that is calling this method (usually 'self')
+    :type component: resilient_circuits.ResilientComponent
+    :return: the options in the section, or an empty dict if there is no such section
+    :rtype: dict
+    """
+    section = getattr(component, "PACKAGE_NAME", None) or type(component).__module__.split(".")[0]
+    return component.opts.get(section) or {}
+
+
 def should_timeout(start_time, timeout_value):
     """
     Returns True if the delta between the
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+"""Keeps the SOAR type metadata that components read at startup in a file, so restarts and reloads don't fetch it again"""
+
+import functools
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from resilient import ensure_unicode
+
+LOG = logging.getLogger(__name__)
+
+METADATA_CACHE_DIR = "metadata_cache_dir"
+# Seconds to wait for more entries to be fetched before writing the file
+SAVE_DELAY = 1.0
+
+# Type metadata URIs that every ResilientComponent reads
+TYPE_URIS = ("/types/incident/fields", "/types/actioninvocation/fields", "/types/__function/fields")
+
+metadata_cache = None
+# The connection the metadata_cache is for, or that has no cache because its server version is not known
+_cache_key = None
+_cache_lock = threading.Lock()
+# Type metadata read once by the ComponentLoader, and shared by the components it constructs,
+# for each server and org
+_prefetched = {}
+
+
+def _get_server_version(client):
+    """The version of the SOAR server, e.g. ``43.1.49``"""
+    version = client.get_const().get("server_version") or {}
+    return version.get("version") or u"{0}.{1}.{2}".format(version.get("major"), version.get("minor"),
+                                                          version.get("build_number"))
+
+
+class MetadataCache(object):
+    """
+    Type metadata (fields and function definitions) read from one SOAR org, kept in a file
+    named for the server, org and server version.
+
+    Cached entries are returned straight away, and fetched again on a background thread
+    (once per process, and again after :meth:`revalidate_all`). If one has changed on the server
+    it is updated, so components that are loaded or reloaded later get the new definition.
+
+    :param cache_dir: directory to keep the files in
+    :type cache_dir: str
+    :param base_url: the SOAR server's URL
+    :type base_url: str
+    :param org_id: the org's ID
+    :type org_id: int
+    :param server_version: the SOAR server version
+    :type server_version: str
+    :param get_client: called on the background thread to get a connected REST client
+    :type get_client: function
+    """
+
+    def __init__(self, cache_dir, base_url, org_id, server_version, get_client):
+        self.key = (cache_dir, base_url, org_id, server_version)
+        self.server_version = server_version
+        self.get_client = get_client
+        host = re.sub(r"[^\w.-]+", "_", re.sub(r"^\w+://", "", base_url)).strip("_")
+        self.path = os.path.join(os.path.expanduser(cache_dir),
+                                 u"{0}_org{1}_{2}.json".format(host, org_id, server_version))
+
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._validated = set()
+        self._pending = deque()
+        self._dirty = False
+        self._thread = None
+        self.fetched = 0
+        self.updated = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            LOG.debug("No metadata cache at %s", self.path)
+            return
+        try:
+            with io.open(self.path, encoding="utf-8") as cache_file:
+                self._entries = json.load(cache_file)["entries"]
+            LOG.info("Loaded %d cached type metadata entries from %s", len(self._entries), self.path)
+        except Exception as err:
+            LOG.warning("Ignoring the metadata cache at %s: %s", self.path, err)
+            self._entries = {}
+
+    def save(self):
+        """Write the entries to the file"""
+        with self._lock:
+            self._dirty = False
+            data = {"server_version": self.server_version, "entries": dict(self._entries)}
+        try:
+            directory = os.path.dirname(self.path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            # Write a new file then rename it, so another instance never reads part of the file
+            temp_path = u"{0}.{1}.tmp".format(self.path, os.getpid())
+            with io.open(temp_path, "w", encoding="utf-8") as cache_file:
+                cache_file.write(ensure_unicode(json.dumps(data)))
+            getattr(os, "replace", os.rename)(temp_path, self.path)
+            LOG.debug("Saved %d type metadata entries to %s", len(data["entries"]), self.path)
+        except (IOError, OSError) as err:
+            LOG.warning("Unable to save the metadata cache to %s: %s", self.path, err)
+
+    def get(self, client, uri):
+        """
+        Get a type metadata URI from the cache, or from SOAR if it is not cached
+
+        :param client: connected REST client to fetch it with, if it is not cached
+        :type client: resilient.SimpleClient
+        :param uri: URI relative to the org, e.g. ``/types/incident/fields``
+        :type uri: str
+        :return: the value returned by SOAR
+        :raises SimpleHTTPException: if it is not cached and fetching it fails
+        """
+        with self._lock:
+            if uri in self._entries:
+                if uri not in self._validated:
+                    self._validated.add(uri)
+                    self._schedule(uri)
+                return self._entries[uri]
+
+        value = client.get(uri)
+        with self._lock:
+            self.fetched += 1
+            self._entries[uri] = value
+            self._validated.add(uri)
+            self._dirty = True
+            self._schedule()
+        return value
+
+    def revalidate_all(self):
+        """Fetch each entry again in the background the next time it is read, e.g. on a reload"""
+        with self._lock:
+            self._validated.clear()
+
+    def _schedule(self, uri=None):
+        # Called with the lock held
+        if uri is not None:
+            self._pending.append(uri)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="MetadataCache")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        """On the background thread, fetch the entries that were read from the cache and save any changes"""
+        while True:
+            with self._lock:
+                uri = self._pending.popleft() if self._pending else None
+                if uri is None and not self._dirty:
+                    self._thread = None
+                    return
+            if uri is not None:
+                self._revalidate(uri)
+            else:
+                # Let the entries fetched while components load collect, and write them once
+                time.sleep(SAVE_DELAY)
+                with self._lock:
+                    waiting = bool(self._pending)
+                if not waiting:
+                    self.save()
+
+    def _revalidate(self, uri):
+        try:
+            value = self.get_client().get(uri)
+        except Exception as err:
+            LOG.warning("Unable to check the cached type metadata %s: %s", uri, err)
+            return
+
+        with self._lock:
+            if self._entries.get(uri) != value:
+                LOG.info("Type metadata %s has changed in SOAR. Updating the cache", uri)
+                self.updated += 1
+                self._entries[uri] = value
+                self._dirty = True
+
+    def join(self, timeout=None):
+        """Wait for the background thread to finish checking and saving the entries"""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+def get_metadata_cache(opts, client):
+    """
+    Get the cache for the SOAR server and org the client is connected to, if ``metadata_cache_dir`` is set
+
+    :param opts: all configurations from the ``app.config`` file
+    :type opts: dict
+    :param client: connected REST client
+    :type client: resilient.SimpleClient
+    :return: the cache, or None if it is turned off or the server version is not known
+    :rtype: MetadataCache
+    """
+    global metadata_cache, _cache_key
+
+    cache_dir = (opts.get("resilient") or {}).get(METADATA_CACHE_DIR)
+    if not cache_dir:
+        return None
+
+    key = (cache_dir, client.base_url, client.org_id)
+    # Components may be constructed on several threads at once: only one of them checks the server version
+    with _cache_lock:
+        if key == _cache_key:
+            return metadata_cache
+
+        _cache_key = key
+        try:
+            server_version = _get_server_version(client)
+        except Exception as err:
+            LOG.warning("Not using the metadata cache, unable to get the SOAR server version: %s", err)
+            metadata_cache = None
+            return None
+
+        if metadata_cache is not None and metadata_cache.key == key + (server_version,):
+            # The same server version, e.g. after a reload: keep the entries, and check them again in the background
+            metadata_cache.revalidate_all()
+        else:
+            from resilient_circuits.rest_helper import get_resilient_client
+            metadata_cache = MetadataCache(cache_dir, client.base_url, client.org_id, server_version,
+                                           lambda: get_resilient_client(opts))
+        return metadata_cache
+
+
+def reset_metadata_cache():
+    """Check the server version again the next time the cache is used, e.g. after a reload"""
+    global _cache_key
+    with _cache_lock:
+        _cache_key = None
+
+
+def get_cached_get(opts, client):
+    """
+    Get the function components use to read type metadata: from what the ComponentLoader prefetched,
+    else from the metadata cache if ``metadata_cache_dir`` is set, else from the client's own cache
+
+    :param opts: all configurations from the ``app.config`` file
+    :type opts: dict
+    :param client: connected REST client
+    :type client: resilient.SimpleClient
+    :return: a function that takes a URI and returns the value SOAR returns for it
+    :rtype: function
+    """
+    cache = get_metadata_cache(opts, client)
+    fetch = functools.partial(cache.get, client) if cache else client.cached_get
+
+    prefetched = _prefetched.get((client.base_url, client.org_id))
+    if not prefetched:
+        return fetch
+
+    def cached_get(uri):
+        value = prefetched.get(uri)
+        return fetch(uri) if value is None else value
+    return cached_get
+
+
+def prefetch(opts, client, uris=TYPE_URIS):
+    """
+    Read type metadata once, so the components constructed next share it rather than each
+    client reading it. URIs that can't be read are left for each component to read and handle
+
+    :param opts: all configurations from the ``app.config`` file
+    :type opts: dict
+    :param client: connected REST client
+    :type client: resilient.SimpleClient
+    :param uris: the URIs to read
+    :type uris: list
+    :return: the function to read other type metadata with, see :func:`get_cached_get`
+    :rtype: function
+    """
+    cached_get = get_cached_get(opts, client)
+    prefetched = _prefetched.setdefault((client.base_url, client.org_id), {})
+    for uri in uris:
+        try:
+            prefetched[uri] = cached_get(uri)
+        except Exception as err:
+            LOG.debug("Unable to prefetch %s: %s", uri, err)
+    return cached_get
+
+
+def clear_prefetched():
+    """Stop sharing the prefetched type metadata, once the components are constructed"""
+    _prefetched.clear()
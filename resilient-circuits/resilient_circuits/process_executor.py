@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+"""Runs function handlers in a pool of worker processes, so CPU-bound functions can use more than one core"""
+
+import importlib
+import itertools
+import logging
+import multiprocessing
+import threading
+import traceback
+from six.moves import cPickle as pickle
+from six.moves import queue
+from six import string_types
+from resilient_circuits import helpers, rest_helper
+from resilient_circuits.action_message import FunctionMessage
+
+LOG = logging.getLogger(__name__)
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+EXECUTORS = (EXECUTOR_THREAD, EXECUTOR_PROCESS)
+EXECUTOR_OPTION = "executor"
+NUM_PROCESSES = "num_processes"
+
+PROCESS_LOG_FORMAT = "%(asctime)s %(levelname)s [%(processName)s %(module)s] %(message)s"
+
+# Kinds of message sent from a worker process to the FunctionWorker thread waiting for it
+_YIELD = "yield"
+_DONE = "done"
+_ERROR = "error"
+
+process_executor = None
+
+# Set in each worker process by _init_process
+_process_opts = None
+_process_results = None
+_process_components = {}
+
+
+def check_executor(executor):
+    """
+    Check the name of an executor
+
+    :param executor: ``thread`` or ``process``
+    :type executor: str
+    :return: the executor, in lower case
+    :rtype: str
+    :raises ValueError: if it is not a known executor
+    """
+    if not isinstance(executor, string_types) or executor.strip().lower() not in EXECUTORS:
+        raise ValueError(u"executor must be one of {0}, not '{1}'".format(", ".join(EXECUTORS), executor))
+    return executor.strip().lower()
+
+
+def get_executor(component, executor=None):
+    """
+    Get how a function handler of a component is run.
+
+    The ``executor`` given to the :func:`function` or :func:`app_function` decorator is used if set,
+    else ``executor`` in the app.config section of the component's package, else ``thread``
+
+    :param component: the component the function handler belongs to
+    :type component: resilient_circuits.ResilientComponent
+    :param executor: the ``executor`` given to the decorator
+    :type executor: str
+    :return: ``thread`` or ``process``
+    :rtype: str
+    """
+    if executor is None:
+        executor = helpers.get_package_opts(component).get(EXECUTOR_OPTION) or EXECUTOR_THREAD
+    return check_executor(executor)
+
+
+def has_process_functions(component):
+    """True if any of the component's function handlers run in a worker process"""
+    return any(get_executor(component, getattr(h, "executor", None)) == EXECUTOR_PROCESS
+               for h in component.handlers() if getattr(h, "invoke", None))
+
+
+def _init_process(opts, results, modules):
+    """In each new worker process: import the function modules, and make it connect a REST client of its own"""
+    global _process_opts, _process_results
+
+    _process_opts = opts
+    _process_results = results
+
+    logging.basicConfig(format=PROCESS_LOG_FORMAT)
+    logging.getLogger().setLevel(getattr(logging, str(opts.get("loglevel", "INFO")).upper(), logging.INFO))
+
+    rest_helper.reset_resilient_client()
+    for module_name in modules:
+        importlib.import_module(module_name)
+
+
+def _get_component(module_name, class_name):
+    """In a worker process, get its own instance of a component, constructing it on first use"""
+    key = (module_name, class_name)
+    component = _process_components.get(key)
+    if component is None:
+        LOG.debug("Constructing %s.%s", module_name, class_name)
+        cls = getattr(importlib.import_module(module_name), class_name)
+        component = _process_components[key] = cls(_process_opts)
+    return component
+
+
+def _picklable_error(err):
+    try:
+        pickle.dumps(err, pickle.HIGHEST_PROTOCOL)
+        return err
+    except Exception:
+        return Exception(u"{0}: {1}".format(type(err).__name__, err))
+
+
+def _run_in_process(call_id, module_name, class_name, method_name, headers, message, args, kwargs):
+    """In a worker process, run a function handler and send what it yields and returns to the parent process"""
+    def send(kind, value):
+        _process_results.put((call_id, kind, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+
+    try:
+        component = _get_component(module_name, class_name)
+        evt = FunctionMessage(headers=headers, message=message)
+        invoke = getattr(type(component), method_name).invoke
+        send(_DONE, invoke(component, evt, args, kwargs, lambda value: send(_YIELD, value)))
+    except Exception as err:
+        LOG.error(traceback.format_exc())
+        send(_ERROR, _picklable_error(err))
+
+
+class ProcessExecutor(object):
+    """
+    A pool of worker processes that run function handlers.
+
+    The processes are started straight away and import ``modules``, so they are ready
+    when the first function arrives. Each process constructs its own instance of a
+    component on first use, with its own REST client.
+
+    Function inputs and the message are sent to the process. The StatusMessages, Events
+    and FunctionErrors the handler yields, and its results, are sent back to the
+    FunctionWorker thread waiting for it, in order, so they must be picklable.
+
+    :param opts: all configurations from the ``app.config`` file
+    :type opts: dict
+    :param processes: number of worker processes. Defaults to the number of CPUs
+    :type processes: int
+    :param modules: names of the modules to import in each worker process
+    :type modules: list
+    """
+
+    def __init__(self, opts, processes=None, modules=()):
+        # Spawn rather than fork the processes, as the parent has STOMP and worker threads running
+        context = multiprocessing.get_context("spawn") if hasattr(multiprocessing, "get_context") else multiprocessing
+        self.processes = int(processes or multiprocessing.cpu_count())
+
+        self._results = context.Queue()
+        self._pool = context.Pool(self.processes, initializer=_init_process,
+                                  initargs=(opts, self._results, sorted(modules)))
+        self._calls = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._reader = threading.Thread(target=self._read_results, name="ProcessExecutorResults")
+        self._reader.daemon = True
+        self._reader.start()
+        LOG.info("Started %d worker processes for functions", self.processes)
+
+    def _read_results(self):
+        """Hand the messages from the worker processes to the calls waiting for them"""
+        while True:
+            try:
+                call_id, kind, data = self._results.get(timeout=1)
+            except queue.Empty:
+                with self._lock:
+                    if self._closed and not self._calls:
+                        return
+                continue
+
+            with self._lock:
+                call = self._calls.get(call_id)
+            if call is not None:
+                call.put((kind, data))
+
+    def run(self, component, method_name, evt, args, kwargs, on_yield):
+        """
+        Run a function handler in a worker process and wait for it to finish.
+        Called on the FunctionWorker thread that would otherwise have run it.
+
+        :param component: the component the function handler belongs to
+        :type component: resilient_circuits.ResilientComponent
+        :param method_name: name of the decorated method
+        :type method_name: str
+        :param evt: the function's message
+        :type evt: resilient_circuits.action_message.FunctionMessage
+        :param args: positional arguments for the handler
+        :param kwargs: the function's inputs
+        :param on_yield: called on this thread with each StatusMessage, Event or FunctionError the handler yields
+        :return: the handler's results
+        :rtype: list
+        :raises Exception: the exception raised by the handler
+        """
+        call = queue.Queue()
+        with self._lock:
+            call_id = next(self._counter)
+            self._calls[call_id] = call
+
+        try:
+            self._pool.apply_async(_run_in_process, (call_id, type(component).__module__, type(component).__name__,
+                                                     method_name, evt.kwargs.get("headers"), evt.message,
+                                                     args, kwargs))
+            while True:
+                kind, data = call.get()
+                value = pickle.loads(data)
+                if kind == _YIELD:
+                    on_yield(value)
+                elif kind == _ERROR:
+                    raise value
+                else:
+                    return value
+        finally:
+            with self._lock:
+                del self._calls[call_id]
+
+    def close(self):
+        """Stop taking new functions. The worker processes exit once the running ones have finished"""
+        with self._lock:
+            self._closed = True
+        self._pool.close()
+
+
+def start_process_executor(opts, modules=()):
+    """
+    Start the worker processes that are shared by all components, if not started already
+
+    :param opts: all configurations from the ``app.config`` file
+    :type opts: dict
+    :param modules: names of the modules to import in each worker process
+    :type modules: list
+    :return: the executor
+    :rtype: ProcessExecutor
+    """
+    global process_executor
+    if process_executor is None:
+        processes = (opts.get("resilient") or {}).get(NUM_PROCESSES)
+        process_executor = ProcessExecutor(opts, processes=processes, modules=modules)
+    return process_executor
+
+
+def get_process_executor(opts):
+    """Get the worker processes shared by all components, starting them if need be"""
+    return process_executor or start_process_executor(opts)
+
+
+def stop_process_executor():
+    """Stop the shared worker processes, so that new ones are started with the current configuration"""
+    global process_executor
+    if process_executor is not None:
+        process_executor.close()
+        process_executor = None
@@ -7,18 +7,148 @@
 import functools
 import logging
 import os
+import threading
 import resilient
 import time
+from six import string_types
+from six.moves import queue
 
 resilient_client = None
 connection_opts = None
+client_pool = None
+# Components may be constructed on several threads at once, see ComponentLoader
+_client_lock = threading.Lock()
 
 MAX_CONNECTION_RETRIES = "max_connection_retries"
+REST_CLIENT_POOL = "rest_client_pool"
+POOL_CHECKOUT_TIMEOUT = 1   # seconds a new thread waits for a pooled client before sharing the primary one
+
+LOG = logging.getLogger(__name__)
+
 
 def reset_resilient_client():
     """Reset the cached client"""
     global resilient_client
-    resilient_client = None
+    global client_pool
+    with _client_lock:
+        resilient_client = None
+        client_pool = None
+
+
+class _ClientLease(object):
+    """Holds a client checked out by a thread. The client is returned to its pool when the thread ends"""
+    def __init__(self, pool, client):
+        self.pool = pool
+        self.client = client
+
+    def __del__(self):
+        if self.pool is not None:
+            self.pool.checkin(self.client)
+
+
+class ResilientClientPool(object):
+    """
+    A bounded pool of connected SimpleClients.
+
+    The first client in the pool is the one returned by :func:`resilient.get_client`;
+    the others are clones of it, created on demand, that share its authentication
+    and connection pool but each have their own ``requests.Session``.
+    A 401 seen by any of them re-authenticates once for all of them.
+    """
+    def __init__(self, client, size):
+        self.primary = client
+        self.size = max(int(size), 1)
+        self._idle = queue.LifoQueue()
+        self._idle.put(client)
+        self._created = 1
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0
+        }
+
+    def checkout(self, timeout=None):
+        """
+        Take a client out of the pool, creating one if the pool has not reached its size.
+        If every client is in use, wait up to ``timeout`` seconds for one to be returned.
+
+        :return: a connected client, or None if none became free in time
+        """
+        start = time.time()
+        create = False
+        try:
+            client = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+            if create:
+                client = self.primary.clone()
+            else:
+                try:
+                    client = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    client = None
+
+        wait_time = time.time() - start
+        with self._lock:
+            if client is None:
+                self._stats["timeouts"] += 1
+            else:
+                self._stats["checkouts"] += 1
+            self._stats["total_wait_time"] += wait_time
+            self._stats["max_wait_time"] = max(self._stats["max_wait_time"], wait_time)
+
+        if not create and wait_time > 0.1:
+            LOG.debug("Waited %.3f secs for a REST client from the pool", wait_time)
+        return client
+
+    def checkin(self, client):
+        """Return a client to the pool"""
+        self._idle.put(client)
+
+    def get_thread_client(self):
+        """
+        Get the client for the calling thread, checking one out of the pool on first use.
+        The client stays with the thread and is returned to the pool when the thread ends.
+        A thread that cannot get its own client within POOL_CHECKOUT_TIMEOUT shares the primary one.
+        """
+        lease = getattr(self._local, "lease", None)
+        if lease is None:
+            client = self.checkout(timeout=POOL_CHECKOUT_TIMEOUT)
+            if client is None:
+                LOG.warning("All %s pooled REST clients are in use. Sharing the primary client with thread '%s'",
+                            self.size, threading.current_thread().name)
+                lease = _ClientLease(None, self.primary)
+            else:
+                lease = _ClientLease(self, client)
+            self._local.lease = lease
+        return lease.client
+
+    def get_stats(self):
+        """
+        Get the usage metrics of this pool.
+
+        :return: a dict with the pool ``size``, the number of clients ``created``, ``idle`` and ``in_use``,
+            the number of ``checkouts`` and ``timeouts``, the ``total_wait_time``, ``max_wait_time``
+            and ``avg_wait_time`` in seconds spent waiting for a client, and the ``http`` connection
+            reuse counters shared by the clients
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["created"] = self._created
+        stats["idle"] = self._idle.qsize()
+        stats["in_use"] = stats["created"] - stats["idle"]
+        attempts = stats["checkouts"] + stats["timeouts"]
+        stats["avg_wait_time"] = stats["total_wait_time"] / attempts if attempts else 0.0
+        stats["http"] = self.primary.get_connection_pool_stats()
+        return stats
 
 
 def retry(func):
@@ -27,7 +157,6 @@ def retry(func):
     :return: connection handler upon successful connection
     :raises: OSError
     """
-    LOG = logging.getLogger(__name__)
 
     @functools.wraps(func)
     def wrapper(opts):
@@ -64,11 +193,24 @@ def retry(func):
 
     return wrapper
 
+def _is_pool_enabled(opts):
+    value = opts.get(REST_CLIENT_POOL, True)
+    if isinstance(value, string_types):
+        return value.lower()[:1] in ("1", "t", "y")
+    return bool(value)
+
+
 @retry
 def get_resilient_client(opts):
-    """Get a connected instance of SimpleClient for Resilient REST API"""
+    """
+    Get a connected instance of SimpleClient for Resilient REST API.
+
+    Unless ``rest_client_pool`` is turned off, each thread gets its own client
+    from a pool sized to ``num_workers`` (plus one for the main thread)
+    """
     global resilient_client
     global connection_opts
+    global client_pool
 
     new_opts = (opts.get("cafile"),
                 opts.get("org"),
@@ -81,11 +223,17 @@ def get_resilient_client(opts):
                 opts.get("proxy_password"),
                 opts.get("email"),
                 opts.get("api_key_id"))
-    if new_opts != connection_opts:
-        resilient_client = None
-        connection_opts = new_opts
-    if resilient_client:
-        return resilient_client
-
-    resilient_client = resilient.get_client(opts)
-    return resilient_client
+    with _client_lock:
+        if new_opts != connection_opts:
+            resilient_client = None
+            connection_opts = new_opts
+        if not resilient_client:
+            resilient_client = resilient.get_client(opts)
+
+        if not _is_pool_enabled(opts):
+            return resilient_client
+
+        if client_pool is None or client_pool.primary is not resilient_client:
+            client_pool = ResilientClientPool(resilient_client, int(opts.get("num_workers") or 1) + 1)
+        pool = client_pool
+    return pool.get_thread_client()
@@ -27,6 +27,7 @@ ACK_MODES = (ACK_CLIENT_INDIVIDUAL, ACK_AUTO, ACK_CLIENT)
 
 DEFAULT_MAX_RECONNECT_ATTEMPTS = 3
 DEFAULT_STARTUP_MAX_RECONNECT_ATTEMPTS = 3
+DEFAULT_MAX_FRAMES_PER_TICK = 50
 
 LOG = logging.getLogger(__name__)
 
@@ -50,7 +51,8 @@ class StompClient(BaseComponent):
              proxy_user=None,
              proxy_password=None,
              channel=channel,
-             stomp_params=None):
+             stomp_params=None,
+             max_frames_per_tick=DEFAULT_MAX_FRAMES_PER_TICK):
         """ Initialize StompClient.  Called after __init__ """
         self.channel = channel
         if proxy_host:
@@ -107,6 +109,10 @@ class StompClient(BaseComponent):
         self.client_heartbeat = None
         self.last_heartbeat = 0
         self.ALLOWANCE = 2  # multiplier for heartbeat timeouts
+        # Read all the frames that are available, up to this many, on each tick of the circuits loop
+        self.max_frames_per_tick = max(int(max_frames_per_tick or 1), 1)
+        # Keep reading paused across a re-init, until the FunctionWorker resumes it
+        self.reading_paused = getattr(self, "reading_paused", False)
 
     @property
     def connected(self):
@@ -211,7 +217,11 @@ class StompClient(BaseComponent):
     def check_server_heartbeat(self, event):
         """ Confirm that heartbeat from server hasn't timed out """
         now = time.time()
-        self.last_heartbeat = self._client.lastReceived or self.last_heartbeat
+        if self.reading_paused:
+            # Heartbeats are not read while paused, so we can't tell if any arrived
+            LOG.debug("Reading paused, skipping server heartbeat check")
+            return
+        self.last_heartbeat = max(self._client.lastReceived or 0, self.last_heartbeat)
         if self.last_heartbeat:
             elapsed = now-self.last_heartbeat
         else:
@@ -231,14 +241,29 @@ class StompClient(BaseComponent):
                 event.success = False
                 self.fire(OnStompError(None, err))
 
+    @handler("PauseReading")
+    def pause_reading(self, event):
+        """Stop reading frames. They are held by the socket, and the broker stops sending once it is full"""
+        LOG.info("Pausing reading of STOMP frames")
+        self.reading_paused = True
+
+    @handler("ResumeReading")
+    def resume_reading(self, event):
+        LOG.info("Resuming reading of STOMP frames")
+        self.reading_paused = False
+        # Allow for the heartbeats we haven't read yet
+        self.last_heartbeat = time.time()
+
     @handler("generate_events")
     def generate_events(self, event):
         event.reduce_time_left(0.1)
-        if not self.connected:
+        if not self.connected or self.reading_paused:
             return
         try:
-            if self._client.canRead(0):
+            frames = 0
+            while frames < self.max_frames_per_tick and self._client.canRead(0):
                 frame = self._client.receiveFrame()
+                frames += 1
                 LOG.debug("Recieved frame %s", frame)
                 if frame.command == StompSpec.ERROR:
                     self.fire(OnStompError(frame, None))
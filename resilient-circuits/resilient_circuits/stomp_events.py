@@ -65,6 +65,15 @@ class Send(StompEvent):
                                    destination=destination)
 
 
+class PauseReading(StompEvent):
+    """Stop reading frames from the STOMP connection, e.g. while the FunctionWorkers catch up"""
+    pass
+
+
+class ResumeReading(StompEvent):
+    pass
+
+
 class ClientHeartbeat(StompEvent):
     pass
 
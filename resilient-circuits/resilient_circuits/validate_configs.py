@@ -6,9 +6,24 @@ from .constants import MAX_NUM_WORKERS
 """Contains a dict to validate the app configs"""
 
 VALIDATE_DICT = {
+    "num_workers_min": {
+        "required": False,
+        "valid_condition": lambda c: True if c is None or 1 <= c <= MAX_NUM_WORKERS else False,
+        "invalid_msg": "num_workers_min must be in the range 1 <= {}".format(MAX_NUM_WORKERS)
+    },
+    "num_workers_max": {
+        "required": False,
+        "valid_condition": lambda c: True if c is None or 1 <= c <= MAX_NUM_WORKERS else False,
+        "invalid_msg": "num_workers_max must be in the range 1 <= {}".format(MAX_NUM_WORKERS)
+    },
     "num_workers": {
         "required": False,
         "valid_condition": lambda c: True if c >= 1 and c <= MAX_NUM_WORKERS else False,
         "invalid_msg": "num_workers must be in the range 1 <= {}".format(MAX_NUM_WORKERS)
+    },
+    "dispatch_queue_size": {
+        "required": False,
+        "valid_condition": lambda c: True if c is None or c >= 0 else False,
+        "invalid_msg": "dispatch_queue_size must be 0 or more"
     }
 }
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+"""Thread pool and sizing policy for a FunctionWorker with ``num_workers = auto``"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+LOG = logging.getLogger(__name__)
+
+NUM_WORKERS_AUTO = "auto"
+DEFAULT_NUM_WORKERS_MIN = 1
+DEFAULT_NUM_WORKERS_MAX = 50
+# Grow the pool when a task has waited longer than this many seconds for a worker
+DEFAULT_NUM_WORKERS_MAX_WAIT = 2.0
+# Shrink the pool after this many seconds in which fewer workers were needed
+DEFAULT_NUM_WORKERS_IDLE_TIME = 300.0
+# How often, in seconds, the FunctionWorker checks whether to resize
+AUTOSCALE_INTERVAL = 1
+
+
+def parse_num_workers(value):
+    """
+    Parse the ``num_workers`` option: a number of workers, or ``auto``
+
+    :param value: the value from app.config or the command line
+    :type value: str or int
+    :return: ``auto``, or the number as an int
+    :rtype: str or int
+    :raises ValueError: if it is neither
+    """
+    if str(value).strip().lower() == NUM_WORKERS_AUTO:
+        return NUM_WORKERS_AUTO
+    return int(value)
+
+
+class ElasticThreadPool(object):
+    """
+    A thread pool that starts a thread when a task arrives and no thread is idle,
+    up to ``max_threads``, and lets each thread exit once it has been idle for ``idle_timeout`` seconds.
+
+    It has the part of the ``multiprocessing.pool.ThreadPool`` interface the FunctionWorker uses.
+
+    :param max_threads: maximum number of threads
+    :type max_threads: int
+    :param idle_timeout: seconds a thread waits for a task before it exits
+    :type idle_timeout: float
+    """
+
+    def __init__(self, max_threads, idle_timeout=DEFAULT_NUM_WORKERS_IDLE_TIME):
+        self.max_threads = max_threads
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._tasks = deque()
+        self._threads = set()
+        self._idle = 0
+        self._closed = False
+        self.threads_started = 0
+
+    @property
+    def size(self):
+        """The number of threads that are running"""
+        with self._cond:
+            return len(self._threads)
+
+    @property
+    def idle(self):
+        """The number of threads that are waiting for a task"""
+        with self._cond:
+            return self._idle
+
+    def apply_async(self, func, args=(), kwds=None):
+        """Run ``func(*args, **kwds)`` on one of the threads"""
+        with self._cond:
+            if self._closed:
+                raise ValueError("Pool not running")
+            self._tasks.append((func, args, kwds or {}))
+            if len(self._tasks) > self._idle and len(self._threads) < self.max_threads:
+                self._start_thread()
+            self._cond.notify()
+
+    def _start_thread(self):
+        self.threads_started += 1
+        thread = threading.Thread(target=self._work, name="FunctionWorker-{0}".format(self.threads_started))
+        thread.daemon = True
+        self._threads.add(thread)
+        self._idle += 1
+        thread.start()
+
+    def _next_task(self):
+        """Wait for a task, or return None once idle for ``idle_timeout`` or when closed and all tasks are taken"""
+        deadline = time.time() + self.idle_timeout
+        with self._cond:
+            while not self._tasks and not self._closed:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            self._idle -= 1
+            if not self._tasks:
+                self._threads.discard(threading.current_thread())
+                return None
+            return self._tasks.popleft()
+
+    def _work(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            func, args, kwds = task
+            try:
+                func(*args, **kwds)
+            except Exception:
+                LOG.exception("Error in %s", func)
+            with self._cond:
+                self._idle += 1
+
+    def close(self):
+        """Take no more tasks. The threads exit once the tasks already given to the pool have run"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def join(self):
+        """Wait for the threads to exit, after :meth:`close`"""
+        with self._cond:
+            threads = list(self._threads)
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+
+class WorkerAutoScaler(object):
+    """
+    Decides how many tasks a FunctionWorker runs at once, between ``min_workers`` and ``max_workers``.
+
+    * When every worker is busy and a task has waited longer than ``max_wait`` seconds,
+      the number of workers doubles, up to ``max_workers``
+    * When ``idle_time`` seconds pass in which the workers were never all busy, the number of workers
+      shrinks to the most that were running at once in that time, down to ``min_workers``
+
+    Tasks that wait for a concurrency limit or for an earlier task with the same serial key,
+    while workers are free, do not grow the pool.
+
+    :param min_workers: the fewest workers
+    :type min_workers: int
+    :param max_workers: the most workers
+    :type max_workers: int
+    :param max_wait: seconds a task can wait for a worker before the pool grows
+    :type max_wait: float
+    :param idle_time: seconds in which fewer workers were needed before the pool shrinks
+    :type idle_time: float
+    """
+
+    def __init__(self, min_workers, max_workers, max_wait=DEFAULT_NUM_WORKERS_MAX_WAIT,
+                 idle_time=DEFAULT_NUM_WORKERS_IDLE_TIME):
+        if min_workers > max_workers:
+            raise ValueError(u"num_workers_min ({0}) must not be more than num_workers_max ({1})".format(
+                min_workers, max_workers))
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.max_wait = max_wait
+        self.idle_time = idle_time
+
+        self.workers = min_workers
+        self.grows = 0
+        self.shrinks = 0
+        self.last_resize = None
+        self._window_start = None
+        self._peak_running = 0
+
+    def note_running(self, running, now=None):
+        """Record the number of running tasks, each time tasks are started"""
+        now = now or time.time()
+        if running >= self.workers:
+            # All workers are busy: start counting the idle time again
+            self._window_start = now
+            self._peak_running = 0
+        elif self._window_start is None:
+            self._window_start = now
+            self._peak_running = running
+        else:
+            self._peak_running = max(self._peak_running, running)
+
+    def update(self, running, oldest_wait, now=None):
+        """
+        Decide the number of workers, called periodically
+
+        :param running: the number of tasks that are running
+        :type running: int
+        :param oldest_wait: seconds the longest-waiting task has waited, 0 if none are waiting
+        :type oldest_wait: float
+        :return: the number of workers
+        :rtype: int
+        """
+        now = now or time.time()
+        self.note_running(running, now)
+
+        if running >= self.workers and oldest_wait > self.max_wait and self.workers < self.max_workers:
+            self._resize(min(self.max_workers, self.workers * 2), now,
+                         u"a task waited {0:.1f}s for a worker".format(oldest_wait))
+            self.grows += 1
+
+        elif now - self._window_start >= self.idle_time:
+            workers = max(self.min_workers, self._peak_running)
+            if workers < self.workers:
+                self._resize(workers, now, u"at most {0} were running in the last {1:.0f}s".format(
+                    self._peak_running, now - self._window_start))
+                self.shrinks += 1
+            self._window_start = now
+            self._peak_running = running
+
+        return self.workers
+
+    def _resize(self, workers, now, reason):
+        LOG.info("Changing the number of FunctionWorkers from %d to %d: %s", self.workers, workers, reason)
+        self.last_resize = {"time": now, "from": self.workers, "to": workers, "reason": reason}
+        self.workers = workers
+
+    def get_stats(self):
+        """
+        Get the sizing metrics
+
+        :return: the current number of ``workers``, ``min_workers``, ``max_workers``,
+            the number of times the pool ``grows`` and ``shrinks``, and the ``last_resize``
+        :rtype: dict
+        """
+        return {
+            "workers": self.workers,
+            "min_workers": self.min_workers,
+            "max_workers": self.max_workers,
+            "grows": self.grows,
+            "shrinks": self.shrinks,
+            "last_resize": self.last_resize
+        }
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*
 
+import os
 import time
 from resilient_circuits import AppFunctionComponent, app_function, FunctionResult
 from resilient_lib import ResultPayload, RequestsCommon, IntegrationError, validate_fields
@@ -34,3 +35,9 @@ class AppFunctionMockComponent(AppFunctionComponent):
     @app_function(mock_constants.MOCK_APP_FN_NAME_EX)
     def _app_function_mock_raise_exception(self, fn_inputs):
         raise IntegrationError(u"mock error message with unicode զ է ը թ ժ ի լ խ")
+
+    @app_function(mock_constants.MOCK_APP_FN_NAME_PROCESS, executor="process")
+    def _app_function_mock_process(self, fn_inputs):
+        yield self.status_message(u"Mock StatusMessage from process")
+        yield FunctionResult({"pid": os.getpid(), "input_one": fn_inputs.input_one,
+                              "org_id": self.rest_client().org_id})
@@ -20,6 +20,7 @@ MOCK_INBOUND_Q_NAME_EX = u"{0}_{1}".format(MOCK_INBOUND_Q_NAME, "raise_exception
 MOCK_APP_FUNCTION_PREFIX = "app_function_mock"
 MOCK_APP_FN_NAME_ONE = u"{0}_{1}".format(MOCK_APP_FUNCTION_PREFIX, "one")
 MOCK_APP_FN_NAME_EX = u"{0}_{1}".format(MOCK_APP_FUNCTION_PREFIX, "raise_exception")
+MOCK_APP_FN_NAME_PROCESS = u"{0}_{1}".format(MOCK_APP_FUNCTION_PREFIX, "process")
 
 RESILIENT_MOCK = u"pytest_resilient_circuits.BasicResilientMock"
 
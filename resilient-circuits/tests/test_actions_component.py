@@ -17,3 +17,21 @@ def test_inbound_cmp_raises_error_no_app_configs(circuits_app):
     mock_cmp.register(circuits_app.app.component_loader)
     with pytest.raises(IntegrationError, match=r"does not have app_configs defined"):
         helpers.call_inbound_app(circuits_app, mock_constants.MOCK_INBOUND_Q_NAME)
+
+
+def test_subscribe_headers_prefetch_limit(circuits_app):
+    actions = circuits_app.app.action_component
+    opts = circuits_app.app.opts
+    assert actions.prefetch_limit == (opts.get("stomp_prefetch_limit") or opts.get("num_workers"))
+    assert actions.get_subscribe_headers("fn_dest") == {"activemq.prefetchSize": actions.prefetch_limit}
+
+
+def test_subscribe_headers_prefetch_limits(circuits_app):
+    actions = circuits_app.app.action_component
+    actions.prefetch_limit = 10
+    actions.prefetch_limits = {"fn_bulk_dest": 50}
+    actions._functionworker.dispatch_queue.concurrency_limits = {"fn_slow_dest": 2, "fn_bulk_dest": 1}
+
+    assert actions.get_subscribe_headers("fn_bulk_dest")["activemq.prefetchSize"] == 50
+    assert actions.get_subscribe_headers("fn_slow_dest")["activemq.prefetchSize"] == 2
+    assert actions.get_subscribe_headers("fn_dest")["activemq.prefetchSize"] == 10
@@ -34,6 +34,26 @@ def test_num_workers(fx_clear_cmd_line_args):
         AppArgumentParser(config_file=mock_paths.MOCK_APP_CONFIG).parse_args()
 
 
+def test_num_workers_auto(fx_clear_cmd_line_args):
+    opts = AppArgumentParser(config_file=mock_paths.MOCK_APP_CONFIG).parse_args()
+    assert opts.get("num_workers_auto") is False
+
+    sys.argv.extend(["--num-workers", "auto", "--num-workers-max", "20"])
+    opts = AppArgumentParser(config_file=mock_paths.MOCK_APP_CONFIG).parse_args()
+    assert opts.get("num_workers_auto") is True
+    assert opts.get("num_workers_min") == 1
+    # Everything sized by num_workers is sized for the most workers
+    assert opts.get("num_workers") == 20
+
+    sys.argv.extend(["--num-workers-min", "30"])
+    with pytest.raises(ValueError, match=r"num_workers_min must not be more than num_workers_max"):
+        AppArgumentParser(config_file=mock_paths.MOCK_APP_CONFIG).parse_args()
+
+    sys.argv.extend(["--num-workers-max", str(MAX_NUM_WORKERS+1)])
+    with pytest.raises(ValueError, match=r"num_workers_max must be in the range .*"):
+        AppArgumentParser(config_file=mock_paths.MOCK_APP_CONFIG).parse_args()
+
+
 def test_global_integrations_options(fx_clear_cmd_line_args):
     opts = AppArgumentParser(config_file=mock_paths.MOCK_APP_CONFIG).parse_args().get("integrations", {})
     assert opts.get("http_proxy") == "http://example.com:3000"
@@ -46,3 +66,16 @@ def test_global_integrations_options_commented_out(fx_clear_cmd_line_args):
     assert opts.get("http_proxy") is None
     assert opts.get("https_proxy") is None
     assert opts.get("timeout") is None
+
+
+def test_dispatch_queue_size(fx_clear_cmd_line_args):
+    opts = AppArgumentParser(config_file=mock_paths.MOCK_COMMENTED_APP_CONFIG).parse_args()
+    assert opts.get("dispatch_queue_size") == 1000
+
+    sys.argv.extend(["--dispatch-queue-size", "0"])
+    opts = AppArgumentParser(config_file=mock_paths.MOCK_APP_CONFIG).parse_args()
+    assert opts.get("dispatch_queue_size") == 0
+
+    sys.argv.extend(["--dispatch-queue-size", "-1"])
+    with pytest.raises(ValueError, match=r"dispatch_queue_size must be 0 or more"):
+        AppArgumentParser(config_file=mock_paths.MOCK_APP_CONFIG).parse_args()
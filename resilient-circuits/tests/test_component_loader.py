@@ -4,11 +4,44 @@
 
 import pytest
 import copy
+import threading
+import time
+from circuits import BaseComponent
 from resilient_circuits.component_loader import ComponentLoader
 from resilient_circuits import constants, helpers
 from tests import mock_constants, mock_paths
 
 
+def _mock_loader_opts(**resilient_opts):
+    cmp_loader_opts = copy.deepcopy(mock_constants.MOCK_OPTS)
+    cmp_loader_opts["componentsdir"] = None
+    cmp_loader_opts["resilient"] = resilient_opts
+    return cmp_loader_opts
+
+
+def _mock_component_classes(count, order, threads, fail_at=None):
+    classes = []
+    for i in range(count):
+        class MockComponent(BaseComponent):
+            index = i
+
+            def __init__(self, opts):
+                BaseComponent.__init__(self)
+                threads.add(threading.current_thread().name)
+                # The first ones take longest, so they finish constructing last
+                time.sleep(0.02 * (count - self.index))
+                if self.index == fail_at:
+                    raise ValueError("mock error")
+
+            def register(self, parent):
+                order.append(self.index)
+                return BaseComponent.register(self, parent)
+
+        MockComponent.__name__ = "MockComponent{0}".format(i)
+        classes.append(MockComponent)
+    return classes
+
+
 class TestComponentLoader:
 
     @pytest.mark.parametrize("ep_str", ["mock_component:MockInboundAppComponent"])
@@ -59,3 +92,27 @@ class TestComponentLoader:
                         assert ih[1].channel == "{0}.{1}".format(constants.INBOUND_MSG_DEST_PREFIX, custom_q_name)
 
         assert found is True
+
+    def test_register_components_in_order(self):
+        order, threads = [], set()
+        cmp_loader = ComponentLoader(_mock_loader_opts())
+
+        assert cmp_loader._register_components(_mock_component_classes(5, order, threads)) is True
+        assert order == [0, 1, 2, 3, 4]
+        assert threading.current_thread().name not in threads
+        assert cmp_loader.timings["{0}.MockComponent4".format(__name__)]["construct"] > 0
+
+    def test_register_components_one_thread(self):
+        order, threads = [], set()
+        cmp_loader = ComponentLoader(_mock_loader_opts(component_load_threads="1"))
+
+        assert cmp_loader._register_components(_mock_component_classes(3, order, threads)) is True
+        assert order == [0, 1, 2]
+        assert threads == set([threading.current_thread().name])
+
+    def test_register_components_failure(self):
+        order, threads = [], set()
+        cmp_loader = ComponentLoader(_mock_loader_opts())
+
+        assert cmp_loader._register_components(_mock_component_classes(4, order, threads, fail_at=2)) is False
+        assert order == [0, 1]
@@ -2,9 +2,12 @@
 # -*- coding: utf-8 -*-
 # (c) Copyright IBM Corp. 2010, 2021. All Rights Reserved.
 
+import os
 import pytest
 from resilient_lib import IntegrationError
-from resilient_circuits import constants, ResilientComponent, inbound_app, app_function
+from resilient_circuits import constants, ResilientComponent, inbound_app, app_function, process_executor, \
+    FunctionMessage
+from resilient_circuits.decorators import serialize_get_incident_key, _set_serial_key
 from tests import helpers, mock_constants, MockInboundAppComponent, AppFunctionMockComponent
 
 resilient_mock = mock_constants.RESILIENT_MOCK
@@ -73,6 +76,23 @@ class TestAppFunctionDecorator:
         assert mock_results["inputs"]["input_two"] == mock_fn_inputs["input_two"]
         assert mock_results["content"]["malware"] is True
 
+    def test_runs_in_process(self, circuits_app):
+        mock_cmp = AppFunctionMockComponent(opts=mock_constants.MOCK_OPTS)
+        mock_cmp.register(circuits_app.app.component_loader)
+
+        # Start the worker processes first, so the call is not timed out while they start up
+        executor = process_executor.start_process_executor(mock_constants.MOCK_OPTS, [mock_cmp.__module__])
+        executor.run(mock_cmp, "_app_function_mock_process",
+                     FunctionMessage(message={"function": {"name": mock_constants.MOCK_APP_FN_NAME_PROCESS}}),
+                     (), {"input_one": "abc"}, lambda val: None)
+        try:
+            mock_results = helpers.call_app_function(mock_constants.MOCK_APP_FN_NAME_PROCESS, {"input_one": "abc"}, circuits_app)
+        finally:
+            process_executor.stop_process_executor()
+
+        assert mock_results["content"]["pid"] != os.getpid()
+        assert mock_results["content"]["input_one"] == "abc"
+
     def test_handles_StatusMessage(self, circuits_app):
         AppFunctionMockComponent(opts=mock_constants.MOCK_OPTS).register(circuits_app.app.component_loader)
         mock_status_message = helpers.call_app_function(mock_constants.MOCK_APP_FN_NAME_ONE, {"input_one": "abc"}, circuits_app, status_message_only=True)
@@ -89,3 +109,25 @@ class TestAppFunctionDecorator:
                 @app_function("mock_function_2", "mock_function_3")
                 def mock_function_2(self, fn_inputs, **kwargs):
                     return
+
+
+def test_serialize_get_incident_key():
+    assert serialize_get_incident_key(FunctionMessage(message={"function": {}, "incident": {"id": 2314}})) == "incident 2314"
+    assert serialize_get_incident_key(FunctionMessage(message={"function": {}})) is None
+
+
+def test_set_serial_key():
+    mock_cmp = AppFunctionMockComponent(opts=mock_constants.MOCK_OPTS)
+    evt = FunctionMessage(message={"function": {}, "incident": {"id": 2314}})
+    _set_serial_key(mock_cmp, evt, None, serialize_get_incident_key)
+    assert evt.serial_key is None
+
+    _set_serial_key(mock_cmp, evt, True, lambda event: "custom key")
+    assert evt.serial_key == "custom key"
+
+    opts = dict(mock_constants.MOCK_OPTS)
+    opts[mock_constants.MOCK_PACKAGE_NAME] = dict(mock_constants.MOCK_APP_CONFIGS, serialize="true")
+    mock_cmp = AppFunctionMockComponent(opts=opts)
+    evt = FunctionMessage(message={"function": {}, "incident": {"id": 2314}})
+    _set_serial_key(mock_cmp, evt, None, serialize_get_incident_key)
+    assert evt.serial_key == "incident 2314"
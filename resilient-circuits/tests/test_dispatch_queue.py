@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+import threading
+import time
+import pytest
+from circuits import BaseComponent, Event, Manager, handler, task
+from resilient_circuits.actions_component import FunctionWorker, _get_dispatch_keys
+from resilient_circuits.action_message import FunctionMessage
+from resilient_circuits.dispatch_queue import DispatchQueue, parse_dispatch_option
+from resilient_circuits.worker_pool import WorkerAutoScaler
+
+
+def mock_task():
+    pass
+
+
+def _put(queue, name, destination="fn_dest"):
+    return queue.put(mock_task, (name,), {}, keys=(name, destination))
+
+
+def _pop_names(queue):
+    names = []
+    entry = queue.pop()
+    while entry:
+        names.append(entry.args[0])
+        entry = queue.pop()
+    return names
+
+
+def test_parse_dispatch_option():
+    assert parse_dispatch_option(None, "dispatch_priorities") == {}
+    assert parse_dispatch_option("fn_a=10, fn_b = -2,", "dispatch_priorities") == {"fn_a": 10, "fn_b": -2}
+    with pytest.raises(ValueError, match=r"'fn_a' in dispatch_priorities must be in the format name=int"):
+        parse_dispatch_option("fn_a", "dispatch_priorities")
+
+
+def test_fifo_by_default():
+    queue = DispatchQueue()
+    for name in ["fn_a", "fn_b", "fn_c"]:
+        _put(queue, name)
+    assert _pop_names(queue) == ["fn_a", "fn_b", "fn_c"]
+
+
+def test_priorities():
+    queue = DispatchQueue(priorities={"fn_urgent": 10, "fn_bulk": -1, "urgent_dest": 5})
+    _put(queue, "fn_bulk")
+    _put(queue, "fn_a")
+    _put(queue, "fn_urgent")
+    _put(queue, "fn_b", destination="urgent_dest")
+    assert _pop_names(queue) == ["fn_urgent", "fn_b", "fn_a", "fn_bulk"]
+
+
+def test_concurrency_limits():
+    queue = DispatchQueue(concurrency_limits={"fn_slow": 2, "slow_dest": 1})
+    for name in ["fn_slow", "fn_slow", "fn_slow", "fn_fast"]:
+        _put(queue, name)
+    _put(queue, "fn_x", destination="slow_dest")
+    _put(queue, "fn_y", destination="slow_dest")
+
+    running = [queue.pop() for _ in range(4)]
+    assert [entry.args[0] for entry in running] == ["fn_slow", "fn_slow", "fn_fast", "fn_x"]
+    assert queue.pop() is None
+
+    stats = queue.get_stats()
+    assert stats["waiting"] == 2
+    assert stats["running"] == 4
+    assert stats["keys"]["fn_slow"] == {"waiting": 1, "running": 2}
+
+    queue.task_done(running[0])
+    queue.task_done(running[3])
+    assert _pop_names(queue) == ["fn_slow", "fn_y"]
+
+
+def test_full_and_drained():
+    queue = DispatchQueue(max_size=4)
+    for _ in range(4):
+        _put(queue, "fn_a")
+    assert queue.full
+    assert not queue.drained
+    queue.pop()
+    queue.pop()
+    assert not queue.full
+    assert queue.drained
+    assert queue.get_stats()["max_waiting"] == 4
+
+
+def test_unbounded():
+    queue = DispatchQueue(max_size=0)
+    for _ in range(100):
+        _put(queue, "fn_a")
+    assert not queue.full
+    assert queue.drained
+
+
+def test_oldest_wait():
+    queue = DispatchQueue()
+    assert queue.oldest_wait() == 0
+    entry = queue.put("a", (), {})
+    queue.put("b", (), {})
+    assert queue.oldest_wait(now=entry.queued_at + 5) == 5
+
+
+def test_serial_keys():
+    queue = DispatchQueue(priorities={"fn_urgent": 10})
+    queue.put(mock_task, ("fn_a",), {}, keys=("fn_a",), serial_key="incident 1")
+    queue.put(mock_task, ("fn_urgent",), {}, keys=("fn_urgent",), serial_key="incident 1")
+    queue.put(mock_task, ("fn_b",), {}, keys=("fn_b",), serial_key="incident 2")
+    queue.put(mock_task, ("fn_c",), {}, keys=("fn_c",))
+
+    # fn_urgent has a higher priority, but waits for fn_a, which arrived first for the same incident
+    running = [queue.pop() for _ in range(3)]
+    assert [entry.args[0] for entry in running] == ["fn_a", "fn_b", "fn_c"]
+    assert queue.pop() is None
+
+    stats = queue.get_stats()
+    assert stats["serial_keys"] == {"incident 1": {"waiting": 1, "running": 1},
+                                    "incident 2": {"waiting": 0, "running": 1}}
+
+    queue.task_done(running[1])
+    assert queue.pop() is None
+    queue.task_done(running[0])
+    assert _pop_names(queue) == ["fn_urgent"]
+    assert queue.get_stats()["serial_keys"] == {"incident 1": {"waiting": 0, "running": 1}}
+
+
+def test_get_dispatch_keys():
+    event = FunctionMessage(headers={"destination": "/queue/actions.201.fn_dest"},
+                            message={"function": {"name": "fn_a"}})
+    assert _get_dispatch_keys(("x", event)) == ("fn_a", "fn_dest")
+    assert _get_dispatch_keys((FunctionMessage(message={"function": {"name": "fn_a"}}),)) == ("fn_a", None)
+    assert _get_dispatch_keys(()) == ()
+
+
+class MockCaller(BaseComponent):
+    """Calls functions on the FunctionWorker, like the @function decorators do, and records the results"""
+
+    def init(self, functions):
+        self.functions = functions
+        self.results = []
+        self.errors = []
+        self.fired = []
+
+    @handler("started", channel="*")
+    def _on_started(self, *args):
+        for call in self.functions:
+            # Each is a function, or a tuple of a function and its arguments
+            call = call if isinstance(call, tuple) else (call,)
+            self.fire(Event.create("call_function", *call))
+
+    @handler("call_function")
+    def _call_function(self, fn, *args):
+        # Fire the task straight away, as the decorators do, so tasks arrive in order
+        the_task = task(fn, *args)
+        self.fire(the_task, "functionworker")
+        return self._wait_for_result(the_task)
+
+    def _wait_for_result(self, the_task):
+        result = yield self.wait(the_task)
+        self.results.append(result.value)
+
+    @handler("exception", channel="*")
+    def _on_exception(self, etype, value, traceback, handler=None, fevent=None):
+        self.errors.append(value)
+
+    @handler("PauseReading", "ResumeReading", channel="*")
+    def _on_reading(self, event):
+        self.fired.append(event.name)
+
+
+def _run_functions(worker, functions, num_results):
+    manager = Manager()
+    worker.register(manager)
+    caller = MockCaller(functions)
+    caller.register(manager)
+    manager.start()
+    try:
+        timeout = time.time() + 10
+        while len(caller.results) + len(caller.errors) < num_results and time.time() < timeout:
+            time.sleep(0.01)
+    finally:
+        manager.stop()
+    return caller
+
+
+def test_function_worker_limits_running_tasks():
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def mock_function(i):
+        def fn():
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return i * 2
+        return fn
+
+    worker = FunctionWorker(workers=2, dispatch_queue=DispatchQueue(max_size=2))
+    caller = _run_functions(worker, [mock_function(i) for i in range(6)], 6)
+
+    assert sorted(caller.results) == [0, 2, 4, 6, 8, 10]
+    assert running[1] == 2
+    assert caller.fired == ["PauseReading", "ResumeReading"]
+    assert worker.dispatch_queue.get_stats()["dispatched"] == 6
+    assert worker.dispatch_queue.running == 0
+
+
+def test_function_worker_error():
+    def mock_function():
+        raise ValueError("mock error")
+
+    worker = FunctionWorker(workers=2)
+    caller = _run_functions(worker, [mock_function], 1)
+
+    assert [str(error) for error in caller.errors] == ["mock error"]
+    assert worker.dispatch_queue.running == 0
+
+
+def test_function_worker_serializes_keys():
+    lock = threading.Lock()
+    running = set()
+    overlaps = []
+    order = []
+
+    def mock_function(evt):
+        with lock:
+            if evt.serial_key in running:
+                overlaps.append(evt.serial_key)
+            running.add(evt.serial_key)
+            order.append(evt.message["inputs"]["i"])
+        time.sleep(0.02)
+        with lock:
+            running.discard(evt.serial_key)
+        return evt.message["inputs"]["i"]
+
+    calls = []
+    for i in range(8):
+        evt = FunctionMessage(message={"function": {"name": "fn_a"}, "inputs": {"i": i}})
+        evt.serial_key = "incident {0}".format(i % 2)
+        calls.append((mock_function, evt))
+
+    worker = FunctionWorker(workers=4)
+    caller = _run_functions(worker, calls, 8)
+
+    assert sorted(caller.results) == list(range(8))
+    assert overlaps == []
+    assert [i for i in order if i % 2 == 0] == [0, 2, 4, 6]
+    assert [i for i in order if i % 2 == 1] == [1, 3, 5, 7]
+    assert worker.dispatch_queue.get_stats()["serial_keys"] == {}
+
+
+def test_function_worker_autoscales():
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def mock_function():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.4)
+        with lock:
+            running[0] -= 1
+        return True
+
+    autoscaler = WorkerAutoScaler(1, 4, max_wait=0.1)
+    worker = FunctionWorker(autoscaler=autoscaler)
+    assert worker.workers == 1
+    caller = _run_functions(worker, [mock_function] * 8, 8)
+
+    assert caller.results == [True] * 8
+    assert autoscaler.grows >= 1
+    assert 1 < running[1] <= 4
+    stats = worker.get_stats()
+    assert stats["workers"] == autoscaler.workers > 1
+    assert stats["threads"] <= 4
+    assert stats["autoscale"]["last_resize"]["from"] == 1
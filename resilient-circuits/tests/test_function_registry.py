@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+import pytest
+from resilient_circuits import function_registry
+from resilient_circuits.function_registry import FunctionRegistry, get_function_registry, reset_function_registry
+
+LISTING = {"entities": [{"name": "fn_a", "destination_handle": "dest_a"},
+                        {"name": "fn_b", "destination_handle": "dest_b"}]}
+
+
+class MockCachedGet(object):
+    """Records the URIs fetched"""
+
+    def __init__(self):
+        self.uris = []
+
+    def __call__(self, uri):
+        self.uris.append(uri)
+        if uri == function_registry.FUNCTIONS_URI:
+            return LISTING
+        if uri == function_registry.FUNCTION_URI.format("fn_new"):
+            return {"name": "fn_new", "destination_handle": "dest_new"}
+        raise ValueError("404 {0}".format(uri))
+
+
+def test_one_listing_for_all_functions():
+    registry = FunctionRegistry("https://soar.example.com", 201)
+    cached_get = MockCachedGet()
+    assert registry.get("fn_a", cached_get)["destination_handle"] == "dest_a"
+    assert registry.get("fn_b", cached_get)["destination_handle"] == "dest_b"
+    assert cached_get.uris == [function_registry.FUNCTIONS_URI]
+
+
+def test_function_not_in_listing():
+    registry = FunctionRegistry("https://soar.example.com", 201)
+    cached_get = MockCachedGet()
+    assert registry.get("fn_new", cached_get)["destination_handle"] == "dest_new"
+    registry.get("fn_new", cached_get)
+    assert cached_get.uris == [function_registry.FUNCTIONS_URI, function_registry.FUNCTION_URI.format("fn_new")]
+
+    with pytest.raises(ValueError):
+        registry.get("fn_missing", cached_get)
+
+
+def test_get_function_registry():
+    class MockClient(object):
+        base_url = "https://soar.example.com"
+        org_id = 201
+
+    reset_function_registry()
+    client = MockClient()
+    registry = get_function_registry(client)
+    assert get_function_registry(client) is registry
+
+    client.org_id = 202
+    assert get_function_registry(client) is not registry
+    reset_function_registry()
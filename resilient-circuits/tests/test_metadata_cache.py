@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+import os
+import pytest
+from resilient_circuits import metadata_cache
+from resilient_circuits.metadata_cache import MetadataCache, get_metadata_cache, reset_metadata_cache
+
+
+class MockClient(object):
+    """Counts the GETs of a REST client"""
+
+    def __init__(self, version="43.1.49", org_id=201):
+        self.base_url = "https://soar.example.com:443"
+        self.org_id = org_id
+        self.version = version
+        self.data = {"/types/incident/fields": [{"name": "inc_field"}],
+                     "/functions/fn_a?handle_format=names": {"name": "fn_a"}}
+        self.gets = []
+        self.const_gets = 0
+
+    def get(self, uri):
+        self.gets.append(uri)
+        if uri not in self.data:
+            raise ValueError("404 {0}".format(uri))
+        return self.data[uri]
+
+    def cached_get(self, uri):
+        return self.get(uri)
+
+    def get_const(self):
+        self.const_gets += 1
+        return {"server_version": {"version": self.version}}
+
+
+@pytest.fixture
+def fx_reset_metadata_cache():
+    reset_metadata_cache()
+    metadata_cache.metadata_cache = None
+    yield
+    reset_metadata_cache()
+    metadata_cache.metadata_cache = None
+
+
+def _new_cache(tmpdir, client):
+    return MetadataCache(str(tmpdir), client.base_url, client.org_id, client.version, lambda: client)
+
+
+def test_restart_reads_the_file(tmpdir):
+    client = MockClient()
+    cache = _new_cache(tmpdir, client)
+    assert cache.get(client, "/types/incident/fields") == [{"name": "inc_field"}]
+    assert cache.get(client, "/types/incident/fields") == [{"name": "inc_field"}]
+    assert client.gets == ["/types/incident/fields"]
+    cache.join(5)
+    assert os.path.basename(cache.path) == "soar.example.com_443_org201_43.1.49.json"
+
+    # A new process loads it straight away, and checks it once in the background
+    client = MockClient()
+    cache = _new_cache(tmpdir, client)
+    assert cache.get(client, "/types/incident/fields") == [{"name": "inc_field"}]
+    cache.get(client, "/types/incident/fields")
+    cache.join(5)
+    assert client.gets == ["/types/incident/fields"]
+    assert cache.fetched == 0 and cache.updated == 0
+
+
+def test_changes_are_picked_up_in_the_background(tmpdir):
+    client = MockClient()
+    cache = _new_cache(tmpdir, client)
+    cache.get(client, "/types/incident/fields")
+    cache.join(5)
+
+    client.data["/types/incident/fields"] = [{"name": "inc_field"}, {"name": "new_field"}]
+    cache = _new_cache(tmpdir, client)
+    assert cache.get(client, "/types/incident/fields") == [{"name": "inc_field"}]
+    cache.join(5)
+    assert cache.updated == 1
+    assert cache.get(client, "/types/incident/fields") == client.data["/types/incident/fields"]
+    cache.join(5)
+
+    assert _new_cache(tmpdir, client).get(client, "/types/incident/fields") == client.data["/types/incident/fields"]
+
+
+def test_server_version_and_org_are_separate(tmpdir):
+    client = MockClient()
+    cache = _new_cache(tmpdir, client)
+    cache.get(client, "/types/incident/fields")
+    cache.join(5)
+
+    for other in (MockClient(version="44.0.1"), MockClient(org_id=202)):
+        cache = _new_cache(tmpdir, other)
+        cache.get(other, "/types/incident/fields")
+        cache.join(5)
+        assert cache.fetched == 1
+
+
+def test_error_is_not_cached(tmpdir):
+    client = MockClient()
+    cache = _new_cache(tmpdir, client)
+    with pytest.raises(ValueError):
+        cache.get(client, "/functions/fn_missing?handle_format=names")
+    cache.join(5)
+    assert "/functions/fn_missing?handle_format=names" not in _new_cache(tmpdir, client)._entries
+
+
+def test_get_metadata_cache(tmpdir, fx_reset_metadata_cache):
+    client = MockClient()
+    assert get_metadata_cache({"resilient": {}}, client) is None
+
+    opts = {"resilient": {"metadata_cache_dir": str(tmpdir)}}
+    cache = get_metadata_cache(opts, client)
+    assert get_metadata_cache(opts, client) is cache
+    assert client.const_gets == 1
+
+    # A reload with the same server version keeps the entries
+    cache.get(client, "/types/incident/fields")
+    reset_metadata_cache()
+    assert get_metadata_cache(opts, client) is cache
+    assert client.const_gets == 2
+
+    # An upgrade uses a new file
+    client.version = "44.0.1"
+    reset_metadata_cache()
+    assert get_metadata_cache(opts, client).server_version == "44.0.1"
+
+
+def test_prefetch_is_shared_by_org(fx_reset_metadata_cache):
+    opts = {"resilient": {}}
+    client = MockClient()
+    metadata_cache.prefetch(opts, client, uris=["/types/incident/fields"])
+    try:
+        assert metadata_cache.get_cached_get(opts, MockClient())("/types/incident/fields") == [{"name": "inc_field"}]
+        other_org = MockClient(org_id=202)
+        metadata_cache.get_cached_get(opts, other_org)("/types/incident/fields")
+        assert other_org.gets == ["/types/incident/fields"]
+    finally:
+        metadata_cache.clear_prefetched()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+import os
+import pytest
+from resilient_lib import IntegrationError
+from resilient_circuits import app_function, function, FunctionMessage, FunctionResult, StatusMessage
+from resilient_circuits import process_executor, rest_helper
+from tests import mock_constants, AppFunctionMockComponent
+
+
+@pytest.fixture(scope="module")
+def fx_executor():
+    rest_helper.reset_resilient_client()
+    executor = process_executor.ProcessExecutor(mock_constants.MOCK_OPTS, processes=1,
+                                                modules=[AppFunctionMockComponent.__module__])
+    yield executor
+    executor.close()
+    rest_helper.reset_resilient_client()
+
+
+def _function_message(fn_name, fn_inputs):
+    return FunctionMessage(headers={}, message={"function": {"name": fn_name}, "inputs": fn_inputs})
+
+
+def test_get_executor():
+    mock_cmp = AppFunctionMockComponent(opts=mock_constants.MOCK_OPTS)
+    assert process_executor.get_executor(mock_cmp) == "thread"
+    assert process_executor.get_executor(mock_cmp, "Process") == "process"
+
+    opts = dict(mock_constants.MOCK_OPTS)
+    opts[mock_constants.MOCK_PACKAGE_NAME] = dict(mock_constants.MOCK_APP_CONFIGS, executor="process")
+    mock_cmp = AppFunctionMockComponent(opts=opts)
+    assert process_executor.get_executor(mock_cmp) == "process"
+    assert process_executor.get_executor(mock_cmp, "thread") == "thread"
+
+
+def test_get_executor_invalid():
+    with pytest.raises(ValueError, match=r"executor must be one of thread, process"):
+        process_executor.check_executor("greenlet")
+
+    with pytest.raises(ValueError, match=r"executor must be one of thread, process"):
+        app_function("mock_fn", executor="greenlet")
+
+    with pytest.raises(ValueError, match=r"executor must be one of thread, process"):
+        function("mock_fn", executor="greenlet")
+
+
+def test_has_process_functions():
+    assert AppFunctionMockComponent._app_function_mock_process.executor == "process"
+    assert AppFunctionMockComponent._app_function_mock_one.executor is None
+    assert process_executor.has_process_functions(AppFunctionMockComponent(opts=mock_constants.MOCK_OPTS))
+
+
+def test_run_in_process(fx_executor):
+    mock_cmp = AppFunctionMockComponent(opts=mock_constants.MOCK_OPTS)
+    evt = _function_message(mock_constants.MOCK_APP_FN_NAME_PROCESS, {"input_one": u"unicode ઠ ડ ઢ"})
+    yielded = []
+
+    results = fx_executor.run(mock_cmp, "_app_function_mock_process", evt, (), evt.message["inputs"], yielded.append)
+
+    assert [type(val) for val in yielded] == [StatusMessage]
+    assert yielded[0].text == u"Mock StatusMessage from process"
+    assert len(results) == 1
+    assert isinstance(results[0], FunctionResult)
+    assert results[0].name == mock_constants.MOCK_APP_FN_NAME_PROCESS
+    content = results[0].value["content"]
+    assert content["pid"] != os.getpid()
+    assert content["input_one"] == u"unicode ઠ ડ ઢ"
+    assert content["org_id"] == 201
+    assert results[0].value["inputs"] == {"input_one": u"unicode ઠ ડ ઢ"}
+
+
+def test_run_in_process_error(fx_executor):
+    mock_cmp = AppFunctionMockComponent(opts=mock_constants.MOCK_OPTS)
+    evt = _function_message(mock_constants.MOCK_APP_FN_NAME_EX, {})
+
+    with pytest.raises(IntegrationError, match=r"mock error message with unicode"):
+        fx_executor.run(mock_cmp, "_app_function_mock_raise_exception", evt, (), {}, lambda val: None)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+import threading
+import pytest
+from resilient_circuits import rest_helper
+from tests import mock_constants
+
+
+@pytest.fixture
+def fx_opts():
+    opts = dict(mock_constants.MOCK_OPTS)
+    opts["num_workers"] = 2
+    rest_helper.reset_resilient_client()
+    yield opts
+    rest_helper.reset_resilient_client()
+
+
+def _get_client_in_thread(opts):
+    clients = []
+    thread = threading.Thread(target=lambda: clients.append(rest_helper.get_resilient_client(opts)))
+    thread.start()
+    thread.join()
+    return clients[0]
+
+
+def test_get_resilient_client_same_thread(fx_opts):
+    client = rest_helper.get_resilient_client(fx_opts)
+    assert client is rest_helper.resilient_client
+    assert rest_helper.get_resilient_client(fx_opts) is client
+
+
+def test_get_resilient_client_per_thread(fx_opts):
+    main_client = rest_helper.get_resilient_client(fx_opts)
+    thread_client = _get_client_in_thread(fx_opts)
+
+    assert thread_client is not main_client
+    assert thread_client.session is not main_client.session
+    assert thread_client.org_id == main_client.org_id
+    assert thread_client.cookies == main_client.cookies
+    assert thread_client.get("/incidents/2314")["id"] == 2314
+
+
+def test_get_resilient_client_returned_when_thread_ends(fx_opts):
+    rest_helper.get_resilient_client(fx_opts)
+    first = _get_client_in_thread(fx_opts)
+    second = _get_client_in_thread(fx_opts)
+
+    assert first is second
+    stats = rest_helper.client_pool.get_stats()
+    assert stats["created"] == 2
+    assert stats["checkouts"] == 3
+
+
+def test_get_resilient_client_pool_disabled(fx_opts):
+    fx_opts["rest_client_pool"] = "false"
+    main_client = rest_helper.get_resilient_client(fx_opts)
+    assert _get_client_in_thread(fx_opts) is main_client
+    assert rest_helper.client_pool is None
+
+
+def test_client_pool_bounded(fx_opts):
+    client = rest_helper.get_resilient_client(fx_opts)
+    pool = rest_helper.ResilientClientPool(client, 2)
+
+    first = pool.checkout()
+    second = pool.checkout()
+    assert first is client
+    assert second is not client
+    assert pool.checkout(timeout=0.01) is None
+
+    pool.checkin(second)
+    assert pool.checkout(timeout=0.01) is second
+
+    stats = pool.get_stats()
+    assert stats["size"] == 2
+    assert stats["in_use"] == 2
+    assert stats["checkouts"] == 3
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_time"] > 0
+
+
+def test_client_pool_shared_reauth(fx_opts):
+    client = rest_helper.get_resilient_client(fx_opts)
+    clone = client.clone()
+    stale_cookies = client.cookies
+    logins = []
+
+    def mock_connect(timeout=None):
+        logins.append(timeout)
+        client.cookies = {"JSESSIONID": "NewSessionId"}
+        client.headers["X-sess-id"] = "NewCsrfToken"
+
+    client._connect = mock_connect
+    client._reconnect(stale_cookies)
+
+    # The clone picks up the new session instead of logging in again
+    clone._connect = mock_connect
+    clone._reconnect(stale_cookies)
+
+    assert len(logins) == 1
+    assert clone.cookies == {"JSESSIONID": "NewSessionId"}
+    assert clone.headers["X-sess-id"] == "NewCsrfToken"
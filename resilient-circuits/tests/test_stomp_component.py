@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+from stompest.protocol import StompFrame, StompSession, StompSpec
+from resilient_circuits.stomp_component import StompClient, DEFAULT_MAX_FRAMES_PER_TICK
+
+
+class MockStompSession(object):
+    state = StompSession.CONNECTED
+
+
+class MockStomp(object):
+    """Returns the frames it was given, as if they were waiting on the socket"""
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.session = MockStompSession()
+
+    def canRead(self, timeout=None):
+        return bool(self.frames)
+
+    def receiveFrame(self):
+        return self.frames.pop(0)
+
+
+class MockGenerateEvents(object):
+    def reduce_time_left(self, time_left):
+        pass
+
+
+def _mock_stomp_client(num_frames, **kwargs):
+    client = StompClient("example.com", 65001, use_ssl=False, **kwargs)
+    frames = [StompFrame(StompSpec.MESSAGE, headers={"message-id": str(i)}, body=b"{}") for i in range(num_frames)]
+    client._client = MockStomp(frames)
+    client.fired = []
+    client.fire = lambda event, *channels: client.fired.append(event)
+    return client
+
+
+def test_generate_events_drains_frames():
+    client = _mock_stomp_client(5)
+    assert client.max_frames_per_tick == DEFAULT_MAX_FRAMES_PER_TICK
+
+    client.generate_events(MockGenerateEvents())
+    assert [event.name for event in client.fired] == ["Message"] * 5
+    assert [event.frame.headers["message-id"] for event in client.fired] == ["0", "1", "2", "3", "4"]
+
+
+def test_generate_events_max_frames_per_tick():
+    client = _mock_stomp_client(5, max_frames_per_tick=2)
+
+    client.generate_events(MockGenerateEvents())
+    assert len(client.fired) == 2
+    client.generate_events(MockGenerateEvents())
+    client.generate_events(MockGenerateEvents())
+    assert len(client.fired) == 5
+
+
+def test_generate_events_one_frame_per_tick():
+    client = _mock_stomp_client(3, max_frames_per_tick=1)
+    client.generate_events(MockGenerateEvents())
+    assert len(client.fired) == 1
+
+
+def test_generate_events_paused():
+    client = _mock_stomp_client(3)
+    client.pause_reading(None)
+    client.generate_events(MockGenerateEvents())
+    assert client.fired == []
+
+    client.resume_reading(None)
+    client.generate_events(MockGenerateEvents())
+    assert len(client.fired) == 3
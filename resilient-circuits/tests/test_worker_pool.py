@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+import threading
+import time
+import pytest
+from resilient_circuits.worker_pool import ElasticThreadPool, WorkerAutoScaler, parse_num_workers
+
+
+def test_parse_num_workers():
+    assert parse_num_workers("10") == 10
+    assert parse_num_workers(" Auto ") == "auto"
+    with pytest.raises(ValueError):
+        parse_num_workers("lots")
+
+
+def test_elastic_thread_pool():
+    pool = ElasticThreadPool(3, idle_timeout=0.2)
+    assert pool.size == 0
+
+    release = threading.Event()
+    done = []
+    for i in range(5):
+        pool.apply_async(lambda i: (release.wait(5), done.append(i)), (i,))
+    assert pool.size == 3
+
+    release.set()
+    timeout = time.time() + 5
+    while len(done) < 5 and time.time() < timeout:
+        time.sleep(0.01)
+    assert sorted(done) == [0, 1, 2, 3, 4]
+
+    # The idle threads exit
+    while pool.size and time.time() < timeout:
+        time.sleep(0.05)
+    assert pool.size == 0
+
+    pool.apply_async(done.append, (5,))
+    pool.close()
+    pool.join()
+    assert done[-1] == 5
+    with pytest.raises(ValueError):
+        pool.apply_async(done.append, (6,))
+
+
+def test_autoscaler_grows():
+    scaler = WorkerAutoScaler(1, 6, max_wait=2, idle_time=60)
+    assert scaler.update(running=1, oldest_wait=1, now=100) == 1
+    assert scaler.update(running=1, oldest_wait=3, now=101) == 2
+    assert scaler.update(running=2, oldest_wait=3, now=102) == 4
+    assert scaler.update(running=4, oldest_wait=3, now=103) == 6
+    assert scaler.update(running=6, oldest_wait=3, now=104) == 6
+    assert scaler.grows == 3
+    assert scaler.last_resize["from"] == 4 and scaler.last_resize["to"] == 6
+
+
+def test_autoscaler_does_not_grow_with_free_workers():
+    # Tasks waiting on a concurrency limit or serial key while workers are free
+    scaler = WorkerAutoScaler(2, 6, max_wait=2)
+    assert scaler.update(running=1, oldest_wait=30, now=100) == 2
+
+
+def test_autoscaler_shrinks():
+    scaler = WorkerAutoScaler(2, 8, max_wait=2, idle_time=60)
+    scaler.workers = 8
+    scaler.update(running=8, oldest_wait=0, now=100)
+    scaler.note_running(5, now=120)
+    assert scaler.update(running=3, oldest_wait=0, now=150) == 8
+    assert scaler.update(running=1, oldest_wait=0, now=160) == 5
+    assert scaler.update(running=0, oldest_wait=0, now=221) == 2
+    assert scaler.shrinks == 2
+
+    # Busy again: the idle time starts again
+    scaler.update(running=2, oldest_wait=0, now=230)
+    assert scaler.update(running=0, oldest_wait=0, now=260) == 2
+
+
+def test_autoscaler_bounds():
+    with pytest.raises(ValueError, match="must not be more than"):
+        WorkerAutoScaler(5, 2)
@@ -3,6 +3,7 @@
 # pragma pylint: disable=unused-argument, no-self-use
 
 import datetime
+import hashlib
 import io
 import logging
 import mimetypes
@@ -17,6 +18,7 @@ from six import string_types
 
 INCIDENT_FRAGMENT = '#incidents'
 PAYLOAD_VERSION = "1.0"
+DEFAULT_BATCH_CONCURRENCY = 5
 
 LOG = logging.getLogger(__name__)
 LOG.setLevel(logging.INFO)
@@ -199,7 +201,8 @@ def validate_fields(field_list, kwargs):
     return return_fields
 
 
-def get_file_attachment(res_client, incident_id, artifact_id=None, task_id=None, attachment_id=None):
+def get_file_attachment(res_client, incident_id, artifact_id=None, task_id=None, attachment_id=None,
+                        stream_to=None, hash_algorithms=None):
     """
     Call the Resilient REST API to get the attachment or artifact data for
     an Incident or a Task
@@ -208,6 +211,10 @@ def get_file_attachment(res_client, incident_id, artifact_id=None, task_id=None,
     * If ``incident_id`` and ``attachment_id`` are defined it will get that Incident Attachment
     * If ``incident_id``, ``task_id`` and ``attachment_id`` are defined it will get that Task Attachment
 
+    If ``stream_to`` is given, the data is downloaded in chunks and written to that path
+    or file object as it arrives, so large files are never held in memory.
+    The hashes listed in ``hash_algorithms`` are computed on the way.
+
     .. note::
         The ``artifact_id`` must reference an Artifact that is a downloadable type or it will
         raise a ``resilient.SimpleHTTPException``
@@ -221,6 +228,11 @@ def get_file_attachment(res_client, incident_id, artifact_id=None, task_id=None,
         with open("malware.eml", "wb") as f:
             f.write(artifact_data)
 
+        # Or, for large files
+        result = get_file_attachment(self.rest_client(), incident_id=2001, artifact_id=1,
+                                     stream_to="capture.pcap", hash_algorithms=["sha256"])
+        sha256 = result["sha256"]
+
     :param res_client: required for communication back to resilient
     :type res_client: resilient_circuits.ResilientComponent.rest_client()
     :param incident_id: id of the Incident
@@ -231,8 +243,13 @@ def get_file_attachment(res_client, incident_id, artifact_id=None, task_id=None,
     :type task_id: int|str
     :param attachment_id: id of the Incident's Attachment to download
     :type attachment_id: int|str
-    :return: byte string of attachment
-    :rtype: str
+    :param stream_to: (optional) path of the file, or file object opened for binary writing, to download to
+    :type stream_to: str|file
+    :param hash_algorithms: (optional) names of the ``hashlib`` hashes to compute when using ``stream_to``, e.g. ``["md5", "sha256"]``
+    :type hash_algorithms: list
+    :return: byte string of attachment, or if ``stream_to`` is given, a dict with the ``size`` in bytes
+        and the hex digest of each of the ``hash_algorithms``
+    :rtype: str|dict
     """
 
     if incident_id and artifact_id:
@@ -247,8 +264,32 @@ def get_file_attachment(res_client, incident_id, artifact_id=None, task_id=None,
     else:
         raise ValueError("artifact or attachment or incident id must be specified")
 
-    # Get the data
-    return res_client.get_content(data_uri)
+    if stream_to is None:
+        # Get the data
+        return res_client.get_content(data_uri)
+
+    hashes = [(name, hashlib.new(name)) for name in hash_algorithms or []]
+    size = 0
+
+    if isinstance(stream_to, string_types):
+        stream = io.open(stream_to, mode="wb")
+    else:
+        stream = stream_to
+
+    try:
+        for chunk in res_client.get_content_stream(data_uri):
+            stream.write(chunk)
+            size += len(chunk)
+            for _, hash_obj in hashes:
+                hash_obj.update(chunk)
+    finally:
+        if stream is not stream_to:
+            stream.close()
+
+    result = {"size": size}
+    for name, hash_obj in hashes:
+        result[name] = hash_obj.hexdigest()
+    return result
 
 
 def get_file_attachment_metadata(res_client, incident_id, artifact_id=None, task_id=None, attachment_id=None):
@@ -338,8 +379,9 @@ def write_file_attachment(res_client, file_name, datastream, incident_id, task_i
     :type res_client: :class:`ResilientComponent.rest_client() <resilient_circuits.actions_component.ResilientComponent.rest_client()>`
     :param file_name: name of the attachment to create
     :type file_name: str
-    :param dataStream: stream of bytes used to create the attachment
-    :type dataStream: stream of bytes
+    :param datastream: stream of bytes used to create the attachment. It is uploaded as it is read,
+        so it can be a file, a ``socket`` or the ``raw`` stream of another response
+    :type datastream: file-like object opened in binary mode, or iterator of bytes
     :param incident_id: id of the Incident
     :type incident_id: int|str
     :param task_id: (optional) id of the Task
@@ -354,36 +396,107 @@ def write_file_attachment(res_client, file_name, datastream, incident_id, task_i
                    or mimetypes.guess_type(file_name or "")[0] \
                    or "application/octet-stream"
 
-    attachment = datastream.read()
+    # Create a new attachment by calling resilient REST API.
+    # The datastream is passed straight through and uploaded as it is read
+    if task_id:
+        attachment_uri = "/tasks/{}/attachments".format(task_id)
+    else:
+        attachment_uri = "/incidents/{}/attachments".format(incident_id)
+
+    new_attachment = res_client.post_attachment(attachment_uri,
+                                                datastream,
+                                                filename=file_name,
+                                                mimetype=content_type)
+
+    if isinstance(new_attachment, list):
+        new_attachment = new_attachment[0]
+
+    return new_attachment
+
+
+def create_artifacts(res_client, incident_id, artifacts, concurrency=DEFAULT_BATCH_CONCURRENCY):
+    """
+    Create many Artifacts in an Incident, posting up to ``concurrency`` of them at a time.
+
+    **Example:**
+
+    .. code-block:: python
+
+        artifacts = [{"type": "IP Address", "value": ip, "description": "Found by scan"} for ip in ips]
+        results = create_artifacts(self.rest_client(), fn_inputs.incident_id, artifacts)
+
+    :param res_client: required for communication back to resilient
+    :type res_client: :class:`ResilientComponent.rest_client() <resilient_circuits.actions_component.ResilientComponent.rest_client()>`
+    :param incident_id: id of the Incident
+    :type incident_id: int|str
+    :param artifacts: the ``IncidentArtifactDTO`` of each Artifact to create, e.g. ``{"type": "IP Address", "value": "1.2.3.4"}``
+    :type artifacts: list
+    :param concurrency: (optional) maximum number of requests in flight at once
+    :type concurrency: int
+    :return: for each Artifact, in the same order, the list of Artifacts created
+        or the exception raised when creating it
+    :rtype: list
+    """
+    uri = "/incidents/{}/artifacts".format(incident_id)
+    return res_client.post_many(uri, artifacts, concurrency=concurrency)
+
 
+def create_incident_notes(res_client, incident_id, notes, note_format="text", concurrency=DEFAULT_BATCH_CONCURRENCY):
     """
-    Writing to temp path so that the REST API client can use this file path 
-    to read and POST the attachment
+    Add many Notes to an Incident, posting up to ``concurrency`` of them at a time.
+
+    **Example:**
+
+    .. code-block:: python
+
+        results = create_incident_notes(self.rest_client(), fn_inputs.incident_id, ["<b>Scan complete</b>"], note_format="html")
+
+    :param res_client: required for communication back to resilient
+    :type res_client: :class:`ResilientComponent.rest_client() <resilient_circuits.actions_component.ResilientComponent.rest_client()>`
+    :param incident_id: id of the Incident
+    :type incident_id: int|str
+    :param notes: the text of each Note, or its ``CommentDTO`` as a dict
+    :type notes: list
+    :param note_format: (optional) ``"text"`` or ``"html"``. Format of the Notes given as text
+    :type note_format: str
+    :param concurrency: (optional) maximum number of requests in flight at once
+    :type concurrency: int
+    :return: for each Note, in the same order, the Note created or the exception raised when creating it
+    :rtype: list
     """
+    uri = "/incidents/{}/comments".format(incident_id)
+    payloads = [note if isinstance(note, dict) else {"text": {"format": note_format, "content": note}}
+                for note in notes]
+    return res_client.post_many(uri, payloads, concurrency=concurrency)
 
-    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-        try:
-            temp_file.write(attachment)
-            temp_file.close()
 
-            # Create a new attachment by calling resilient REST API
+def create_datatable_rows(res_client, incident_id, datatable_name, rows, concurrency=DEFAULT_BATCH_CONCURRENCY):
+    """
+    Add many rows to a Data Table of an Incident, posting up to ``concurrency`` of them at a time.
 
-            if task_id:
-                attachment_uri = "/tasks/{}/attachments".format(task_id)
-            else:
-                attachment_uri = "/incidents/{}/attachments".format(incident_id)
+    **Example:**
 
-            new_attachment = res_client.post_attachment(attachment_uri,
-                                                        temp_file.name,
-                                                        filename=file_name,
-                                                        mimetype=content_type)
-        finally:
-            os.unlink(temp_file.name)
+    .. code-block:: python
 
-    if isinstance(new_attachment, list):
-        new_attachment = new_attachment[0]
+        rows = [{"dt_col_ip": ip, "dt_col_status": "blocked"} for ip in ips]
+        results = create_datatable_rows(self.rest_client(), fn_inputs.incident_id, "dt_blocked_ips", rows)
 
-    return new_attachment
+    :param res_client: required for communication back to resilient
+    :type res_client: :class:`ResilientComponent.rest_client() <resilient_circuits.actions_component.ResilientComponent.rest_client()>`
+    :param incident_id: id of the Incident
+    :type incident_id: int|str
+    :param datatable_name: API name of the Data Table
+    :type datatable_name: str
+    :param rows: each row to add as a ``column_api_name:value`` dict
+    :type rows: list
+    :param concurrency: (optional) maximum number of requests in flight at once
+    :type concurrency: int
+    :return: for each row, in the same order, the row created or the exception raised when creating it
+    :rtype: list
+    """
+    uri = "/incidents/{}/table_data/{}/row_data?handle_format=names".format(incident_id, datatable_name)
+    payloads = [{"cells": dict((column, {"value": value}) for column, value in row.items())} for row in rows]
+    return res_client.post_many(uri, payloads, concurrency=concurrency)
 
 
 def readable_datetime(timestamp, milliseconds=True, rtn_format='%Y-%m-%dT%H:%M:%SZ'):
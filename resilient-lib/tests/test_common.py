@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import io
 import os
 import sys
 import shutil
+import tempfile
 import unittest
 import logging
 import pytest
@@ -10,13 +13,46 @@ from collections import namedtuple
 
 from resilient_lib.components.resilient_common import str_to_bool, readable_datetime, validate_fields, \
     unescape, clean_html, build_incident_url, build_resilient_url, get_file_attachment, get_file_attachment_name, \
-    get_file_attachment_metadata, write_to_tmp_file, close_incident
+    get_file_attachment_metadata, write_file_attachment, write_to_tmp_file, close_incident, create_artifacts, create_incident_notes, \
+    create_datatable_rows
 
 LOG = logging.getLogger(__name__)
 LOG.setLevel(logging.INFO)
 LOG.addHandler(logging.StreamHandler())
 
 
+class MockBatchClient(object):
+    """ Records the calls to post_many """
+    def __init__(self):
+        self.calls = []
+
+    def post_many(self, uri, payloads, concurrency=None):
+        self.calls.append((uri, payloads, concurrency))
+        return [{"id": i} for i, _ in enumerate(payloads)]
+
+
+class MockStreamClient(object):
+    """ Returns the content from get_content_stream in chunks """
+    def __init__(self, content, chunk_size=4):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.uris = []
+
+    def get_content_stream(self, uri):
+        self.uris.append(uri)
+        return (self.content[i:i + self.chunk_size] for i in range(0, len(self.content), self.chunk_size))
+
+
+class MockUploadClient(object):
+    """ Records the calls to post_attachment """
+    def __init__(self):
+        self.calls = []
+
+    def post_attachment(self, uri, filepath, filename=None, mimetype=None):
+        self.calls.append((uri, filepath, filename, mimetype))
+        return [{"id": 1, "name": filename}]
+
+
 class TestFunctionMetrics(unittest.TestCase):
     """ Tests for the attachment_hash function"""
 
@@ -166,6 +202,42 @@ class TestFunctionMetrics(unittest.TestCase):
         with self.assertRaises(ValueError):
             get_file_attachment(None, None, attachment_id=123)
 
+    def test_file_attachment_stream_to_path(self):
+        mock_client = MockStreamClient(b"mock attachment contents")
+        path = os.path.join(tempfile.mkdtemp(), "mock_attachment.txt")
+        self.DIRS_TO_REMOVE.append(os.path.dirname(path))
+
+        result = get_file_attachment(mock_client, 2314, attachment_id=5, stream_to=path,
+                                     hash_algorithms=["md5", "sha256"])
+
+        assert mock_client.uris == ["/incidents/2314/attachments/5/contents"]
+        with open(path, "rb") as f:
+            assert f.read() == b"mock attachment contents"
+        assert result == {"size": 24,
+                          "md5": hashlib.md5(b"mock attachment contents").hexdigest(),
+                          "sha256": hashlib.sha256(b"mock attachment contents").hexdigest()}
+
+    def test_file_attachment_stream_to_fileobj(self):
+        mock_client = MockStreamClient(b"mock artifact contents")
+        stream = io.BytesIO()
+
+        result = get_file_attachment(mock_client, 2314, artifact_id=3, stream_to=stream)
+
+        assert mock_client.uris == ["/incidents/2314/artifacts/3/contents"]
+        assert not stream.closed
+        assert stream.getvalue() == b"mock artifact contents"
+        assert result == {"size": 22}
+
+    def test_write_file_attachment_streams(self):
+        mock_client = MockUploadClient()
+        datastream = io.BytesIO(b"mock attachment contents")
+
+        result = write_file_attachment(mock_client, "malware.eml", datastream, 2314, task_id=5)
+
+        assert result == {"id": 1, "name": "malware.eml"}
+        assert mock_client.calls == [("/tasks/5/attachments", datastream, "malware.eml", "message/rfc822")]
+        assert datastream.tell() == 0
+
     def test_file_attachment_name_error(self):
         with self.assertRaises(ValueError):
             get_file_attachment_name(None, 123)
@@ -274,6 +346,29 @@ class TestFunctionMetrics(unittest.TestCase):
         actual_name = get_file_attachment_name(str_name_mock, incident_id=inc_id, artifact_id=artifact_id)
         assert actual_name == expected_name
 
+    def test_create_artifacts(self):
+        mock_client = MockBatchClient()
+        artifacts = [{"type": "IP Address", "value": "1.2.3.4"}, {"type": "DNS Name", "value": "example.com"}]
+        results = create_artifacts(mock_client, 2314, artifacts, concurrency=3)
+        assert results == [{"id": 0}, {"id": 1}]
+        assert mock_client.calls == [("/incidents/2314/artifacts", artifacts, 3)]
+
+    def test_create_incident_notes(self):
+        mock_client = MockBatchClient()
+        note_dto = {"text": {"format": "html", "content": "<b>mock note</b>"}}
+        create_incident_notes(mock_client, 2314, ["mock note", note_dto])
+        uri, payloads, concurrency = mock_client.calls[0]
+        assert uri == "/incidents/2314/comments"
+        assert payloads == [{"text": {"format": "text", "content": "mock note"}}, note_dto]
+        assert concurrency == 5
+
+    def test_create_datatable_rows(self):
+        mock_client = MockBatchClient()
+        create_datatable_rows(mock_client, 2314, "mock_dt", [{"dt_ip": "1.2.3.4", "dt_count": 2}])
+        uri, payloads, concurrency = mock_client.calls[0]
+        assert uri == "/incidents/2314/table_data/mock_dt/row_data?handle_format=names"
+        assert payloads == [{"cells": {"dt_ip": {"value": "1.2.3.4"}, "dt_count": {"value": 2}}}]
+
     @pytest.mark.skip(reason="fails on decorator")
     def test_close_incident(self):
         # patch_to_close_incident(res_client, incident_id, mandatory_fields):
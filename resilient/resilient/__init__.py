@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # (c) Copyright IBM Corp. 2010, 2017. All Rights Reserved.
 
+import sys
 import pkg_resources
 try:
     __version__ = pkg_resources.get_distribution(__name__).version
@@ -15,6 +16,9 @@ from .co3 import SimpleClient, \
     get_config_file, \
     get_resilient_circuits_version
 
+if sys.version_info >= (3, 6):
+    from .co3async import AsyncSimpleClient, AsyncResponse, get_async_client
+
 from .helpers import is_env_proxies_set, get_and_parse_proxy_env_var
 
 from .co3base import ensure_unicode, \
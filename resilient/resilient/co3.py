@@ -15,10 +15,12 @@ import datetime
 import unicodedata
 import requests
 import importlib
+import threading
+from multiprocessing.pool import ThreadPool
 from . import co3base
 from .patch import PatchStatus
 from argparse import Namespace
-from requests.adapters import HTTPAdapter
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE, DEFAULT_POOLBLOCK
 from requests.packages.urllib3.poolmanager import PoolManager
 from requests_toolbelt.multipart.encoder import MultipartEncoder
 from cachetools import cachedmethod
@@ -28,12 +30,16 @@ from .co3base import ensure_unicode, get_proxy_dict, NoChange
 try:
     # Python 3
     import urllib.parse as urlparse
+    from urllib.parse import urlencode
 except:
     # Python 2
     import urlparse
+    from urllib import urlencode
 
 
 DEFAULT_CONFIG_FILENAME = "app.config"
+DEFAULT_POST_MANY_CONCURRENCY = 10
+DEFAULT_QUERY_PAGE_SIZE = 1000
 LOG = logging.getLogger(__name__)
 
 
@@ -130,10 +136,15 @@ def get_client(opts):
     # Create SimpleClient for a REST connection to the Resilient services
     url = "https://{0}:{1}".format(opts.get("host", ""), opts.get("port", 443))
     url = urlparse.urljoin(url, opts.get("resource_prefix", ""))
+    # Keep enough connections alive for every worker thread (and the main thread) to reuse one
+    pool_maxsize = opts.get("http_pool_maxsize") or max(DEFAULT_POOLSIZE, int(opts.get("num_workers") or 0) + 1)
     simple_client_args = {"org_name": opts.get("org"),
                           "proxies": proxy,
                           "base_url": url,
-                          "verify": verify}
+                          "verify": verify,
+                          "pool_connections": int(opts.get("http_pool_connections") or DEFAULT_POOLSIZE),
+                          "pool_maxsize": int(pool_maxsize),
+                          "pool_block": str(opts.get("http_pool_block", DEFAULT_POOLBLOCK)).lower() in ("1", "true", "yes")}
     if opts.get("log_http_responses"):
         LOG.warning("Logging all HTTP Responses from Resilient to %s", opts["log_http_responses"])
         simple_client = LoggingSimpleClient
@@ -287,7 +298,8 @@ class SimpleClient(co3base.BaseClient):
         or by going to: ``https://<base_url>/docs/rest-api/index.html``
     """
 
-    def __init__(self, org_name=None, base_url=None, proxies=None, verify=None, cache_ttl=240):
+    def __init__(self, org_name=None, base_url=None, proxies=None, verify=None, cache_ttl=240,
+                 pool_connections=DEFAULT_POOLSIZE, pool_maxsize=DEFAULT_POOLSIZE, pool_block=DEFAULT_POOLBLOCK):
         """
         :param org_name: The name of the organization to use.
         :type org_name: str
@@ -299,10 +311,34 @@ class SimpleClient(co3base.BaseClient):
         :type verify: str|bool
         :param cache_ttl: Time in seconds to live for cached API responses
         :type cache_ttl: int
+        :param pool_connections: Number of HTTP connection pools to keep (one per host)
+        :type pool_connections: int
+        :param pool_maxsize: Maximum number of connections kept alive in each pool.
+            Should be at least the number of threads using the client concurrently
+        :type pool_maxsize: int
+        :param pool_block: If ``True``, wait for a free connection rather than opening one beyond ``pool_maxsize``
+        :type pool_block: bool
         """
-        super(SimpleClient, self).__init__(org_name, base_url, proxies, verify)
+        super(SimpleClient, self).__init__(org_name, base_url, proxies, verify,
+                                           pool_connections=pool_connections,
+                                           pool_maxsize=pool_maxsize,
+                                           pool_block=pool_block)
         self.cache = TTLCache(maxsize=128, ttl=cache_ttl)
 
+    def clone(self):
+        """
+        Return a copy of this client for use on another thread.
+
+        The copy shares the authenticated session and connection pool of this client
+        but has its own ``requests.Session`` and response cache.
+
+        :return: a connected copy of this client
+        :rtype: :class:`SimpleClient`
+        """
+        client = super(SimpleClient, self).clone()
+        client.cache = TTLCache(maxsize=self.cache.maxsize, ttl=self.cache.ttl)
+        return client
+
     def connect(self, email, password, timeout=None):
         """
         Connect and authenticate to the IBM SOAR REST API service.
@@ -423,6 +459,41 @@ class SimpleClient(co3base.BaseClient):
             _raise_if_error(ex.get_response())
         return response
 
+    def get_content_stream(self, uri, chunk_size=co3base.DEFAULT_STREAM_CHUNK_SIZE, co3_context_token=None, timeout=None):
+        """Gets the specified URI as a stream, without reading the whole response into memory.
+
+        .. code-block:: python
+
+            with open("capture.pcap", "wb") as f:
+                for chunk in res_client.get_content_stream("/incidents/2095/attachments/1/contents"):
+                    f.write(chunk)
+
+        .. note::
+            This URI is relative to ``<base_url>/rest/orgs/<org_id>``.  So for example,
+            if you specify a uri of ``/incidents``, the actual URL would be something like:
+            ``https://soar.ibm.com/rest/orgs/201/incidents``
+
+        :param uri: Relative URI of the resource to fetch.
+        :type uri: str
+        :param chunk_size: Number of bytes in each chunk.
+        :type chunk_size: int
+        :param co3_context_token: The ``Co3ContextToken`` from an Action Module message, if available.
+        :type co3_context_token: str
+        :param timeout: Optional timeout (seconds).
+        :type timeout: int
+        :return: An iterator of the chunks of the raw value returned by the server for this resource.
+            The connection is released once it is exhausted or closed.
+        :rtype: iterator
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        # Call get_content_stream from BaseClient. Convert exception if there is any
+        response = None
+        try:
+            response = super(SimpleClient, self).get_content_stream(uri, chunk_size, co3_context_token, timeout)
+        except co3base.BasicHTTPException as ex:
+            _raise_if_error(ex.get_response())
+        return response
+
     def post(self, uri, payload, co3_context_token=None, timeout=None):
         """
         Posts to the specified URI.
@@ -452,6 +523,136 @@ class SimpleClient(co3base.BaseClient):
             _raise_if_error(ex.get_response())
         return response
 
+    def post_many(self, uri, payloads, concurrency=DEFAULT_POST_MANY_CONCURRENCY, co3_context_token=None, timeout=None):
+        """
+        Posts each of the payloads to the specified URI, up to ``concurrency`` at a time.
+
+        Each concurrent request is sent by a :meth:`clone` of this client, so they share
+        its authentication and keep-alive connections. A failure of one payload does not
+        stop the others: the exception raised for it is returned in its place.
+
+        .. code-block:: python
+
+            results = res_client.post_many("/incidents/2095/artifacts", artifacts, concurrency=5)
+            failed = [artifact for artifact, result in zip(artifacts, results) if isinstance(result, Exception)]
+
+        .. note::
+            Keep ``concurrency`` at or below the ``http_pool_maxsize`` of the client,
+            otherwise connections are opened and discarded rather than reused.
+
+        :param uri: Relative URI of the resource to post.
+        :type uri: str
+        :param payloads: The dictionary values to be posted.
+        :type payloads: list
+        :param concurrency: Maximum number of requests in flight at once.
+        :type concurrency: int
+        :param co3_context_token: The ``Co3ContextToken`` from an Action Module message, if available.
+        :type co3_context_token: str
+        :param timeout: Optional timeout (seconds) for each request.
+        :type timeout: int
+        :return: For each payload, in the same order, the value returned by the server
+            or the exception (e.g. :class:`SimpleHTTPException`) raised when posting it.
+        :rtype: list
+        """
+        payloads = list(payloads)
+        local = threading.local()
+
+        def post_one(payload):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = self if concurrency <= 1 else self.clone()
+            try:
+                return client.post(uri, payload, co3_context_token=co3_context_token, timeout=timeout)
+            except Exception as err:
+                LOG.debug(u"post_many: failed to post to %s: %s", uri, err)
+                return err
+
+        if concurrency <= 1 or len(payloads) <= 1:
+            return [post_one(payload) for payload in payloads]
+
+        pool = ThreadPool(min(concurrency, len(payloads)))
+        try:
+            return pool.map(post_one, payloads)
+        finally:
+            pool.close()
+            pool.join()
+
+    def iter_query_paged(self, uri, body=None, page_size=DEFAULT_QUERY_PAGE_SIZE, prefetch=False,
+                         return_level=None, field_handles=None, co3_context_token=None, timeout=None):
+        """
+        Iterate over the records of a ``query_paged`` endpoint, e.g. ``/incidents/query_paged``,
+        getting one page at a time rather than the whole result at once.
+
+        .. code-block:: python
+
+            query = {"filters": [{"conditions": [{"field_name": "plan_status", "method": "equals", "value": "A"}]}]}
+            for incident in res_client.iter_query_paged("/incidents/query_paged", query, return_level="partial"):
+                print(incident["id"])
+
+        :param uri: Relative URI of the ``query_paged`` endpoint.
+        :type uri: str
+        :param body: The ``QueryDTO`` (filters, sorts, ...). Its ``start`` and ``length`` are set for each page.
+        :type body: dict
+        :param page_size: Number of records to get with each request.
+        :type page_size: int
+        :param prefetch: If ``True``, get the next page on a background thread while the current one is processed.
+        :type prefetch: bool
+        :param return_level: Optional ``return_level`` of the records: ``"partial"``, ``"normal"`` or ``"full"``.
+        :type return_level: str
+        :param field_handles: Optional list of the custom fields to return with each record (``[-1]`` for none).
+        :type field_handles: list
+        :param co3_context_token: The ``Co3ContextToken`` from an Action Module message, if available.
+        :type co3_context_token: str
+        :param timeout: Optional timeout (seconds) for each request.
+        :type timeout: int
+        :return: A generator of the records, as dictionaries.
+        :rtype: generator
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        params = []
+        if return_level:
+            params.append((u"return_level", return_level))
+        for field_handle in field_handles or []:
+            params.append((u"field_handle", field_handle))
+        if params:
+            uri = u"{0}{1}{2}".format(uri, u"&" if u"?" in uri else u"?", urlencode(params))
+
+        def get_page(client, start):
+            payload = dict(body or {}, start=start, length=page_size)
+            response = client.post(uri, payload, co3_context_token=co3_context_token, timeout=timeout)
+            page = response.get("data", [])
+            # recordsFiltered (if returned) saves asking for one more page just to get an empty one
+            total = response.get("recordsFiltered")
+            is_last = not page or (total is not None and start + len(page) >= total)
+            return page, is_last
+
+        pool = None
+        if prefetch:
+            # Pages are fetched by a clone, as the caller may use this client meanwhile
+            client = self.clone()
+            pool = ThreadPool(1)
+            next_page = pool.apply_async(get_page, (client, 0))
+
+        start = 0
+        try:
+            while True:
+                if pool:
+                    page, is_last = next_page.get()
+                    if not is_last:
+                        next_page = pool.apply_async(get_page, (client, start + len(page)))
+                else:
+                    page, is_last = get_page(self, start)
+
+                for record in page:
+                    yield record
+
+                if is_last:
+                    return
+                start += len(page)
+        finally:
+            if pool:
+                pool.terminate()
+
     def _patch(self, uri, patch, co3_context_token=None, timeout=None):
         """Internal method used to call the underlying server patch endpoint"""
         url = u"{0}/rest/orgs/{1}{2}".format(self.base_url, self.org_id, ensure_unicode(uri))
@@ -611,9 +812,14 @@ class SimpleClient(co3base.BaseClient):
 
         :param uri: Relative URI of the resource to post.
         :type uri: str
-        :param filepath: the path of the file to post
-        :type filepath: str
-        :param filename: optional name of the file when posted
+        The file can also be a file-like object opened in binary mode, or an iterator of bytes,
+        for example the ``raw`` stream of another response. It is streamed to the server
+        without being read into memory.
+
+        :param filepath: the path of the file to post, or a file-like object or iterator of bytes
+        :type filepath: str|file|iterator
+        :param filename: optional name of the file when posted. Required if ``filepath`` is
+            a stream without a ``name``
         :type filename: str
         :param mimetype: optional override for the guessed MIME type
         :type mimetype: str
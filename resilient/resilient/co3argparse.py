@@ -126,8 +126,11 @@ class ArgumentParser(argparse.ArgumentParser):
         default_proxy_port = self.getopt("resilient", "proxy_port") or 0
         default_proxy_user = self.getopt("resilient", "proxy_user")
         default_proxy_password = self.getopt("resilient", "proxy_password")
-        default_stomp_prefetch_limit = int(self.getopt("resilient", "stomp_prefetch_limit") or 20)
+        default_stomp_prefetch_limit = int(self.getopt("resilient", "stomp_prefetch_limit") or 0)
         default_resilient_mock = self.getopt("resilient", "resilient_mock")
+        default_http_pool_connections = int(self.getopt("resilient", "http_pool_connections") or 0)
+        default_http_pool_maxsize = int(self.getopt("resilient", "http_pool_maxsize") or 0)
+        default_http_pool_block = (self.getopt("resilient", "http_pool_block") or "").lower() in ("1", "true", "yes")
 
         self.add_argument("--email",
                           default=default_email,
@@ -198,9 +201,25 @@ class ArgumentParser(argparse.ArgumentParser):
                           help="HTTP Proxy password for Resilient connection authentication.")
 
         self.add_argument("--stomp-prefetch-limit",
-                          default=default_stomp_prefetch_limit,
+                          default=default_stomp_prefetch_limit or None,
                           type=int,
-                          help="MAX number of Action Module messages to send before ACK is required")
+                          help=("MAX number of Action Module messages to send before ACK is required, "
+                                "for each message destination. Defaults to num_workers"))
+
+        self.add_argument("--http-pool-connections",
+                          default=default_http_pool_connections or None,
+                          type=int,
+                          help="Number of HTTP connection pools to keep for the REST API (one per host)")
+
+        self.add_argument("--http-pool-maxsize",
+                          default=default_http_pool_maxsize or None,
+                          type=int,
+                          help="MAX number of REST API connections to keep alive. Defaults to num_workers + 1")
+
+        self.add_argument("--http-pool-block",
+                          default=default_http_pool_block,
+                          action="store_true",
+                          help="Wait for a free REST API connection instead of opening more than --http-pool-maxsize")
 
         v_resc = get_resilient_circuits_version()
 
@@ -0,0 +1,520 @@
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+"""Asynchronous client for Resilient REST API (Python 3 only)"""
+
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import ssl
+
+from cachetools.ttl import TTLCache
+
+from resilient import helpers
+from resilient.co3 import SimpleClient, _raise_if_error
+from resilient.co3base import BaseClient, NoChange, ensure_unicode, get_proxy_dict
+
+try:
+    import urllib.parse as urlparse
+except ImportError:
+    import urlparse
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_POOL_MAXSIZE = 100
+
+
+async def get_async_client(opts):
+    """
+    Helper: get a connected :class:`AsyncSimpleClient` for the SOAR REST API.
+
+    Takes the same options as :func:`resilient.get_client`, except ``resilient_mock``
+    and ``log_http_responses`` which are not supported.
+
+    :param opts: the connection options, as a :class:`dict`
+    :return: a connected instance of AsyncSimpleClient.
+    """
+    verify = opts.get("cafile")
+    if str(verify).lower() == "false":
+        LOG.warning("Unverified HTTPS requests (cafile=false).")
+        verify = False
+
+    proxy = None
+    if opts.get("proxy_host"):
+        proxy = get_proxy_dict(opts)
+
+    url = "https://{0}:{1}".format(opts.get("host", ""), opts.get("port", 443))
+    url = urlparse.urljoin(url, opts.get("resource_prefix", ""))
+
+    client = AsyncSimpleClient(org_name=opts.get("org"),
+                               base_url=url,
+                               proxies=proxy,
+                               verify=verify,
+                               cache_ttl=opts.get("cache_ttl") or 240,
+                               pool_maxsize=opts.get("http_pool_maxsize") or DEFAULT_POOL_MAXSIZE)
+
+    if opts.get("api_key_id", None) is not None and opts.get("api_key_secret", None) is not None:
+        await client.set_api_key(api_key_id=opts["api_key_id"], api_key_secret=opts["api_key_secret"])
+    else:
+        await client.connect(opts["email"], opts["password"])
+
+    opts["org_id"] = client.org_id
+    return client
+
+
+class AsyncResponse(object):
+    """
+    A response from :class:`AsyncSimpleClient`, with its body already read.
+
+    Has the attributes of a ``requests.Response`` that callers of :class:`SimpleClient <resilient.co3.SimpleClient>`
+    use (``status_code``, ``reason``, ``headers``, ``content``, ``text`` and ``json()``),
+    so it can be handled the same way, e.g. in :class:`SimpleHTTPException <resilient.co3.SimpleHTTPException>`.
+    """
+    def __init__(self, response, content):
+        self.status_code = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.cookies = response.cookies
+        self.url = str(response.url)
+        self.encoding = response.charset or "utf-8"
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncSimpleClient(object):
+    """
+    asyncio version of :class:`SimpleClient <resilient.co3.SimpleClient>`, built on ``aiohttp``.
+
+    It has the same methods, arguments and return values as :class:`SimpleClient <resilient.co3.SimpleClient>`,
+    but each one is a coroutine. All the requests share one pool of up to ``pool_maxsize`` connections,
+    so a single thread can have many requests in flight at once.
+
+    Requires ``aiohttp``: ``pip install resilient[async]``
+
+    .. code-block:: python
+
+        async def get_incidents(opts, incident_ids):
+            async with await get_async_client(opts) as client:
+                return await asyncio.gather(*[client.get("/incidents/{0}".format(inc_id)) for inc_id in incident_ids])
+    """
+
+    # Shared with the blocking clients
+    make_headers = BaseClient.make_headers
+    _extract_org_id = BaseClient._extract_org_id
+    _patch_overwrite_callback = staticmethod(SimpleClient._patch_overwrite_callback)
+    _patch_raise_callback = staticmethod(SimpleClient._patch_raise_callback)
+
+    def __init__(self, org_name=None, base_url=None, proxies=None, verify=None, cache_ttl=240,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        """
+        :param org_name: The name of the organization to use.
+        :type org_name: str
+        :param base_url: The base URL of the SOAR server, e.g. ``https://soar.ibm.com/``
+        :type base_url: str
+        :param proxies: A dictionary of ``HTTP`` proxies to use, if any.
+        :type proxies: dict
+        :param verify: The path to a ``PEM`` file containing the trusted CAs, or ``False`` to disable all TLS verification
+        :type verify: str|bool
+        :param cache_ttl: Time in seconds to live for cached API responses
+        :type cache_ttl: int
+        :param pool_maxsize: Maximum number of concurrent connections to the server
+        :type pool_maxsize: int
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncSimpleClient requires 'aiohttp'. Install it with: pip install resilient[async]")
+
+        self.headers = {'content-type': 'application/json'}
+        self.cookies = None
+        self.org_id = None
+        self.user_id = None
+        self.all_orgs = None
+        self.base_url = u'https://app.resilientsystems.com/'
+        self.org_name = ensure_unicode(org_name)
+        self.proxies = proxies if proxies and not helpers.is_env_proxies_set() else None
+        if base_url:
+            self.base_url = ensure_unicode(base_url)
+        self.verify = True if verify is None else ensure_unicode(verify)
+        self.authdata = None
+        self.cache = TTLCache(maxsize=128, ttl=cache_ttl)
+        self.pool_maxsize = pool_maxsize
+        self.session = None
+
+        # API key
+        self.api_key_id = None
+        self.api_key_secret = None
+        self.use_api_key = False
+        self.api_key_handle = None
+
+        self._auth_lock = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the connection pool"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        """The aiohttp session has to be created inside the event loop, so do it on first use"""
+        if self.session is None:
+            if self.verify is False:
+                ssl_context = False
+            elif self.verify is True:
+                ssl_context = None
+            else:
+                ssl_context = ssl.create_default_context(cafile=self.verify)
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, ssl=ssl_context)
+            # The session id is sent explicitly with each request, so don't keep the server's cookies
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 cookie_jar=aiohttp.DummyCookieJar(),
+                                                 trust_env=self.proxies is None)
+            self._auth_lock = asyncio.Lock()
+        return self.session
+
+    def _org_url(self, uri):
+        return u"{0}/rest/orgs/{1}{2}".format(self.base_url, self.org_id, ensure_unicode(uri))
+
+    async def _request(self, method, url, data=None, co3_context_token=None, additional_headers=None, timeout=None):
+        """Send one request and read its response"""
+        session = self._get_session()
+        headers = self.make_headers(co3_context_token, additional_headers)
+        if callable(data):
+            # multipart bodies can only be sent once, so they are built for each attempt
+            data = data()
+            headers.pop("content-type", None)
+
+        kwargs = {
+            "data": data,
+            "headers": headers,
+            "timeout": aiohttp.ClientTimeout(total=timeout)
+        }
+        if self.use_api_key:
+            kwargs["auth"] = aiohttp.BasicAuth(self.api_key_id, self.api_key_secret)
+        elif self.cookies:
+            kwargs["cookies"] = self.cookies
+        if self.proxies:
+            kwargs["proxy"] = self.proxies.get("https")
+
+        async with session.request(method, url, **kwargs) as response:
+            content = await response.read()
+            return AsyncResponse(response, content)
+
+    async def _execute_request(self, method, url, **kwargs):
+        """Execute a HTTP request.
+           If unauthorized (likely due to a session timeout), re-authenticate and retry.
+        """
+        stale_cookies = self.cookies
+        response = await self._request(method, url, **kwargs)
+        if response.status_code == 401 and not self.use_api_key:
+            await self._reconnect(stale_cookies)
+            response = await self._request(method, url, **kwargs)
+        return response
+
+    async def _reconnect(self, stale_cookies):
+        """Re-establish the session once, however many concurrent requests got a 401"""
+        async with self._auth_lock:
+            if self.cookies == stale_cookies:
+                await self._connect()
+
+    async def set_api_key(self, api_key_id, api_key_secret, timeout=None):
+        """
+        Call this method instead of :meth:`connect` to authenticate with an API key.
+
+        :param api_key_id: API key ID.
+        :type api_key_id: str
+        :param api_key_secret: API key secret.
+        :type api_key_secret: str
+        :param timeout: optional timeout (seconds)
+        :type timeout: int
+        :return: The IBM SOAR session object.
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        self.api_key_id = api_key_id
+        self.api_key_secret = api_key_secret
+        self.use_api_key = True
+
+        response = await self._request("GET", u"{0}/rest/session".format(self.base_url), timeout=timeout)
+        _raise_if_error(response)
+        session = response.json()
+        self._extract_org_id(session)
+        self.api_key_handle = session.get("api_key_handle", None)
+        return session
+
+    async def connect(self, email, password, timeout=None):
+        """
+        Connect and authenticate to the IBM SOAR REST API service.
+
+        :param email: The email address to use for authentication.
+        :type email: str
+        :param password: The password.
+        :type password: str
+        :param timeout: optional timeout (seconds)
+        :type timeout: int
+        :return: The IBM SOAR session object.
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        self.authdata = {
+            u'email': ensure_unicode(email),
+            u'password': ensure_unicode(password)
+        }
+        return await self._connect(timeout=timeout)
+
+    async def _connect(self, timeout=None):
+        """Establish a session"""
+        self.cookies = None
+        response = await self._request("POST", u"{0}/rest/session".format(self.base_url),
+                                       data=json.dumps(self.authdata), timeout=timeout)
+        _raise_if_error(response)
+        session = response.json()
+        self._extract_org_id(session)
+
+        # set the X-sess-id token, which is used to prevent CSRF attacks.
+        self.headers['X-sess-id'] = session['csrf_token']
+        self.cookies = {
+            'JSESSIONID': response.cookies['JSESSIONID'].value
+        }
+        self.user_id = session["user_id"]
+        return session
+
+    async def get(self, uri, co3_context_token=None, timeout=None, is_uri_absolute=None):
+        """
+        Gets the specified URI. See :meth:`SimpleClient.get() <resilient.co3.SimpleClient.get>`
+
+        :return: A dictionary or list with the value returned by the server.
+        :rtype: dict | list
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        if is_uri_absolute:
+            url = u"{0}/rest{1}".format(self.base_url, ensure_unicode(uri))
+        else:
+            url = self._org_url(uri)
+        response = await self._execute_request("GET", url, co3_context_token=co3_context_token, timeout=timeout)
+        _raise_if_error(response)
+        return response.json()
+
+    async def cached_get(self, uri, co3_context_token=None, timeout=None):
+        """ Same as :meth:`get()`, but checks cache first """
+        try:
+            return self.cache[uri]
+        except KeyError:
+            pass
+        value = await self.get(uri, co3_context_token, timeout)
+        self.cache[uri] = value
+        return value
+
+    async def get_const(self, co3_context_token=None, timeout=None):
+        """
+        Get the ``ConstREST`` endpoint. See :meth:`SimpleClient.get_const() <resilient.co3.SimpleClient.get_const>`
+
+        :return: ``ConstDTO`` as a dictionary
+        :rtype: dict
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        url = u"{0}/rest/const".format(self.base_url)
+        response = await self._execute_request("GET", url, co3_context_token=co3_context_token, timeout=timeout)
+        _raise_if_error(response)
+        return response.json()
+
+    async def get_content(self, uri, co3_context_token=None, timeout=None):
+        """
+        Gets the specified URI. See :meth:`SimpleClient.get_content() <resilient.co3.SimpleClient.get_content>`
+
+        :return: The raw value returned by the server for this resource.
+        :rtype: bytes
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        response = await self._execute_request("GET", self._org_url(uri),
+                                               co3_context_token=co3_context_token, timeout=timeout)
+        _raise_if_error(response)
+        return response.content
+
+    async def post(self, uri, payload, co3_context_token=None, timeout=None):
+        """
+        Posts to the specified URI. See :meth:`SimpleClient.post() <resilient.co3.SimpleClient.post>`
+
+        :return: A dictionary or list with the value returned by the server.
+        :rtype: dict | list
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        response = await self._execute_request("POST", self._org_url(uri), data=json.dumps(payload),
+                                               co3_context_token=co3_context_token, timeout=timeout)
+        _raise_if_error(response)
+        return response.json()
+
+    async def _patch(self, uri, patch, co3_context_token=None, timeout=None):
+        """Internal method used to call the underlying server patch endpoint"""
+        if isinstance(patch, dict):
+            payload_json = json.dumps(patch)
+        else:
+            payload_json = json.dumps(patch.to_dict())
+
+        return await self._execute_request("PATCH", self._org_url(uri), data=payload_json,
+                                           co3_context_token=co3_context_token,
+                                           additional_headers={"handle_format": "names"},
+                                           timeout=timeout)
+
+    _handle_patch_response = SimpleClient._handle_patch_response
+
+    async def patch(self, uri, patch, co3_context_token=None, timeout=None, overwrite_conflict=False):
+        """
+        PATCH request to the specified URI. See :meth:`SimpleClient.patch() <resilient.co3.SimpleClient.patch>`
+
+        :return: the ``response`` from the endpoint.
+        :rtype: :class:`AsyncResponse`
+        :raises SimpleHTTPException: if an HTTP exception or patch conflict occurs.
+        :raises PatchConflictException: If the patch failed to apply (and overwrite_conflict is False).
+        """
+        if overwrite_conflict:
+            callback = AsyncSimpleClient._patch_overwrite_callback
+        else:
+            callback = AsyncSimpleClient._patch_raise_callback
+
+        return await self.patch_with_callback(uri, patch, callback, co3_context_token, timeout)
+
+    async def patch_with_callback(self, uri, patch, callback, co3_context_token=None, timeout=None):
+        """
+        PATCH request to the specified URI, invoking ``callback`` on field conflicts.
+        See :meth:`SimpleClient.patch_with_callback() <resilient.co3.SimpleClient.patch_with_callback>`
+
+        :return: the ``response`` from the endpoint.
+        :rtype: :class:`AsyncResponse`
+        """
+        response = await self._patch(uri, patch, co3_context_token, timeout)
+
+        while self._handle_patch_response(response, patch, callback):
+            response = await self._patch(uri, patch, co3_context_token, timeout)
+
+        return response
+
+    async def post_attachment(self, uri, filepath,
+                              filename=None, mimetype=None, data=None, co3_context_token=None, timeout=None):
+        """
+        Upload a file to the specified URI.
+        See :meth:`SimpleClient.post_attachment() <resilient.co3.SimpleClient.post_attachment>`
+
+        :return: A dictionary with the value returned by the server.
+        :rtype: dict
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        filepath = ensure_unicode(filepath)
+        if filename:
+            filename = ensure_unicode(filename)
+        attachment_name = filename or os.path.basename(filepath)
+        mime_type = mimetype or mimetypes.guess_type(filename or filepath)[0] or "application/octet-stream"
+
+        def multipart_data():
+            # aiohttp closes the file once it has been sent
+            form = aiohttp.FormData()
+            form.add_field("file", open(filepath, 'rb'), filename=attachment_name, content_type=mime_type)
+            for name, value in (data or {}).items():
+                form.add_field(name, value)
+            return form
+
+        response = await self._execute_request("POST", self._org_url(uri), data=multipart_data,
+                                               co3_context_token=co3_context_token, timeout=timeout)
+        _raise_if_error(response)
+        return response.json()
+
+    async def post_artifact_file(self, uri, artifact_type, artifact_filepath,
+                                 description=None, value=None, mimetype=None, co3_context_token=None, timeout=None):
+        """
+        Post a file artifact to the specified URI, e.g. ``/incidents/<id>/artifacts/files``.
+        See :meth:`SimpleClient.post_artifact_file() <resilient.co3base.BaseClient.post_artifact_file>`
+        """
+        artifact = {
+            "type": artifact_type,
+            "value": value or "",
+            "description": description or ""
+        }
+        return await self.post_attachment(uri,
+                                          artifact_filepath,
+                                          mimetype=mimetype,
+                                          data={"artifact": json.dumps(artifact)},
+                                          co3_context_token=co3_context_token,
+                                          timeout=timeout)
+
+    async def search(self, payload, co3_context_token=None, timeout=None):
+        """
+        Posts to the ``SearchExREST`` endpoint. See :meth:`SimpleClient.search() <resilient.co3.SimpleClient.search>`
+
+        :return: List of results, as an array of ``SearchExResultDTO``
+        :rtype: list
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        url = u"{0}/rest/search_ex".format(self.base_url)
+        response = await self._execute_request("POST", url, data=json.dumps(payload),
+                                               co3_context_token=co3_context_token, timeout=timeout)
+        _raise_if_error(response)
+        return response.json()
+
+    async def get_put(self, uri, apply_func, co3_context_token=None, timeout=None):
+        """
+        GET, call ``apply_func`` on the result, then PUT it back, retrying if the PUT returns a ``409``.
+        See :meth:`SimpleClient.get_put() <resilient.co3.SimpleClient.get_put>`
+
+        :return: A dictionary or list with the value returned by the PUT operation.
+        :rtype: dict | list
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        url = self._org_url(uri)
+        while True:
+            response = await self._execute_request("GET", url, co3_context_token=co3_context_token, timeout=timeout)
+            _raise_if_error(response)
+            payload = response.json()
+            try:
+                apply_func(payload)
+            except NoChange:
+                return payload
+
+            response = await self._execute_request("PUT", url, data=json.dumps(payload),
+                                                   co3_context_token=co3_context_token, timeout=timeout)
+            if response.status_code == 409:
+                continue
+            _raise_if_error(response)
+            return response.json()
+
+    async def put(self, uri, payload, co3_context_token=None, timeout=None):
+        """
+        Directly performs an update operation by PUT to the specified URI.
+        See :meth:`SimpleClient.put() <resilient.co3.SimpleClient.put>`
+
+        :return: A dictionary or list with the value returned by the server.
+        :rtype: dict | list
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        response = await self._execute_request("PUT", self._org_url(uri), data=json.dumps(payload),
+                                               co3_context_token=co3_context_token, timeout=timeout)
+        _raise_if_error(response)
+        return response.json()
+
+    async def delete(self, uri, co3_context_token=None, timeout=None):
+        """
+        Deletes the specified URI. See :meth:`SimpleClient.delete() <resilient.co3.SimpleClient.delete>`
+
+        :raises SimpleHTTPException: if an HTTP exception occurs.
+        """
+        response = await self._execute_request("DELETE", self._org_url(uri),
+                                               co3_context_token=co3_context_token, timeout=timeout)
+        if response.status_code == 204:
+            # 204 - No content is OK for a delete
+            return None
+        _raise_if_error(response)
+        return response.json()
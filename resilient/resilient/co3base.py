@@ -4,19 +4,25 @@
 """Base client for Resilient REST API"""
 from __future__ import print_function
 
+import copy
 import json
 import ssl
 import mimetypes
 import os
+import stat
 import sys
 import logging
+import threading
 import unicodedata
+import uuid
 import requests
 
-from requests.adapters import HTTPAdapter
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE, DEFAULT_POOLBLOCK
 from requests.packages.urllib3.poolmanager import PoolManager
+from requests.packages.urllib3.fields import RequestField
 from requests_toolbelt.multipart.encoder import MultipartEncoder
 from requests.auth import HTTPBasicAuth
+from six import string_types
 
 from resilient import helpers, constants
 
@@ -29,6 +35,8 @@ except:
 
 LOG = logging.getLogger(__name__)
 
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class TLSHttpAdapter(HTTPAdapter):
     """
@@ -43,6 +51,26 @@ class TLSHttpAdapter(HTTPAdapter):
                                        block=block,
                                        ssl_version=ssl.PROTOCOL_SSLv23)
 
+    def get_pool_stats(self):
+        """
+        Get the connection reuse counters of the pools held by this adapter.
+
+        :return: a dict with the number of ``pools``, the ``pool_maxsize``, the number of ``requests`` sent,
+            the ``hits`` (requests sent on a kept-alive connection) and ``misses`` (new connections opened)
+        :rtype: dict
+        """
+        stats = {"pools": 0, "pool_maxsize": self._pool_maxsize, "requests": 0, "hits": 0, "misses": 0}
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["pools"] += 1
+            stats["requests"] += pool.num_requests
+            stats["misses"] += pool.num_connections
+        stats["hits"] = max(stats["requests"] - stats["misses"], 0)
+        return stats
+
 
 class BasicHTTPException(Exception):
     """Exception for HTTP errors."""
@@ -106,16 +134,85 @@ def get_proxy_dict(opts):
     return proxy
 
 
+def _get_rewind(stream):
+    """Return a function that seeks the stream back to where it is now, or None if it is not seekable"""
+    try:
+        seekable = stream.seekable() if hasattr(stream, "seekable") else hasattr(stream, "seek")
+        position = stream.tell() if seekable else None
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+    if position is None:
+        return None
+    return lambda: stream.seek(position)
+
+
+def _stream_length(stream):
+    """Return the number of bytes left to read from a file-like object,
+       or None if that cannot be known before reading it (sockets, pipes, iterators)
+    """
+    if hasattr(stream, "getvalue"):
+        return len(stream.getvalue())
+    try:
+        file_stat = os.fstat(stream.fileno())
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
+        return file_stat.st_size - stream.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
+def _iter_multipart(fields, boundary, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+    """Yield a multipart/form-data body, reading file parts a chunk at a time.
+       fields is a list of (name, value) or (name, (filename, file-like or iterator, content_type)).
+    """
+    for name, value in fields:
+        if isinstance(value, tuple):
+            filename, body, content_type = value
+        else:
+            filename, body, content_type = None, value, None
+        field = RequestField(name=name, data=body, filename=filename)
+        field.make_multipart(content_type=content_type)
+        yield u"--{0}\r\n{1}".format(boundary, field.render_headers()).encode("utf-8")
+
+        if isinstance(body, bytes):
+            yield body
+        elif isinstance(body, string_types):
+            yield body.encode("utf-8")
+        elif hasattr(body, "read"):
+            chunk = body.read(chunk_size)
+            while chunk:
+                yield chunk
+                chunk = body.read(chunk_size)
+        else:
+            for chunk in body:
+                yield chunk
+        yield b"\r\n"
+    yield u"--{0}--\r\n".format(boundary).encode("utf-8")
+
+
+def _iter_content(response, chunk_size):
+    """Yield the body of a streamed response, then release its connection"""
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            yield chunk
+    finally:
+        response.close()
+
+
 class BaseClient(object):
     """Helper for using Resilient REST API."""
 
-    def __init__(self, org_name=None, base_url=None, proxies=None, verify=None):
+    def __init__(self, org_name=None, base_url=None, proxies=None, verify=None,
+                 pool_connections=DEFAULT_POOLSIZE, pool_maxsize=DEFAULT_POOLSIZE, pool_block=DEFAULT_POOLBLOCK):
         """
         Args:
           org_name - the name of the organization to use.
           base_url - the base URL to use.
           proxies - HTTP proxies to use, if any.
           verify - The name of a PEM file to use as the list of trusted CAs.
+          pool_connections - number of HTTP connection pools (one per host) to keep.
+          pool_maxsize - max number of connections to keep alive in each pool.
+          pool_block - if True, wait for a free connection instead of opening one beyond pool_maxsize.
         """
         self.headers = {'content-type': 'application/json'}
         self.cookies = None
@@ -137,7 +234,9 @@ class BaseClient(object):
             self.verify = True
         self.authdata = None
         self.session = requests.Session()
-        self.session.mount(u'https://', TLSHttpAdapter())
+        self.session.mount(u'https://', TLSHttpAdapter(pool_connections=pool_connections,
+                                                       pool_maxsize=pool_maxsize,
+                                                       pool_block=pool_block))
 
         # API key
         self.api_key_id = None
@@ -145,6 +244,36 @@ class BaseClient(object):
         self.use_api_key = False
         self.api_key_handle = None      # This is the principle ID for an api key. Also called handle
 
+        # Re-authentication state shared between this client and its clones
+        self._auth_lock = threading.Lock()
+        self._shared_auth = {}
+
+    def clone(self):
+        """
+        Return a copy of this client that shares its authentication and connection pool,
+        but has its own ``requests.Session``, so each copy can be used from a different thread.
+        If any of the copies has to re-authenticate after a 401, the new session is shared with the others.
+        """
+        client = copy.copy(self)
+        client.headers = self.headers.copy()
+        client.cookies = self.cookies.copy() if self.cookies else self.cookies
+        client.session = requests.Session()
+        for prefix, adapter in self.session.adapters.items():
+            client.session.mount(prefix, adapter)
+        return client
+
+    def get_connection_pool_stats(self):
+        """
+        Get the connection reuse counters of the HTTP connection pool used to talk to the server.
+
+        :return: see :meth:`TLSHttpAdapter.get_pool_stats`, or None if the server is not reached through a TLSHttpAdapter
+        :rtype: dict
+        """
+        adapter = self.session.get_adapter(self.base_url)
+        if isinstance(adapter, TLSHttpAdapter):
+            return adapter.get_pool_stats()
+        return None
+
     def set_api_key(self, api_key_id, api_key_secret, timeout=None):
         """
         Call this method instead of the connect method in order to use API key
@@ -273,10 +402,29 @@ class BaseClient(object):
 
         result = operation(url, **kwargs)
         if result.status_code == 401 and not self.use_api_key:  # unauthorized, re-auth and try again
-            self._connect()
+            self._reconnect(kwargs.get("cookies"))
+            if "cookies" in kwargs:
+                kwargs["cookies"] = self.cookies
+            if "headers" in kwargs and "X-sess-id" in self.headers:
+                kwargs["headers"]["X-sess-id"] = self.headers["X-sess-id"]
             result = operation(url, **kwargs)
         return result
 
+    def _reconnect(self, stale_cookies):
+        """Re-establish the session after a 401.
+           If a clone of this client already did so, reuse its session rather than logging in again.
+        """
+        with self._auth_lock:
+            shared_cookies = self._shared_auth.get("cookies")
+            if shared_cookies and shared_cookies != stale_cookies:
+                self.cookies = shared_cookies
+                self.headers['X-sess-id'] = self._shared_auth["csrf_token"]
+                return
+
+            self._connect()
+            self._shared_auth["cookies"] = self.cookies
+            self._shared_auth["csrf_token"] = self.headers.get('X-sess-id')
+
     def get(self, uri, co3_context_token=None, timeout=None, is_uri_absolute=None):
         """Gets the specified URI.  Note that this URI is relative to <base_url>/rest/orgs/<org_id>.  So
         for example, if you specify a uri of /incidents, the actual URL would be something like this:
@@ -336,6 +484,33 @@ class BaseClient(object):
         BasicHTTPException.raise_if_error(response)
         return response.content
 
+    def get_content_stream(self, uri, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, co3_context_token=None, timeout=None):
+        """Gets the specified URI without reading the whole response into memory.
+        Note that this URI is relative to <base_url>/rest/orgs/<org_id>.
+
+        Args:
+          uri
+          chunk_size: number of bytes in each chunk
+          co3_context_token
+          timeout: number of seconds to wait for response
+        Returns:
+          An iterator of the chunks of the raw value returned by the server for this resource.
+          The connection is released once the iterator is exhausted or closed.
+        Raises:
+          BasicHTTPException - if an HTTP exception occurs.
+        """
+        url = u"{0}/rest/orgs/{1}{2}".format(self.base_url, self.org_id, ensure_unicode(uri))
+        response = self._execute_request(self.session.get,
+                                         url,
+                                         stream=True,
+                                         proxies=self.proxies,
+                                         cookies=self.cookies,
+                                         headers=self.make_headers(co3_context_token),
+                                         verify=self.verify,
+                                         timeout=timeout)
+        BasicHTTPException.raise_if_error(response)
+        return _iter_content(response, chunk_size)
+
     def post(self, uri, payload, co3_context_token=None, timeout=None):
         """
         Posts to the specified URI.
@@ -373,36 +548,77 @@ class BaseClient(object):
         e.g. "/incidents/<id>/attachments" (for incident attachments)
         or,  "/tasks/<id>/attachments" (for task attachments)
 
+        The file can also be a file-like object or an iterator of bytes, which is streamed
+        to the server without being read into memory. Streams that are not regular files
+        are sent with chunked transfer encoding.
+
         :param uri: The REST URI for posting
-        :param filepath: the path of the file to post
-        :param filename: optional name of the file when posted
+        :param filepath: the path of the file to post, or a file-like object or iterator of bytes
+        :param filename: optional name of the file when posted (required for streams without a name)
         :param mimetype: optional override for the guessed MIME type
         :param data: optional dict with additional MIME parts (not required for file attachments; used in artifacts)
         :param co3_context_token: Action Module context token, if responding to an Action Module event
         :param timeout: optional timeout (seconds)
         """
-        filepath = ensure_unicode(filepath)
         if filename:
             filename = ensure_unicode(filename)
         url = u"{0}/rest/orgs/{1}{2}".format(self.base_url, self.org_id, ensure_unicode(uri))
-        mime_type = mimetype or mimetypes.guess_type(filename or filepath)[0] or "application/octet-stream"
-        with open(filepath, 'rb') as filehandle:
+
+        if isinstance(filepath, string_types):
+            filepath = ensure_unicode(filepath)
             attachment_name = filename or os.path.basename(filepath)
-            multipart_data = {'file': (attachment_name, filehandle, mime_type)}
-            multipart_data.update(data or {})
-            encoder = MultipartEncoder(fields=multipart_data)
-            headers = self.make_headers(co3_context_token,
-                                        additional_headers={'content-type': encoder.content_type})
-            response = self._execute_request(self.session.post,
-                                             url,
-                                             data=encoder,
-                                             proxies=self.proxies,
-                                             cookies=self.cookies,
-                                             headers=headers,
-                                             verify=self.verify,
-                                             timeout=timeout)
-            BasicHTTPException.raise_if_error(response)
-            return json.loads(response.text)
+            with open(filepath, 'rb') as filehandle:
+                return self._post_multipart(url, attachment_name, filehandle, mimetype, data,
+                                            co3_context_token, timeout)
+
+        stream_name = getattr(filepath, "name", None)
+        if filename:
+            attachment_name = filename
+        elif isinstance(stream_name, string_types):
+            attachment_name = os.path.basename(ensure_unicode(stream_name))
+        else:
+            raise ValueError("filename is required to post an attachment from a stream")
+        return self._post_multipart(url, attachment_name, filepath, mimetype, data, co3_context_token, timeout)
+
+    def _post_multipart(self, url, attachment_name, stream, mimetype, data, co3_context_token, timeout):
+        """Post a multipart/form-data request with the stream as its 'file' part.
+           The body is built again if the request is retried after a 401.
+        """
+        mime_type = mimetype or mimetypes.guess_type(attachment_name)[0] or "application/octet-stream"
+        rewind = _get_rewind(stream)
+        responses = []
+
+        def post_body(url, headers, **kwargs):
+            if responses:
+                if not rewind:
+                    LOG.warning(u"Unable to retry the upload of %s: the stream cannot be rewound", attachment_name)
+                    return responses[0]
+                rewind()
+
+            multipart_data = [('file', (attachment_name, stream, mime_type))]
+            multipart_data.extend((data or {}).items())
+            if _stream_length(stream) is not None:
+                body = MultipartEncoder(fields=multipart_data)
+                content_type = body.content_type
+            else:
+                boundary = uuid.uuid4().hex
+                body = _iter_multipart(multipart_data, boundary)
+                content_type = "multipart/form-data; boundary={0}".format(boundary)
+            headers['content-type'] = content_type
+
+            response = self.session.post(url, data=body, headers=headers, **kwargs)
+            responses.append(response)
+            return response
+
+        response = self._execute_request(post_body,
+                                         url,
+                                         proxies=self.proxies,
+                                         cookies=self.cookies,
+                                         headers=self.make_headers(co3_context_token),
+                                         verify=self.verify,
+                                         timeout=timeout)
+        BasicHTTPException.raise_if_error(response)
+        return json.loads(response.text)
 
     def post_artifact_file(self, uri, artifact_type, artifact_filepath,
                            description=None, value=None, mimetype=None, co3_context_token=None, timeout=None):
@@ -46,6 +46,9 @@ setup(
         ],
         ":python_version < '3.5'": [
             "keyring>=5.4,<19.0.0"
+        ],
+        "async:python_version >= '3.6'": [
+            "aiohttp>=3.7.0"
         ]
     },
 
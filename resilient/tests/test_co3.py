@@ -562,4 +562,216 @@ class TestGetConfig(object):
         Test with default config specified and not exists in home path.
         """
         result = resilient.get_config_file()
-        assert result == DEFAULT_CONFIG_FILE
\ No newline at end of file
+        assert result == DEFAULT_CONFIG_FILE
+
+class TestPostMany(object):
+
+    @pytest.fixture
+    def mock_client(self):
+        import requests_mock
+        adapter = requests_mock.Adapter()
+
+        def artifacts_post(request, context):
+            artifact = request.json()
+            if artifact["value"] == "bad":
+                context.status_code = 400
+                return {"message": "Invalid artifact"}
+            return [dict(artifact, id=len(adapter.request_history))]
+
+        adapter.register_uri("POST", "https://resilient_host/rest/orgs/201/incidents/2314/artifacts",
+                             json=artifacts_post)
+
+        client = resilient.SimpleClient(base_url="https://resilient_host")
+        client.org_id = 201
+        client.session.mount("https://", adapter)
+        client.adapter = adapter
+        return client
+
+    @pytest.mark.parametrize("concurrency", [1, 4])
+    def test_post_many_ordered(self, mock_client, concurrency):
+        artifacts = [{"type": "String", "value": str(i)} for i in range(20)]
+        results = mock_client.post_many("/incidents/2314/artifacts", artifacts, concurrency=concurrency)
+        assert [result[0]["value"] for result in results] == [str(i) for i in range(20)]
+        assert mock_client.adapter.call_count == 20
+
+    def test_post_many_captures_errors(self, mock_client):
+        artifacts = [{"type": "String", "value": "good"},
+                     {"type": "String", "value": "bad"},
+                     {"type": "String", "value": "good"}]
+        results = mock_client.post_many("/incidents/2314/artifacts", artifacts, concurrency=2)
+        assert results[0][0]["value"] == "good"
+        assert isinstance(results[1], resilient.SimpleHTTPException)
+        assert results[1].response.status_code == 400
+        assert results[2][0]["value"] == "good"
+
+    def test_post_many_empty(self, mock_client):
+        assert mock_client.post_many("/incidents/2314/artifacts", []) == []
+
+
+class TestIterQueryPaged(object):
+
+    @pytest.fixture
+    def mock_client(self):
+        import requests_mock
+        adapter = requests_mock.Adapter()
+        incidents = [{"id": i} for i in range(25)]
+
+        def query_paged(request, context):
+            query = request.json()
+            data = incidents[query["start"]:query["start"] + query["length"]]
+            response = {"data": data, "recordsTotal": len(incidents)}
+            if "filtered" in request.qs:
+                response["recordsFiltered"] = len(incidents)
+            return response
+
+        adapter.register_uri("POST", requests_mock.ANY, json=query_paged)
+
+        client = resilient.SimpleClient(base_url="https://resilient_host")
+        client.org_id = 201
+        client.session.mount("https://", adapter)
+        client.adapter = adapter
+        return client
+
+    @pytest.mark.parametrize("prefetch", [False, True])
+    def test_iter_query_paged(self, mock_client, prefetch):
+        query = {"filters": [{"conditions": [{"field_name": "plan_status", "method": "equals", "value": "A"}]}]}
+        incidents = mock_client.iter_query_paged("/incidents/query_paged", query, page_size=10, prefetch=prefetch)
+        assert [inc["id"] for inc in incidents] == list(range(25))
+
+        requests = mock_client.adapter.request_history
+        assert [request.json()["start"] for request in requests] == [0, 10, 20, 25]
+        assert all(request.json()["filters"] == query["filters"] for request in requests)
+
+    def test_iter_query_paged_lazy(self, mock_client):
+        incidents = mock_client.iter_query_paged("/incidents/query_paged", page_size=10)
+        assert mock_client.adapter.call_count == 0
+        assert next(incidents) == {"id": 0}
+        assert mock_client.adapter.call_count == 1
+
+    def test_iter_query_paged_records_filtered(self, mock_client):
+        incidents = mock_client.iter_query_paged("/incidents/query_paged?filtered=1", page_size=5, prefetch=True)
+        assert len(list(incidents)) == 25
+        assert mock_client.adapter.call_count == 5
+
+    def test_iter_query_paged_projection(self, mock_client):
+        incidents = mock_client.iter_query_paged("/incidents/query_paged", page_size=100,
+                                                 return_level="partial", field_handles=[-1])
+        assert len(list(incidents)) == 25
+        request = mock_client.adapter.last_request
+        assert request.path == "/rest/orgs/201/incidents/query_paged"
+        assert request.qs == {"return_level": ["partial"], "field_handle": ["-1"]}
+
+
+class TestGetContentStream(object):
+
+    @pytest.fixture
+    def mock_client(self):
+        import requests_mock
+        adapter = requests_mock.Adapter()
+        adapter.register_uri("GET", "https://resilient_host/rest/orgs/201/incidents/2314/attachments/5/contents",
+                             content=b"x" * 150)
+        adapter.register_uri("GET", "https://resilient_host/rest/orgs/201/incidents/2314/attachments/6/contents",
+                             status_code=404, json={"message": "Not found"})
+
+        client = resilient.SimpleClient(base_url="https://resilient_host")
+        client.org_id = 201
+        client.session.mount("https://", adapter)
+        client.adapter = adapter
+        return client
+
+    def test_get_content_stream(self, mock_client):
+        chunks = list(mock_client.get_content_stream("/incidents/2314/attachments/5/contents", chunk_size=64))
+        assert [len(chunk) for chunk in chunks] == [64, 64, 22]
+        assert b"".join(chunks) == b"x" * 150
+        assert mock_client.adapter.last_request.stream is True
+
+    def test_get_content_stream_error(self, mock_client):
+        with pytest.raises(resilient.SimpleHTTPException):
+            mock_client.get_content_stream("/incidents/2314/attachments/6/contents")
+
+
+class TestPostAttachment(object):
+
+    @pytest.fixture
+    def mock_client(self):
+        import requests_mock
+        from email.parser import BytesParser
+        adapter = requests_mock.Adapter()
+        adapter.bodies = []
+        adapter.unauthorized = 0
+
+        def attachments_post(request, context):
+            body = request.body
+            if hasattr(body, "read"):
+                body = body.read()
+            elif not isinstance(body, bytes):
+                body = b"".join(body)
+            adapter.bodies.append(body)
+            if adapter.unauthorized:
+                adapter.unauthorized -= 1
+                context.status_code = 401
+                return {}
+
+            message = BytesParser().parsebytes(
+                b"Content-Type: " + request.headers["content-type"].encode("utf-8") + b"\r\n\r\n" + body)
+            parts = dict((part.get_param("name", header="content-disposition"), part) for part in message.get_payload())
+            return {"name": parts["file"].get_filename(),
+                    "content_type": parts["file"].get_content_type(),
+                    "content": parts["file"].get_payload(decode=True).decode("utf-8"),
+                    "chunked": "Transfer-Encoding" in request.headers,
+                    "fields": sorted(parts)}
+
+        adapter.register_uri("POST", "https://resilient_host/rest/orgs/201/incidents/2314/attachments",
+                             json=attachments_post)
+
+        client = resilient.SimpleClient(base_url="https://resilient_host")
+        client.org_id = 201
+        client.session.mount("https://", adapter)
+        client.adapter = adapter
+        client._connect = lambda timeout=None: None
+        return client
+
+    def test_post_attachment_path(self, mock_client, tmpdir):
+        filepath = tmpdir.join("mock_attachment.txt")
+        filepath.write("mock file contents")
+        response = mock_client.post_attachment("/incidents/2314/attachments", str(filepath))
+        assert response == {"name": "mock_attachment.txt", "content_type": "text/plain",
+                            "content": "mock file contents", "chunked": False, "fields": ["file"]}
+
+    def test_post_attachment_file_object(self, mock_client):
+        import io
+        stream = io.BytesIO(b"mock stream contents")
+        response = mock_client.post_attachment("/incidents/2314/attachments", stream, filename="mock.csv",
+                                               data={"artifact": "{}"})
+        assert response["name"] == "mock.csv"
+        assert response["content_type"] == "text/csv"
+        assert response["content"] == "mock stream contents"
+        assert response["fields"] == ["artifact", "file"]
+        assert not response["chunked"]
+
+    def test_post_attachment_iterator(self, mock_client):
+        chunks = (chunk for chunk in [b"mock ", b"chunked ", b"contents"])
+        response = mock_client.post_attachment("/incidents/2314/attachments", chunks, filename="mock.bin")
+        assert response["content_type"] == "application/octet-stream"
+        assert response["content"] == "mock chunked contents"
+        assert response["chunked"]
+
+    def test_post_attachment_stream_name_required(self, mock_client):
+        with pytest.raises(ValueError):
+            mock_client.post_attachment("/incidents/2314/attachments", iter([b"mock"]))
+
+    def test_post_attachment_retry_rewinds(self, mock_client, tmpdir):
+        filepath = tmpdir.join("mock_attachment.txt")
+        filepath.write("mock file contents")
+        mock_client.adapter.unauthorized = 1
+        with open(str(filepath), "rb") as stream:
+            response = mock_client.post_attachment("/incidents/2314/attachments", stream)
+        assert response["name"] == "mock_attachment.txt"
+        assert response["content"] == "mock file contents"
+        assert len(mock_client.adapter.bodies) == 2
+
+    def test_post_attachment_retry_not_rewindable(self, mock_client):
+        mock_client.adapter.unauthorized = 1
+        with pytest.raises(resilient.SimpleHTTPException):
+            mock_client.post_attachment("/incidents/2314/attachments", iter([b"mock"]), filename="mock.txt")
+        assert len(mock_client.adapter.bodies) == 1
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+import asyncio
+import pytest
+from resilient import Patch, PatchConflictException, SimpleHTTPException, NoChange
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from resilient import AsyncSimpleClient
+
+MOCK_ORG = {"id": 201, "name": "Test Organization", "enabled": True}
+
+
+class MockSOAR(object):
+    """A minimal SOAR REST API that counts logins and can expire the session"""
+    def __init__(self):
+        self.session_id = "session-1"
+        self.logins = 0
+        self.incident = {"id": 2314, "name": "Mock incident", "vers": 1}
+        self.put_conflicts = 0
+        self.requests = []
+
+        self.app = web.Application()
+        self.app.router.add_post("/rest/session", self.session_post)
+        self.app.router.add_get("/rest/session", self.session_get)
+        self.app.router.add_get("/rest/orgs/201/incidents/2314", self.incident_get)
+        self.app.router.add_put("/rest/orgs/201/incidents/2314", self.incident_put)
+        self.app.router.add_patch("/rest/orgs/201/incidents/2314", self.incident_patch)
+        self.app.router.add_post("/rest/orgs/201/incidents/2314/attachments", self.attachment_post)
+        self.app.router.add_post("/rest/search_ex", self.search_post)
+
+    def _session(self):
+        return {"orgs": [MOCK_ORG], "csrf_token": "csrf-{0}".format(self.logins), "user_id": 1,
+                "api_key_handle": 7}
+
+    def _check_auth(self, request):
+        self.requests.append(request)
+        if request.headers.get("Authorization"):
+            return
+        if request.cookies.get("JSESSIONID") != self.session_id:
+            raise web.HTTPUnauthorized()
+
+    async def session_post(self, request):
+        self.logins += 1
+        self.session_id = "session-{0}".format(self.logins)
+        response = web.json_response(self._session())
+        response.set_cookie("JSESSIONID", self.session_id)
+        return response
+
+    async def session_get(self, request):
+        if request.headers.get("Authorization") is None:
+            raise web.HTTPUnauthorized()
+        return web.json_response(self._session())
+
+    async def incident_get(self, request):
+        self._check_auth(request)
+        return web.json_response(self.incident)
+
+    async def incident_put(self, request):
+        self._check_auth(request)
+        if self.put_conflicts:
+            self.put_conflicts -= 1
+            raise web.HTTPConflict()
+        self.incident = await request.json()
+        return web.json_response(self.incident)
+
+    async def incident_patch(self, request):
+        self._check_auth(request)
+        patch = await request.json()
+        change = patch["changes"][0]
+        if change["old_value"]["object"] != self.incident["name"]:
+            return web.json_response({"success": False, "field_failures": [
+                {"field": change["field"],
+                 "your_original_value": change["old_value"]["object"],
+                 "actual_current_value": self.incident["name"]}]})
+        self.incident["name"] = change["new_value"]["object"]
+        return web.json_response({"success": True})
+
+    async def attachment_post(self, request):
+        self._check_auth(request)
+        form = await request.post()
+        return web.json_response({"name": form["file"].filename,
+                                  "content_type": form["file"].content_type,
+                                  "size": len(form["file"].file.read())})
+
+    async def search_post(self, request):
+        self._check_auth(request)
+        return web.json_response([{"query": (await request.json())["query"]}])
+
+
+def _run(coro_func):
+    soar = MockSOAR()
+
+    async def run():
+        server = TestServer(soar.app)
+        await server.start_server()
+        client = AsyncSimpleClient(org_name=MOCK_ORG["name"], base_url=str(server.make_url("")).rstrip("/"))
+        try:
+            await coro_func(client, soar)
+        finally:
+            await client.close()
+            await server.close()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+    return soar
+
+
+def test_connect_and_get():
+    async def test(client, soar):
+        session = await client.connect("admin@example.com", "123")
+        assert session["user_id"] == 1
+        assert client.org_id == 201
+        assert client.headers["X-sess-id"] == "csrf-1"
+        incident = await client.get("/incidents/2314")
+        assert incident["name"] == "Mock incident"
+
+    _run(test)
+
+
+def test_api_key():
+    async def test(client, soar):
+        await client.set_api_key("key_id", "key_secret")
+        assert client.api_key_handle == 7
+        incident = await client.get("/incidents/2314")
+        assert incident["id"] == 2314
+        assert soar.logins == 0
+
+    _run(test)
+
+
+def test_reauth_once_on_concurrent_401():
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        soar.session_id = "expired"
+        results = await asyncio.gather(*[client.get("/incidents/2314") for _ in range(10)])
+        assert len(results) == 10
+        assert soar.logins == 2
+        assert client.cookies == {"JSESSIONID": "session-2"}
+
+    _run(test)
+
+
+def test_get_error():
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        with pytest.raises(SimpleHTTPException) as excinfo:
+            await client.get("/incidents/1")
+        assert excinfo.value.response.status_code == 404
+
+    _run(test)
+
+
+def test_cached_get():
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        first = await client.cached_get("/incidents/2314")
+        second = await client.cached_get("/incidents/2314")
+        assert first is second
+        assert len(soar.requests) == 1
+
+    _run(test)
+
+
+def test_get_put_retries_conflict():
+    def apply_func(incident):
+        incident["name"] = "Updated"
+
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        soar.put_conflicts = 2
+        incident = await client.get_put("/incidents/2314", apply_func)
+        assert incident["name"] == "Updated"
+        assert soar.put_conflicts == 0
+
+    _run(test)
+
+
+def test_get_put_no_change():
+    def apply_func(incident):
+        raise NoChange
+
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        incident = await client.get_put("/incidents/2314", apply_func)
+        assert incident["name"] == "Mock incident"
+
+    _run(test)
+
+
+def test_patch():
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        patch = Patch({"name": "Mock incident", "vers": 1})
+        patch.add_value("name", "Patched")
+        response = await client.patch("/incidents/2314", patch)
+        assert response.status_code == 200
+        assert soar.incident["name"] == "Patched"
+
+    _run(test)
+
+
+def test_patch_conflict():
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        patch = Patch({"name": "Stale name", "vers": 1})
+        patch.add_value("name", "Patched")
+        with pytest.raises(PatchConflictException):
+            await client.patch("/incidents/2314", patch)
+
+        await client.patch("/incidents/2314", patch, overwrite_conflict=True)
+        assert soar.incident["name"] == "Patched"
+
+    _run(test)
+
+
+def test_post_attachment(tmpdir):
+    filepath = tmpdir.join("mock_attachment.txt")
+    filepath.write("mock file contents")
+
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        soar.session_id = "expired"
+        response = await client.post_attachment("/incidents/2314/attachments", str(filepath))
+        assert response == {"name": "mock_attachment.txt", "content_type": "text/plain", "size": 18}
+
+    _run(test)
+
+
+def test_search():
+    async def test(client, soar):
+        await client.connect("admin@example.com", "123")
+        assert await client.search({"query": "mock"}) == [{"query": "mock"}]
+
+    _run(test)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# (c) Copyright IBM Corp. 2010, 2022. All Rights Reserved.
+
+import threading
+import pytest
+from resilient import SimpleClient
+from resilient.co3base import TLSHttpAdapter
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fx_http_server():
+    """
+    Before: Starts a keep-alive HTTP server on a free local port
+    After: Stops the server
+    """
+    server = HTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield "http://127.0.0.1:{0}".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_defaults():
+    client = SimpleClient()
+    adapter = client.session.get_adapter(client.base_url)
+    assert isinstance(adapter, TLSHttpAdapter)
+    assert adapter._pool_connections == 10
+    assert adapter._pool_maxsize == 10
+    assert adapter._pool_block is False
+
+
+def test_pool_sizing():
+    client = SimpleClient(pool_connections=2, pool_maxsize=50, pool_block=True)
+    adapter = client.session.get_adapter(client.base_url)
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 50
+    assert adapter._pool_block is True
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 50
+    assert client.get_connection_pool_stats() == {"pools": 0, "pool_maxsize": 50, "requests": 0, "hits": 0, "misses": 0}
+
+
+def test_pool_stats(fx_http_server):
+    client = SimpleClient(base_url=fx_http_server)
+    adapter = client.session.get_adapter("https://")
+    client.session.mount("http://", adapter)
+
+    for _ in range(3):
+        client.session.get(fx_http_server)
+
+    stats = client.get_connection_pool_stats()
+    assert stats["pools"] == 1
+    assert stats["requests"] == 3
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+
+def test_pool_stats_not_tls_adapter():
+    client = SimpleClient(base_url="http://127.0.0.1")
+    assert client.get_connection_pool_stats() is None
@@ -16,6 +16,7 @@
 """
 import resilient
 import argparse
+import itertools
 import logging
 import json
 import subprocess
@@ -82,8 +83,8 @@ class ResClient(object):
 
     def count_incidents(self):
         self.connect()
-        incidents = self.query_incidents()
-        print("There are {} incidents".format(len(incidents)))
+        num_incidents = sum(1 for _ in self.query_incidents())
+        print("There are {} incidents".format(num_incidents))
 
     def incident_type(self):
         self.connect()
@@ -96,46 +97,21 @@ class ResClient(object):
         print("Actions: {}".format(resp))
 
     def query_incidents(self, max_count=None, page_size=1000, in_log=None):
+        """Generator of all the incidents (or the first max_count), downloaded one page at a time"""
         print("----------------------------")
         print("Download incidents and count")
         print("----------------------------")
 
         log = in_log if in_log else logging.getLogger(__name__)
-        incidents = []
-        url = "/incidents/query_paged?field_handle=-1&return_level=full"
-        num_incidents = 0
-        ret_num = 0
-        done = False
-        while not done:
-            body = {
-                "start": num_incidents,
-                "length": page_size,
-                "recordsTotal": page_size
-            }
-            ret = self.res_client.post(uri=url,
-                                       payload=body)
-
-            data = ret.get("data", [])
-            ret_num = len(data)
-            if ret_num > 0:
-                log.debug("Downloaded {} incidents, total now {} ...".format(ret_num, ret_num + num_incidents))
-                incidents.extend(data)
-            else:
-                #
-                # No more to read.
-                #
-                done = True
-
-            num_incidents = num_incidents + ret_num
-
-            if max_count:
-                if num_incidents >= max_count:
-                    #
-                    # Reach max_count set by user, stop now
-                    #
-                    done = True
-
-        return incidents
+        incidents = self.res_client.iter_query_paged("/incidents/query_paged",
+                                                     page_size=page_size,
+                                                     prefetch=True,
+                                                     return_level="full",
+                                                     field_handles=[-1])
+        for num_incidents, incident in enumerate(itertools.islice(incidents, max_count), 1):
+            if num_incidents % page_size == 0:
+                log.debug("Downloaded {} incidents ...".format(num_incidents))
+            yield incident
 
     def attach_to_incident(self, filename, inc_id):
         print("-----------------------------------------")